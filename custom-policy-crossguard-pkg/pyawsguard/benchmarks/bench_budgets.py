@@ -0,0 +1,119 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Policy time of the pack with and without time budgets (pyawsguard.budgets).
+#
+# Validates bucket policies through the validate functions of the PolicyPack, as the
+# engine does. A share of the bucket policies are pathological, with thousands of
+# statements, and each one costs s3-ssl-requests-policy several milliseconds to parse.
+# Without budgets the policy time grows with the number of pathological policies. With
+# budgets, each call on a pathological policy runs over its budget, and after a few of
+# them s3-ssl-requests-policy trips its circuit breaker and the rest of its resources are
+# deferred, so the policy time stays bounded. The policy is mandatory, so each deferred
+# evaluation is also reported as a violation; the deferred queue is then evaluated out
+# of band and, with the violations of the calls that ran, must report the same
+# violations as the run without budgets.
+#
+# Usage: python benchmarks/bench_budgets.py [--resources 2000] [--pathological 0.05] [--statements 5000]
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from pyawsguard import budgets
+from pyawsguard.evaluate import ResourceArgs
+from pyawsguard.policy_document import clear_cache
+from pyawsguard.registry import PolicyRegistry, POLICY_SPECS
+
+BUCKET_POLICY_TYPE = "aws:s3/bucketPolicy:BucketPolicy"
+
+
+def make_policy(index, statements, rng):
+    statement = [{"Sid": "Read%d" % number, "Effect": "Allow", "Principal": {"AWS": "arn:aws:iam::123456789012:root"},
+                  "Action": "s3:GetObject", "Resource": "arn:aws:s3:::bucket-%d/prefix-%d/*" % (index, number)}
+                 for number in range(statements)]
+    if rng.random() < 0.5:
+        statement.append({"Sid": "TLS", "Effect": "Deny", "Principal": "*", "Action": "s3:*",
+                          "Resource": "arn:aws:s3:::bucket-%d/*" % index,
+                          "Condition": {"Bool": {"aws:SecureTransport": "false"}}})
+    return json.dumps({"Version": "2012-10-17", "Statement": statement})
+
+
+def make_resources(count, pathological, statements, rng):
+    return [
+        ResourceArgs(BUCKET_POLICY_TYPE,
+                     {"bucket": "bucket-%d" % index,
+                      "policy": make_policy(index, statements if rng.random() < pathological else 2, rng)},
+                     "urn:pulumi:bench::budgets::%s::policy-%d" % (BUCKET_POLICY_TYPE, index))
+        for index in range(count)
+    ]
+
+
+def run(resources, time_budgets=None):
+    """(policy time, violations) of the pack's validate functions over resources."""
+    clear_cache()
+    specs = [spec for spec in POLICY_SPECS if spec.resource_type == BUCKET_POLICY_TYPE]
+    validators = []
+    for policy in PolicyRegistry(specs, ()).pack_policies():
+        validators.append(policy.validate)
+    if time_budgets is not None:
+        # pack_policies reads the budgets from the environment, apply them explicitly here
+        validators = [time_budgets.guard(spec, validate) for spec, validate in zip(specs, validators)]
+    violations = []
+    start = time.perf_counter()
+    for args in resources:
+        for validate in validators:
+            validate(args, lambda message, urn=None, args=args: violations.append((args.urn, message)))
+    return time.perf_counter() - start, sorted(violations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time budget benchmark")
+    parser.add_argument("--resources", type=int, default=2000, help="bucket policies validated")
+    parser.add_argument("--pathological", type=float, default=0.05, help="share of pathological bucket policies")
+    parser.add_argument("--statements", type=int, default=5000, help="statements of a pathological policy")
+    parser.add_argument("--budget", type=float, default=5.0, help="budget of a call in milliseconds")
+    options = parser.parse_args()
+
+    resources = make_resources(options.resources, options.pathological, options.statements, random.Random(1))
+    elapsed, expected = run(resources)
+    print("without budgets: %8.1f ms policy time, %d violations" % (elapsed * 1000, len(expected)))
+
+    fd, queue = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        time_budgets = budgets.Budgets(default_ns=int(options.budget * 1e6), deferred_path=queue)
+        elapsed, found = run(resources, time_budgets)
+        time_budgets.close()
+        deferred = sum(policy.deferred for policy in time_budgets.policies)
+        not_evaluated = [violation for violation in found if violation[1].startswith(budgets.NOT_EVALUATED)]
+        found = [violation for violation in found if not violation[1].startswith(budgets.NOT_EVALUATED)]
+        print("with budgets:    %8.1f ms policy time, %d violations, %d evaluations deferred and failed"
+              % (elapsed * 1000, len(found), len(not_evaluated)))
+        assert len(not_evaluated) == deferred
+        start = time.perf_counter()
+        found += sorted((violation.urn, violation.message) for violation in budgets.run_deferred(queue))
+        print("deferred queue:  %8.1f ms out of band" % ((time.perf_counter() - start) * 1000))
+        print("parity: %s" % ("identical violations" if sorted(found) == expected else "DIFFERENT violations"))
+    finally:
+        os.remove(queue)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Parity check and benchmark of the columnar bulk evaluation (pyawsguard.bulk).
+#
+# Every property checked per column is set, in camelCase and in snake_case, to each of
+# a list of unusual values (None, 0, 1, strings, containers, unknown sentinels) or left
+# out, and the violations of evaluate_bulk are compared with those of the per-resource
+# validators, with and without NumPy. The
+# script exits with an error on the first difference, then times both evaluations on
+# a synthetic stack of the column policies' resource types.
+#
+# Usage: python benchmarks/bench_bulk.py [--resources 200000] [--repeat 3]
+
+import argparse
+import contextlib
+import gc
+import os
+import sys
+import time
+
+from synthetic_stack import generate_states
+
+import pyawsguard.bulk as bulk
+from pyawsguard.evaluate import ResourceArgs, evaluate, resource_from_state
+from pyawsguard.props import snake_case
+from pyawsguard.registry import PolicyRegistry, registry
+
+ODD_VALUES = (True, False, None, 0, 1, 1.0, "", "true", "false", "ALL", "all", "REJECT", {}, {"rule": {}}, [],
+              [True], [1, 2], "04da6b54-80e4-46f7-96ec-b56ff0331ba9", "1c4a061d-8072-4f0a-a4cb-0ff528b18fe7")
+
+
+def column_registry():
+    specs = [spec for spec in registry.specs if spec.validator_ref in bulk.COLUMN_PREDICATES]
+    return PolicyRegistry(specs, ())
+
+
+def parity_resources():
+    resources = []
+    for spec in column_registry().specs:
+        key = bulk.COLUMN_PREDICATES[spec.validator_ref][0]
+        # Both spellings of the property are read, camelCase first
+        for spelling in (key, snake_case(key)):
+            for index, value in enumerate(ODD_VALUES + (bulk,)):
+                # The module object stands for "property absent"
+                props = {"other": index} if value is bulk else {spelling: value, "other": index}
+                name = "%s-%d" % (spelling, index)
+                resources.append(ResourceArgs(spec.resource_type, props,
+                                              "urn:pulumi:s::p::%s::%s" % (spec.resource_type, name)))
+    return resources
+
+
+def check_parity(resources, policy_registry):
+    expected = sorted(evaluate(resources, policy_registry))
+    for label, numpy_module in (("numpy", bulk.numpy), ("pure python", None)):
+        if label == "numpy" and numpy_module is None:
+            continue
+        saved = bulk.numpy
+        bulk.numpy = numpy_module
+        try:
+            actual = sorted(bulk.evaluate_bulk(resources, policy_registry))
+        finally:
+            bulk.numpy = saved
+        if actual != expected:
+            missing = set(expected) - set(actual)
+            extra = set(actual) - set(expected)
+            sys.exit("bulk evaluation (%s) differs from the validators:\n  missing %r\n  extra %r" % (label, missing, extra))
+        print("parity (%s): %d violations identical" % (label, len(expected)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk evaluation parity check and benchmark")
+    parser.add_argument("--resources", type=int, default=200000, help="resources in the benchmark stack")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs, the fastest is reported")
+    options = parser.parse_args()
+
+    policy_registry = column_registry()
+    types = {spec.resource_type for spec in policy_registry.specs}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+        check_parity(parity_resources(), policy_registry)
+
+        states = generate_states(options.resources // len(types) + 1, violating=0.2)
+        resources = [resource_from_state(state) for state in states if state["type"] in types][:options.resources]
+        check_parity(resources, policy_registry)
+
+        timings = {"per resource": [], "bulk": []}
+        for _ in range(options.repeat):
+            for label, run in (("per resource", evaluate), ("bulk", bulk.evaluate_bulk)):
+                gc.collect()
+                start = time.perf_counter()
+                count = sum(1 for _ in run(resources, policy_registry))
+                timings[label].append(time.perf_counter() - start)
+        timings = {label: min(runs) for label, runs in timings.items()}
+    print("%d resources, %d violations: per resource %.1f ms, bulk %.1f ms (%s, %.1fx)" % (
+        len(resources), count, timings["per resource"] * 1000, timings["bulk"] * 1000,
+        "numpy" if bulk.numpy is not None else "pure python", timings["per resource"] / timings["bulk"]))
+
+
+if __name__ == "__main__":
+    main()
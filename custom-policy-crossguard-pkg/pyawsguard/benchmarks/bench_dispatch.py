@@ -0,0 +1,132 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Validator calls made for a stack on the two paths that run the policies.
+#
+# Gate (pulumi preview): the resources are sent to the Analyze method of the policy
+# SDK's analyzer with the policies of registry.pack_policies(), as the engine does. The
+# SDK calls every ResourceValidationPolicy of the pack for every resource, and
+# deserializes the resource's properties for each of them, so the number of policy calls
+# stays policies x resources: the per-type dispatch only turns the call of a policy that
+# does not apply into a single string comparison instead of entering the validator. Only
+# registering fewer policies (see pack_config.py) reduces the number of calls.
+#
+# Offline (python -m pyawsguard.evaluate): the evaluator looks the validators up with
+# registry.specs_for(), so each resource only reaches the validators of its type.
+#
+# Usage: python benchmarks/bench_dispatch.py [number of resources]
+
+import sys
+import time
+
+from google.protobuf import struct_pb2
+from pulumi.runtime import proto
+from pulumi_policy import EnforcementLevel, ResourceValidationPolicy
+from pulumi_policy.deserialize import serialize_properties
+from pulumi_policy.policy import _PolicyAnalyzerServicer
+
+from pyawsguard.evaluate import ResourceArgs, evaluate
+from pyawsguard.registry import PACK_NAME, PolicyRegistry, PolicySpec, registry
+
+# A rough mix of a real stack: most resources have no policy registered for their type
+RESOURCE_MIX = (
+    ("aws:s3/bucket:Bucket", {"serverSideEncryptionConfiguration": {"rule": {}}}),
+    ("aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock",
+     {"blockPublicAcls": True, "blockPublicPolicy": True, "ignorePublicAcls": True, "restrictPublicBuckets": True}),
+    ("aws:kms/key:Key", {"enableKeyRotation": True}),
+    ("aws:ebs/volume:Volume", {"encrypted": True}),
+    ("aws:ec2/flowLog:FlowLog", {"trafficType": "ALL"}),
+    ("aws:iam/role:Role", {}),
+    ("aws:iam/rolePolicy:RolePolicy", {}),
+    ("aws:cloudwatch/logGroup:LogGroup", {}),
+    ("aws:lambda/function:Function", {}),
+    ("aws:ec2/subnet:Subnet", {}),
+)
+
+
+def make_stack(count):
+    return [
+        ResourceArgs(RESOURCE_MIX[i % len(RESOURCE_MIX)][0], RESOURCE_MIX[i % len(RESOURCE_MIX)][1],
+                     "urn:pulumi:bench::bench::%s::res-%d" % (RESOURCE_MIX[i % len(RESOURCE_MIX)][0], i))
+        for i in range(count)
+    ]
+
+
+def counting_registry(counter):
+    """registry with every validator counting the calls that enter it."""
+    def counted(spec):
+        validator = spec.validator
+
+        def validate(args, report_violation, **parameters):
+            counter[0] += 1
+            return validator(args, report_violation, **parameters)
+
+        return PolicySpec(spec.name, spec.description, spec.resource_type, spec.validator_ref, validator=validate,
+                          version=spec.version)
+
+    return PolicyRegistry([counted(spec) for spec in registry.specs], ())
+
+
+def run_gate(resources):
+    """(policy calls, validator calls, seconds) of the pack's policies through the SDK."""
+    entered = [0]
+    calls = [0]
+    policies = counting_registry(entered).pack_policies()
+    for policy in policies:
+        validate = policy.validate
+
+        def counted(args, report_violation, validate=validate):
+            calls[0] += 1
+            validate(args, report_violation)
+
+        policy.validate = counted
+    requests = []
+    for args in resources:
+        properties = struct_pb2.Struct()
+        properties.update(serialize_properties(args.props))
+        requests.append(proto.AnalyzeRequest(type=args.resource_type, urn=args.urn, name=args.name,
+                                             properties=properties))
+    analyzer = _PolicyAnalyzerServicer(PACK_NAME, "0.0.1", policies, EnforcementLevel.MANDATORY)
+    start = time.perf_counter()
+    for request in requests:
+        analyzer.Analyze(request, None)
+    return calls[0], entered[0], time.perf_counter() - start
+
+
+def run_offline(resources):
+    """(validators looked up, validator calls, seconds) of the offline evaluator."""
+    entered = [0]
+    policy_registry = counting_registry(entered)
+    start = time.perf_counter()
+    for _ in evaluate(resources, policy_registry):
+        pass
+    return sum(len(policy_registry.specs_for(args.resource_type)) for args in resources), entered[0], \
+        time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    resources = make_stack(count)
+    policies = [policy for policy in registry.pack_policies() if isinstance(policy, ResourceValidationPolicy)]
+    print("%d resources, %d resource policies in the pack" % (count, len(policies)))
+    for label, runner in (("gate (SDK)", run_gate), ("offline", run_offline)):
+        calls, entered, elapsed = runner(resources)
+        print("%-11s policy_calls=%-7d validator_calls=%-6d time=%.3fs (%.1f us/resource)"
+              % (label, calls, entered, elapsed, elapsed * 1e6 / count))
+
+
+if __name__ == "__main__":
+    main()
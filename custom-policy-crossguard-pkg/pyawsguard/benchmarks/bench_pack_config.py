@@ -0,0 +1,86 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Analyzer time per resource for the policies a pack configuration leaves active.
+#
+# Sends the resources of a synthetic stack (synthetic_stack.py) to the Analyze method of
+# the policy SDK's analyzer, the one the engine calls for every resource of a preview,
+# with the pack policies of each stack of a pack configuration. The SDK deserializes
+# the resource properties once per registered policy before the policy's validate even
+# sees the resource type, so every policy left out of the pack saves that work on every
+# resource.
+#
+# Usage: python benchmarks/bench_pack_config.py [--per-type 200] [--config rules/example-pack-config.yaml]
+#                                                [--stacks prod,app-dev,data-lake]
+
+import argparse
+import os
+import time
+
+from google.protobuf import struct_pb2
+from pulumi.runtime import proto
+from pulumi_policy import EnforcementLevel
+from pulumi_policy.deserialize import serialize_properties
+from pulumi_policy.policy import _PolicyAnalyzerServicer
+
+from pyawsguard.evaluate import resource_from_state
+from pyawsguard.pack_config import load_pack_config_file
+from pyawsguard.registry import PACK_NAME, registry
+from synthetic_stack import generate_states
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "rules",
+                              "example-pack-config.yaml")
+
+
+def analyze_requests(resources):
+    requests = []
+    for resource in resources:
+        properties = struct_pb2.Struct()
+        properties.update(serialize_properties(resource.props))
+        requests.append(proto.AnalyzeRequest(type=resource.resource_type, urn=resource.urn, name=resource.name,
+                                             properties=properties))
+    return requests
+
+
+def timed(requests, policies):
+    analyzer = _PolicyAnalyzerServicer(PACK_NAME, "0.0.1", policies, EnforcementLevel.MANDATORY)
+    start = time.perf_counter()
+    diagnostics = sum(len(analyzer.Analyze(request, None).diagnostics) for request in requests)
+    return time.perf_counter() - start, diagnostics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack configuration benchmark")
+    parser.add_argument("--per-type", type=int, default=200, help="resources of each type in the synthetic stack")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="pack configuration file")
+    parser.add_argument("--stacks", default="prod,app-dev,data-lake", help="comma separated stack names")
+    options = parser.parse_args()
+
+    resources = [resource_from_state(state) for state in generate_states(options.per_type)]
+    requests = analyze_requests(resources)
+    config = load_pack_config_file(options.config)
+    print("%d resources" % len(requests))
+    for stack in options.stacks.split(","):
+        table = config.resolve(registry, stack)
+        policies = registry.pack_policies(table)
+        resource_policies = len(policies) - len(table.stack_rules)
+        elapsed, diagnostics = timed(requests, policies)
+        print("%-12s %2d resource policies: %7.1f us/resource, %d violations"
+              % (stack, resource_policies, elapsed * 1e6 / len(requests), diagnostics))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Cost of declarative rules (pyawsguard.rules) as the number of rules grows.
+#
+# Spreads N generated rules over the resource types of synthetic_stack.py, compiles
+# them into a registry and evaluates a synthetic stack with it. Since a resource only
+# meets the rules of its own type, the time per resource grows with the rules per type,
+# not with the total number of rules.
+#
+# Usage: python benchmarks/bench_rules.py [--rules 10,100,1000] [--per-type 200]
+
+import argparse
+import time
+
+from synthetic_stack import RESOURCE_TYPES, generate_states
+
+from pyawsguard.evaluate import evaluate, resource_from_state
+from pyawsguard.registry import PolicyRegistry, rule_specs
+from pyawsguard.rules import RulePolicy
+
+# (operator, value) pairs cycled through by the generated rules
+CONDITIONS = (
+    ("exists", None),
+    ("equals", True),
+    ("not_equals", "public-read"),
+    ("in", ["dev", "test", "prod"]),
+    ("matches", "^[a-z]"),
+    ("not_empty", None),
+)
+
+
+def make_rules(count):
+    rules = []
+    for index in range(count):
+        resource_type = RESOURCE_TYPES[index % len(RESOURCE_TYPES)][0]
+        operator, value = CONDITIONS[index % len(CONDITIONS)]
+        rules.append({
+            "name": "rule-%d" % index,
+            "type": resource_type,
+            "property": "tags.env" if operator == "in" else "prop%d" % (index % 7),
+            "operator": operator,
+            "value": value,
+            "message": "Rule %d failed for {name}" % index,
+        })
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Declarative rules benchmark")
+    parser.add_argument("--rules", default="10,100,1000", help="comma separated numbers of rules")
+    parser.add_argument("--per-type", type=int, default=200, help="synthetic resources of every type")
+    options = parser.parse_args()
+
+    resources = [resource_from_state(state) for state in generate_states(options.per_type)]
+    for count in (int(count) for count in options.rules.split(",")):
+        definitions = make_rules(count)
+        start = time.perf_counter()
+        policy_registry = PolicyRegistry(rule_specs([RulePolicy({"rules": definitions})]), ())
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        violations = sum(1 for _ in evaluate(resources, policy_registry))
+        elapsed = time.perf_counter() - start
+        print("%5d rules: compiled in %7.2f ms, %7.2f us/resource, %d violations" % (
+            count, compile_time * 1000, elapsed * 1e6 / len(resources), violations))
+
+
+if __name__ == "__main__":
+    main()
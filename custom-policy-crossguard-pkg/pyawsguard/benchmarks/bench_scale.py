@@ -0,0 +1,176 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Scaling benchmark of the policy pack on synthetic stacks (see synthetic_stack.py).
+#
+# For every stack size it measures:
+#   - the cost of each validator per resource of its type
+#   - the end-to-end throughput of the offline evaluator, from reading the stack
+#     export to the list of violations
+# and, once per run, the time to load the pack in a fresh interpreter.
+#
+# Each run is appended as one JSON line to the results file together with the package
+# version and git commit, and compared with the previous run in that file, so a
+# regression shows up as soon as the benchmark is run on a new version.
+#
+# Usage: python benchmarks/bench_scale.py [--sizes 1000,10000,100000] [--results FILE]
+
+import argparse
+import configparser
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from bench_startup import run_once as load_pack_once
+from synthetic_stack import RESOURCE_TYPES, write_document
+
+from pyawsguard.evaluate import evaluate_document, load_resources
+from pyawsguard.registry import registry
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS = os.path.join(BENCHMARKS_DIR, "results", "bench_scale.jsonl")
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def package_version():
+    config = configparser.ConfigParser()
+    config.read(os.path.join(BENCHMARKS_DIR, os.pardir, "setup.cfg"))
+    return config.get("metadata", "version", fallback=None)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_violation(message, urn=None):
+    pass
+
+
+def validator_costs(resources):
+    """Mean nanoseconds per call of every policy over the resources of its type."""
+    by_type = {}
+    for resource in resources:
+        by_type.setdefault(resource.resource_type, []).append(resource)
+    costs = {}
+    for spec in registry.specs:
+        matching = by_type.get(spec.resource_type, ())
+        if not matching:
+            continue
+        validator = spec.validator
+        start = time.perf_counter()
+        for args in matching:
+            validator(args, report_violation)
+        elapsed = time.perf_counter() - start
+        costs["%s (%s)" % (spec.name, spec.resource_type.rsplit(":", 1)[-1])] = elapsed * 1e9 / len(matching)
+    return costs
+
+
+def bench_size(size, directory, violating, seed):
+    per_type = max(1, size // len(RESOURCE_TYPES))
+    path = os.path.join(directory, "stack-%d.json" % size)
+    with open(path, "w") as f:
+        count = write_document(f, per_type, violating, seed)
+
+    start = time.perf_counter()
+    result = evaluate_document(path)
+    end_to_end = time.perf_counter() - start
+
+    return {
+        "resources": count,
+        "violations": len(result.violations),
+        "end_to_end_s": end_to_end,
+        "resources_per_s": count / end_to_end,
+        "validator_ns": validator_costs(list(load_resources(path))),
+    }
+
+
+def load_previous(path):
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                previous = json.loads(line)
+    return previous
+
+
+def _change(current, previous):
+    return "%+.1f%%" % (100.0 * (current - previous) / previous) if previous else "n/a"
+
+
+def print_run(run, previous):
+    print("pack load: %.1f ms (previous %s)" % (
+        run["pack_load_s"] * 1000,
+        _change(run["pack_load_s"], previous["pack_load_s"]) if previous else "n/a"))
+    for size, result in sorted(run["sizes"].items(), key=lambda item: int(item[0])):
+        before = (previous or {}).get("sizes", {}).get(size)
+        print("%7s resources: %8.1f ms end to end, %9.0f resources/s, %d violations (previous %s)" % (
+            result["resources"], result["end_to_end_s"] * 1000, result["resources_per_s"],
+            result["violations"],
+            _change(result["end_to_end_s"], before["end_to_end_s"]) if before else "n/a"))
+        for policy, nanos in sorted(result["validator_ns"].items(), key=lambda item: -item[1]):
+            before_nanos = before["validator_ns"].get(policy) if before else None
+            print("    %-70s %8.0f ns/resource  %s" % (policy, nanos, _change(nanos, before_nanos)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Policy pack scaling benchmark on synthetic stacks")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated numbers of resources")
+    parser.add_argument("--violating", type=float, default=0.2, help="share of violating resources")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--load-runs", type=int, default=3, help="fresh interpreters started to time the pack load")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON lines file the runs are appended to")
+    parser.add_argument("--no-save", action="store_true", help="only print the results")
+    options = parser.parse_args()
+
+    run = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "version": package_version(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "pack_load_s": min(load_pack_once()[0] for _ in range(options.load_runs)),
+        "sizes": {},
+    }
+    # Check modules are imported on first use; that cost belongs to the pack load
+    for spec in registry.specs:
+        spec.validator
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        for size in options.sizes.split(","):
+            # Some validators also log each violation to stderr
+            with contextlib.redirect_stderr(devnull):
+                run["sizes"][size] = bench_size(int(size), directory, options.violating, options.seed)
+
+    print_run(run, load_previous(options.results))
+    if not options.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(options.results)), exist_ok=True)
+        with open(options.results, "a") as f:
+            f.write(json.dumps(run, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main()
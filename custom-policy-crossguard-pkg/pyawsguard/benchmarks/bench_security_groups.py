@@ -0,0 +1,112 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Cost of the security group exposure analysis on groups with many ingress rules.
+#
+# Compares security_groups.internet_exposed_ports with a direct scan that tests every
+# sensitive port against every rule and parses every CIDR block of every rule, for
+# groups of increasing size. Both report the same exposed ports.
+#
+# Usage: python benchmarks/bench_security_groups.py [--rules 10,100,500,1000] [--groups N]
+
+import argparse
+import ipaddress
+import random
+import time
+
+from pyawsguard.props import VIEWS
+from pyawsguard.security_groups import (
+    DEFAULT_SENSITIVE_PORTS,
+    PortSet,
+    ingress_rules,
+    internet_exposed_ports,
+)
+
+SecurityGroupView = VIEWS["aws:ec2/securityGroup:SecurityGroup"]
+
+CIDRS = ("10.0.0.0/8", "172.16.0.0/12", "192.168.1.0/24", "203.0.113.0/24", "0.0.0.0/0", "::/0", "2001:db8::/32")
+
+
+def make_group(rule_count, rng):
+    ingress = []
+    for _ in range(rule_count):
+        protocol = rng.choice(("tcp", "tcp", "tcp", "udp", "icmp", "-1"))
+        from_port = rng.randrange(1, 65535)
+        to_port = min(65535, from_port + rng.choice((0, 0, 0, 10, 1000)))
+        cidrs = rng.sample(CIDRS, rng.randrange(1, 4))
+        ingress.append({
+            "protocol": protocol,
+            "fromPort": from_port,
+            "toPort": to_port,
+            "cidrBlocks": [cidr for cidr in cidrs if ":" not in cidr],
+            "ipv6CidrBlocks": [cidr for cidr in cidrs if ":" in cidr],
+        })
+    return {"ingress": ingress}
+
+
+def direct_scan(props, ports):
+    # The straightforward approach: every port against every rule, every CIDR parsed
+    exposed = set()
+    for rule in props["ingress"]:
+        protocol = rule["protocol"]
+        if protocol == "-1":
+            from_port, to_port = 0, 65535
+        elif protocol in ("tcp", "udp"):
+            from_port, to_port = rule["fromPort"], rule["toPort"]
+        else:
+            continue
+        for port in ports:
+            if from_port <= port <= to_port:
+                for cidr in rule["cidrBlocks"] + rule["ipv6CidrBlocks"]:
+                    network = ipaddress.ip_network(cidr)
+                    if network.prefixlen <= (8 if network.version == 4 else 16) and not network.is_private:
+                        exposed.add(port)
+                        break
+    return exposed
+
+
+def analyzer(props, port_set):
+    exposed = internet_exposed_ports(ingress_rules(SecurityGroupView(props)), port_set)
+    if exposed is None:
+        return set()
+    return {port for start, end in zip(exposed.starts, exposed.ends) for port in range(start, end + 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Security group exposure analysis benchmark")
+    parser.add_argument("--rules", default="10,100,500,1000", help="comma separated numbers of rules per group")
+    parser.add_argument("--groups", type=int, default=200, help="groups analyzed per size")
+    options = parser.parse_args()
+
+    rng = random.Random(0)
+    port_set = PortSet(DEFAULT_SENSITIVE_PORTS)
+    for rule_count in (int(count) for count in options.rules.split(",")):
+        groups = [make_group(rule_count, rng) for _ in range(options.groups)]
+        timings = {}
+        results = {}
+        for label, run in (("direct scan", lambda props: direct_scan(props, DEFAULT_SENSITIVE_PORTS)),
+                           ("interval analyzer", lambda props: analyzer(props, port_set))):
+            start = time.perf_counter()
+            results[label] = [run(props) for props in groups]
+            timings[label] = (time.perf_counter() - start) * 1e6 / len(groups)
+        assert results["direct scan"] == results["interval analyzer"]
+        print("%5d rules/group: direct scan %9.1f us/group, interval analyzer %9.1f us/group (%.1fx)" % (
+            rule_count, timings["direct scan"], timings["interval analyzer"],
+            timings["direct scan"] / timings["interval analyzer"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Measures the cold-start cost of loading the policy pack with 'python -X importtime'.
+#
+# Each run starts a fresh interpreter that builds the pack policies, parses the
+# importtime report written to stderr and records the cumulative import time of the
+# slowest top-level modules. Pass --output to keep the results as JSON so they can be
+# compared between versions of the package.
+#
+# Usage: python benchmarks/bench_startup.py [--runs N] [--top N] [--output FILE]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+STARTUP_CODE = "from pyawsguard.registry import registry; registry.pack_policies()"
+
+
+def parse_importtime(stderr):
+    """Cumulative import time in microseconds for each top-level module in the report."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        # Nested imports are indented below the module that triggered them
+        if name.startswith("  "):
+            continue
+        cumulative[name.strip()] = cumulative.get(name.strip(), 0) + int(fields[1])
+    return cumulative
+
+
+def run_once():
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=env,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    return wall, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Policy pack cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    options = parser.parse_args()
+
+    walls = []
+    imports = {}
+    for _ in range(options.runs):
+        wall, cumulative = run_once()
+        walls.append(wall)
+        for name, micros in cumulative.items():
+            imports.setdefault(name, []).append(micros)
+
+    walls.sort()
+    median_imports = {name: sorted(values)[len(values) // 2] for name, values in imports.items()}
+    slowest = sorted(median_imports.items(), key=lambda item: item[1], reverse=True)[:options.top]
+
+    print("runs=%d wall min=%.3fs median=%.3fs" % (options.runs, walls[0], walls[len(walls) // 2]))
+    for name, micros in slowest:
+        print("  %-40s %8.1f ms" % (name, micros / 1000.0))
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "runs": options.runs,
+                "wall_min_s": walls[0],
+                "wall_median_s": walls[len(walls) // 2],
+                "imports_us": dict(slowest),
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Cost of the tag policy (pyawsguard.tags) as the number of tag rules grows.
+#
+# Generates a tag policy with N tag rules (required keys, allowed values, patterns,
+# some keys with several patterns) over the taggable types, and resources of those
+# types carrying a fixed number of tags, a few of them missing or out of policy. The same checks
+# are also written as one declarative rule each (pyawsguard.rules) for comparison: the
+# tag policy checks a resource in one pass over its tags, the rules one rule at a time.
+# The time per resource of the tag policy grows with the number of its tags the policy
+# has rules for (all of them from about 1000 rules up), not with the number of rules.
+#
+# Usage: python benchmarks/bench_tags.py [--rules 10,100,1000] [--resources 20000] [--tags 30]
+
+import argparse
+import random
+import time
+
+from pyawsguard.evaluate import ResourceArgs, evaluate
+from pyawsguard.registry import PolicyRegistry, rule_specs, tag_specs
+from pyawsguard.rules import RulePolicy
+from pyawsguard.tags import TAGGABLE_TYPES, TagPolicy
+
+ENVIRONMENTS = ["dev", "test", "prod"]
+
+# Tag keys used by the resources and the rules; the first ones are required
+KEY_POOL = 500
+REQUIRED_KEYS = 5
+
+
+def make_tag_rules(count):
+    rules = []
+    for index in range(count):
+        key = "key-%d" % (index % KEY_POOL)
+        kind = index % 3
+        if kind == 0:
+            rules.append({"key": key, "required": index < REQUIRED_KEYS * 3, "values": ENVIRONMENTS})
+        elif kind == 1:
+            rules.append({"key": key, "pattern": "[a-z]+(-[0-9]+)?"})
+        else:
+            rules.append({"key": key, "pattern": "[a-z0-9-]{1,32}"})
+    return rules
+
+
+def equivalent_rules(tag_rules):
+    """The checks of the tag rules as declarative rules, one per (rule, type) and check."""
+    rules = []
+    for index, tag_rule in enumerate(tag_rules):
+        conditions = []
+        if tag_rule.get("required"):
+            conditions.append({"property": "tags." + tag_rule["key"], "operator": "exists"})
+        if "values" in tag_rule:
+            conditions.append({"property": "tags." + tag_rule["key"], "operator": "in", "value": tag_rule["values"]})
+        if "pattern" in tag_rule:
+            conditions.append({"property": "tags." + tag_rule["key"], "operator": "matches",
+                               "value": "^(?:%s)$" % tag_rule["pattern"]})
+        for resource_type in TAGGABLE_TYPES:
+            rules.append({"name": "tag-rule-%d" % index, "type": resource_type, "conditions": conditions,
+                          "message": "Tag rule %d failed for {name}" % index})
+    return rules
+
+
+def make_resources(count, tags_per_resource, rng):
+    required = ["key-%d" % key for key in range(0, REQUIRED_KEYS * 3, 3)]
+    others = ["key-%d" % key for key in range(KEY_POOL) if "key-%d" % key not in required]
+    resources = []
+    for index in range(count):
+        # About one resource in ten lacks a required tag or has a value out of policy
+        keys = [key for key in required if rng.random() < 0.99]
+        keys += rng.sample(others, tags_per_resource - len(keys))
+        tags = {key: rng.choice(ENVIRONMENTS) if rng.random() < 0.997 else "Bad Value" for key in keys}
+        resource_type = TAGGABLE_TYPES[index % len(TAGGABLE_TYPES)]
+        resources.append(ResourceArgs(resource_type, {"tags": tags}, "urn:pulumi:bench::tags::%s::r%d" % (resource_type, index)))
+    return resources
+
+
+def timed(resources, policy_registry):
+    start = time.perf_counter()
+    violations = sum(1 for _ in evaluate(resources, policy_registry))
+    return time.perf_counter() - start, violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag policy benchmark")
+    parser.add_argument("--rules", default="10,100,1000", help="comma separated numbers of tag rules")
+    parser.add_argument("--resources", type=int, default=20000, help="resources evaluated")
+    parser.add_argument("--tags", type=int, default=30, help="tags per resource")
+    parser.add_argument("--no-rules-comparison", action="store_true",
+                        help="only time the tag policy, not the equivalent declarative rules")
+    options = parser.parse_args()
+
+    for count in (int(count) for count in options.rules.split(",")):
+        tag_rules = make_tag_rules(count)
+        resources = make_resources(options.resources, options.tags, random.Random(count))
+
+        start = time.perf_counter()
+        policy_registry = PolicyRegistry(tag_specs([TagPolicy({"tags": tag_rules})]), ())
+        compile_time = time.perf_counter() - start
+        elapsed, violations = timed(resources, policy_registry)
+        line = "%5d tag rules: compiled in %7.2f ms, %6.2f us/resource, %d violations" % (
+            count, compile_time * 1000, elapsed * 1e6 / len(resources), violations)
+
+        if not options.no_rules_comparison:
+            rules_registry = PolicyRegistry(rule_specs([RulePolicy({"rules": equivalent_rules(tag_rules)})]), ())
+            rules_elapsed, _ = timed(resources, rules_registry)
+            line += "; as declarative rules %8.2f us/resource" % (rules_elapsed * 1e6 / len(resources))
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Generator of synthetic stacks for benchmarking the policy pack at scale.
+#
+# Emits a 'pulumi stack export' or 'pulumi preview --json' document with N resources of
+# every type in RESOURCE_TYPES. The properties follow the shapes the AWS provider
+# produces (camelCase inputs, policies as JSON strings, nested encryption settings),
+# and a configurable share of the resources is built to violate the policies of its
+# type. The resources of the same index are linked as a program links them: the
+# bucket's public access block and policy name the bucket, the flow log, security
+# groups and subnet hold the VPC's id, the volume the key's arn and the security group
+# rule the group's id, each with the property dependency the engine records. The stack
+# policies then only report the resources whose linked resources violate a policy.
+# Generation is seeded, so the same arguments always produce the same document.
+# The document is written one resource at a time and never held in memory whole.
+#
+# Usage: python benchmarks/synthetic_stack.py --per-type 1000 [--violating 0.2]
+#            [--format export|preview] [--seed N] [--output FILE]
+
+import argparse
+import json
+import random
+import sys
+
+STACK = "bench"
+PROJECT = "synthetic"
+ACCOUNT = "123456789012"
+REGION = "us-east-1"
+
+
+def _arn(service, resource):
+    return "arn:aws:%s:%s:%s:%s" % (service, REGION, ACCOUNT, resource)
+
+
+def _vpc_id(index):
+    return "vpc-%08x" % index
+
+
+def _security_group_id(index):
+    return "sg-%08x" % index
+
+
+def _bucket_name(index):
+    return "bucket-%d" % index
+
+
+def _key_arn(index):
+    return _arn("kms", "key/key-%d" % index)
+
+
+def _tags(name, rng):
+    return {"Name": name, "env": rng.choice(("dev", "test", "prod")), "owner": "team-%d" % rng.randrange(20)}
+
+
+def _bucket(name, index, violating, rng):
+    props = {
+        "bucket": name,
+        "acl": "private",
+        "forceDestroy": False,
+        "versioning": {"enabled": True, "mfaDelete": False},
+        "tags": _tags(name, rng),
+    }
+    if not violating:
+        props["serverSideEncryptionConfiguration"] = {
+            "rule": {"applyServerSideEncryptionByDefault": {
+                "sseAlgorithm": "aws:kms", "kmsMasterKeyId": _arn("kms", "key/" + name)}},
+        }
+    return props
+
+
+def _bucket_public_access_block(name, index, violating, rng):
+    flags = [True, True, True, True]
+    if violating:
+        flags[rng.randrange(4)] = False
+    return {
+        "bucket": _bucket_name(index),
+        "blockPublicAcls": flags[0],
+        "blockPublicPolicy": flags[1],
+        "ignorePublicAcls": flags[2],
+        "restrictPublicBuckets": flags[3],
+    }
+
+
+def _bucket_policy(name, index, violating, rng):
+    bucket = _bucket_name(index)
+    statements = [{
+        "Sid": "AllowRead",
+        "Effect": "Allow",
+        "Principal": {"AWS": "arn:aws:iam::%s:role/reader" % ACCOUNT},
+        "Action": ["s3:GetObject"],
+        "Resource": "arn:aws:s3:::%s/*" % bucket,
+    }]
+    if not violating:
+        statements.append({
+            "Sid": "DenyInsecureTransport",
+            "Effect": "Deny",
+            "Principal": "*",
+            "Action": "s3:*",
+            "Resource": ["arn:aws:s3:::%s" % bucket, "arn:aws:s3:::%s/*" % bucket],
+            "Condition": {"Bool": {"aws:SecureTransport": "false"}},
+        })
+    return {"bucket": bucket, "policy": json.dumps({"Version": "2012-10-17", "Statement": statements})}
+
+
+def _queue_policy(name, index, violating, rng):
+    principal = "*" if violating else {"AWS": "arn:aws:iam::%s:role/producer" % ACCOUNT}
+    queue_arn = _arn("sqs", name)
+    policy = {
+        "Version": "2012-10-17",
+        "Id": name + "-policy",
+        "Statement": [{
+            "Sid": "AllowSend",
+            "Effect": "Allow",
+            "Principal": principal,
+            "Action": "sqs:SendMessage",
+            "Resource": queue_arn,
+        }],
+    }
+    return {"queueUrl": "https://sqs.%s.amazonaws.com/%s/%s" % (REGION, ACCOUNT, name), "policy": json.dumps(policy)}
+
+
+def _kms_key(name, index, violating, rng):
+    return {
+        "description": "Key for " + name,
+        "deletionWindowInDays": rng.choice((7, 10, 30)),
+        "enableKeyRotation": not violating,
+        "keyUsage": "ENCRYPT_DECRYPT",
+        "tags": _tags(name, rng),
+    }
+
+
+def _volume(name, index, violating, rng):
+    props = {
+        "availabilityZone": REGION + rng.choice("abc"),
+        "size": rng.choice((8, 20, 100, 500)),
+        "type": "gp3",
+        "encrypted": not violating,
+        "tags": _tags(name, rng),
+    }
+    if not violating:
+        props["kmsKeyId"] = _key_arn(index)
+    return props
+
+
+def _flow_log(name, index, violating, rng):
+    return {
+        "vpcId": _vpc_id(index),
+        "trafficType": rng.choice(("ACCEPT", "REJECT")) if violating else "ALL",
+        "logDestinationType": "cloud-watch-logs",
+        "logDestination": _arn("logs", "log-group:/flow/" + name),
+        "iamRoleArn": "arn:aws:iam::%s:role/flow-logs" % ACCOUNT,
+    }
+
+
+def _rds_instance(name, index, violating, rng):
+    return {
+        "identifier": name,
+        "engine": rng.choice(("mysql", "postgres")),
+        "instanceClass": "db.t3.micro",
+        "allocatedStorage": 20,
+        "storageEncrypted": True,
+        "deletionProtection": not violating,
+        "skipFinalSnapshot": violating,
+        "tags": _tags(name, rng),
+    }
+
+
+def _ingress_rule(rng, open_ssh):
+    if open_ssh:
+        return {"protocol": "tcp", "fromPort": 22, "toPort": 22, "cidrBlocks": ["0.0.0.0/0"]}
+    port = rng.choice((80, 443, 5432, 8080))
+    return {"protocol": "tcp", "fromPort": port, "toPort": port, "cidrBlocks": ["10.%d.0.0/16" % rng.randrange(256)]}
+
+
+def _security_group(name, index, violating, rng):
+    ingress = [_ingress_rule(rng, False) for _ in range(rng.randrange(1, 6))]
+    if violating:
+        ingress.insert(rng.randrange(len(ingress) + 1), _ingress_rule(rng, True))
+    return {
+        "name": name,
+        "description": "Security group " + name,
+        "vpcId": _vpc_id(index),
+        "ingress": ingress,
+        "egress": [{"protocol": "-1", "fromPort": 0, "toPort": 0, "cidrBlocks": ["0.0.0.0/0"]}],
+    }
+
+
+def _security_group_rule(name, index, violating, rng):
+    props = _ingress_rule(rng, violating)
+    props.update({"type": "ingress", "securityGroupId": _security_group_id(index)})
+    return props
+
+
+def _default_security_group(name, index, violating, rng):
+    rules = [_ingress_rule(rng, False)] if violating else []
+    return {"vpcId": _vpc_id(index), "ingress": rules, "egress": list(rules)}
+
+
+def _eks_cluster(name, index, violating, rng):
+    props = {
+        "name": name,
+        "roleArn": "arn:aws:iam::%s:role/eks-cluster" % ACCOUNT,
+        "vpcConfig": {"subnetIds": ["subnet-%08x" % rng.getrandbits(32) for _ in range(2)]},
+        "enabledClusterLogTypes": ["api", "audit"] if violating else ["api", "audit", "authenticator"],
+        "encryptionConfig": {"provider": {"keyArn": _arn("kms", "key/" + name)}, "resources": ["secrets"]},
+    }
+    if not violating:
+        props["tags"] = _tags(name, rng)
+    return props
+
+
+def _vpc(name, index, violating, rng):
+    return {"cidrBlock": "10.%d.0.0/16" % rng.randrange(256), "enableDnsHostnames": True, "tags": _tags(name, rng)}
+
+
+def _subnet(name, index, violating, rng):
+    return {"vpcId": _vpc_id(index), "cidrBlock": "10.0.%d.0/24" % rng.randrange(256)}
+
+
+def _role(name, index, violating, rng):
+    assume = {"Version": "2012-10-17", "Statement": [{
+        "Effect": "Allow", "Principal": {"Service": "lambda.amazonaws.com"}, "Action": "sts:AssumeRole"}]}
+    return {"name": name, "assumeRolePolicy": json.dumps(assume)}
+
+
+# Type token, name prefix and property factory of every generated resource type. The
+# last three have no policy registered and only add the dispatch cost a real stack has.
+RESOURCE_TYPES = (
+    ("aws:s3/bucket:Bucket", "bucket", _bucket),
+    ("aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock", "bucket-pab", _bucket_public_access_block),
+    ("aws:s3/bucketPolicy:BucketPolicy", "bucket-policy", _bucket_policy),
+    ("aws:sqs/queuePolicy:QueuePolicy", "queue-policy", _queue_policy),
+    ("aws:kms/key:Key", "key", _kms_key),
+    ("aws:ebs/volume:Volume", "volume", _volume),
+    ("aws:ec2/flowLog:FlowLog", "flow-log", _flow_log),
+    ("aws:rds/instance:Instance", "db", _rds_instance),
+    ("aws:ec2/securityGroup:SecurityGroup", "sg", _security_group),
+    ("aws:ec2/securityGroupRule:SecurityGroupRule", "sg-rule", _security_group_rule),
+    ("aws:ec2/defaultSecurityGroup:DefaultSecurityGroup", "default-sg", _default_security_group),
+    ("aws:eks/cluster:Cluster", "cluster", _eks_cluster),
+    ("aws:ec2/vpc:Vpc", "vpc", _vpc),
+    ("aws:ec2/subnet:Subnet", "subnet", _subnet),
+    ("aws:iam/role:Role", "role", _role),
+)
+
+
+# Type token -> {property: type token of the resource of the same index it refers to}
+REFERENCES = {
+    "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock": {"bucket": "aws:s3/bucket:Bucket"},
+    "aws:s3/bucketPolicy:BucketPolicy": {"bucket": "aws:s3/bucket:Bucket"},
+    "aws:ebs/volume:Volume": {"kmsKeyId": "aws:kms/key:Key"},
+    "aws:ec2/flowLog:FlowLog": {"vpcId": "aws:ec2/vpc:Vpc"},
+    "aws:ec2/securityGroup:SecurityGroup": {"vpcId": "aws:ec2/vpc:Vpc"},
+    "aws:ec2/securityGroupRule:SecurityGroupRule": {"securityGroupId": "aws:ec2/securityGroup:SecurityGroup"},
+    "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup": {"vpcId": "aws:ec2/vpc:Vpc"},
+    "aws:ec2/subnet:Subnet": {"vpcId": "aws:ec2/vpc:Vpc"},
+}
+
+
+def _identity(resource_type, name, index):
+    # The id and the outputs only known once the resource exists
+    if resource_type == "aws:ec2/vpc:Vpc":
+        return _vpc_id(index), {"arn": _arn("ec2", "vpc/" + _vpc_id(index))}
+    if resource_type == "aws:ec2/securityGroup:SecurityGroup":
+        return _security_group_id(index), {}
+    if resource_type == "aws:kms/key:Key":
+        return "key-%d" % index, {"arn": _key_arn(index), "keyId": "key-%d" % index}
+    if resource_type == "aws:s3/bucket:Bucket":
+        return _bucket_name(index), {"arn": "arn:aws:s3:::" + _bucket_name(index)}
+    return "%s-id" % name, {}
+
+
+def urn(resource_type, name):
+    return "urn:pulumi:%s::%s::%s::%s" % (STACK, PROJECT, resource_type, name)
+
+
+def generate_states(per_type, violating=0.2, seed=0):
+    """Yields per_type resource states of every type in RESOURCE_TYPES, interleaved
+    like a real program registers them. Each resource violates the policies of its
+    type with probability violating."""
+    rng = random.Random(seed)
+    prefixes = {resource_type: prefix for resource_type, prefix, _ in RESOURCE_TYPES}
+    for index in range(per_type):
+        for resource_type, prefix, factory in RESOURCE_TYPES:
+            name = "%s-%d" % (prefix, index)
+            props = factory(name, index, rng.random() < violating, rng)
+            resource_id, identity = _identity(resource_type, name, index)
+            outputs = dict(props, id=resource_id, **identity)
+            dependencies = {
+                key: [urn(target, "%s-%d" % (prefixes[target], index))]
+                for key, target in REFERENCES.get(resource_type, {}).items() if key in props
+            }
+            yield {
+                "urn": urn(resource_type, name),
+                "custom": True,
+                "id": resource_id,
+                "type": resource_type,
+                "inputs": props,
+                "outputs": outputs,
+                "parent": urn("pulumi:pulumi:Stack", "%s-%s" % (PROJECT, STACK)),
+                "propertyDependencies": dependencies,
+            }
+
+
+def _stack_state():
+    return {"urn": urn("pulumi:pulumi:Stack", "%s-%s" % (PROJECT, STACK)), "custom": False,
+            "type": "pulumi:pulumi:Stack"}
+
+
+def write_document(out, per_type, violating=0.2, seed=0, document_format="export"):
+    """Writes a stack export or preview document to the text stream out and returns the
+    number of resources in it."""
+    count = 0
+    if document_format == "export":
+        out.write('{"version": 3, "deployment": {"manifest": {"time": "2024-01-01T00:00:00Z"}, "resources": [\n')
+        out.write(json.dumps(_stack_state()))
+        for state in generate_states(per_type, violating, seed):
+            out.write(",\n" + json.dumps(state))
+            count += 1
+        out.write("\n]}}\n")
+    else:
+        out.write('{"steps": [\n')
+        out.write(json.dumps({"op": "create", "urn": _stack_state()["urn"], "newState": _stack_state()}))
+        for state in generate_states(per_type, violating, seed):
+            out.write(",\n" + json.dumps({"op": "create", "urn": state["urn"], "newState": state}))
+            count += 1
+        out.write("\n], \"changeSummary\": {\"create\": %d}}\n" % (count + 1))
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic stack export or preview document")
+    parser.add_argument("--per-type", type=int, default=1000, help="resources of every type")
+    parser.add_argument("--violating", type=float, default=0.2, help="share of violating resources")
+    parser.add_argument("--format", choices=("export", "preview"), default="export")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="output file (default: stdout)")
+    options = parser.parse_args(argv)
+
+    out = open(options.output, "w") if options.output else sys.stdout
+    try:
+        count = write_document(out, options.per_type, options.violating, options.seed, options.format)
+    finally:
+        if options.output:
+            out.close()
+    sys.stderr.write("Wrote %d resources\n" % count)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,53 +17,16 @@
 from pulumi_policy import (
     EnforcementLevel,
     PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
 )
 
-from pulumi import log
+from pyawsguard.pack_config import active_rules_from_environment
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-
-# Import individual policy definitions
-from pyawsguard.eks_checks import default_log_types_policy
-from pyawsguard.eks_checks import tags_policy
-from pyawsguard.eks_checks import kms_key_for_encryption_policy
-from pyawsguard.ebs_checks import ebs_encryption_policy
-from pyawsguard.ec2_checks import secgrp_default_no_ingress
-from pyawsguard.ec2_checks import secgrp_default_no_egress
-from pyawsguard.ec2_checks import security_grp_ssh_policy_1
-from pyawsguard.ec2_checks import security_grp_ssh_policy_2
-from pyawsguard.kms_checks import kms_no_automatic_rotation
-from pyawsguard.rds_checks import rds_deletion_protection_policy
-from pyawsguard.s3_checks import s3_public_access_block
-from pyawsguard.s3_checks import s3_ssl_requests
-from pyawsguard.s3_checks import s3_encryption_policy
-from pyawsguard.sqs_checks import sqs_no_public_access
-from pyawsguard.vpc_checks import vpc_flow_logs_policy 
+# Policies are declared in the registry, indexed by the resource type they validate
+from pyawsguard.registry import PACK_NAME, registry
 
+# The policies of the stack and their settings, resolved once from PYAWSGUARD_PACK_CONFIG
 PolicyPack(
-    name="aws-python",
+    name=PACK_NAME,
     enforcement_level=EnforcementLevel.MANDATORY,
-    policies=[
-        s3_public_access_block,
-        sqs_no_public_access,
-        kms_no_automatic_rotation,
-        vpc_flow_logs_policy,
-        s3_encryption_policy,
-        ebs_encryption_policy,
-        rds_deletion_protection_policy,
-        secgrp_default_no_ingress,
-        secgrp_default_no_egress,
-        security_grp_ssh_policy_1,
-        security_grp_ssh_policy_2,
-        s3_ssl_requests,
-        default_log_types_policy,
-        tags_policy,
-        kms_key_for_encryption_policy,
-    ],
+    policies=registry.pack_policies(active_rules_from_environment()),
 )
@@ -0,0 +1,320 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Time budgets for the resource policies of the PolicyPack.
+#
+# Enabled by setting PYAWSGUARD_TIME_BUDGETS to the budget of a single validator call in
+# milliseconds, as a default and/or per policy:
+#
+#   PYAWSGUARD_TIME_BUDGETS=50,s3-ssl-requests-policy=200 pulumi preview --policy-pack ...
+#
+# A budgeted validator runs inline, on the engine's thread, and its time is checked when
+# it returns:
+#
+# - a call that took longer than its policy's budget is reported on stderr with the
+#   resource URN; its violations are reported as usual, the resource was evaluated;
+# - after PYAWSGUARD_BUDGET_TRIPS such calls (3 by default) the policy's circuit breaker
+#   opens, and the policy is no longer run for the rest of the preview;
+# - PYAWSGUARD_TIME_BUDGET_TOTAL (milliseconds) bounds the time of all the resource
+#   policies together: once it is spent, no resource policy is run any more.
+#
+# A call cannot be stopped safely from Python, so the policy time of a preview is at most
+# the total budget plus the time of the call that spent it.
+#
+# A policy that is no longer run does not gate the rest of the preview. Every evaluation
+# of a mandatory policy that is not run is reported as a violation of the policy, so the
+# preview fails rather than letting the resource through. The evaluations of an advisory
+# policy are reported as advisory violations too, unless PYAWSGUARD_BUDGET_ON_TRIP=warn,
+# which only prints a warning for them; a mandatory policy always fails.
+#
+# The resources a policy was not run for are deferred: with PYAWSGUARD_DEFERRED set to a
+# path, they are appended to it as JSON lines, which
+#
+#   python -m pyawsguard.budgets deferred.jsonl
+#
+# evaluates out of band, without budgets, and reports like 'python -m pyawsguard.evaluate'.
+# The stack policies run once per preview and are not budgeted.
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+BUDGETS_ENV = "PYAWSGUARD_TIME_BUDGETS"
+TOTAL_BUDGET_ENV = "PYAWSGUARD_TIME_BUDGET_TOTAL"
+TRIPS_ENV = "PYAWSGUARD_BUDGET_TRIPS"
+ON_TRIP_ENV = "PYAWSGUARD_BUDGET_ON_TRIP"
+DEFERRED_ENV = "PYAWSGUARD_DEFERRED"
+
+DEFAULT_TRIPS = 3
+
+# What happens to the evaluations an advisory policy is not run for: "fail" reports each
+# of them as a violation, "warn" defers them with a warning. Mandatory policies always fail.
+ON_TRIP = ("fail", "warn")
+
+# Start of the message of an evaluation reported as a violation because it was not run
+NOT_EVALUATED = "Not evaluated within the time budget of the policy"
+
+try:
+    _now_ns = time.perf_counter_ns
+except AttributeError:
+    # Python 3.6
+    def _now_ns():
+        return int(time.perf_counter() * 1e9)
+
+
+def parse_budgets(value):
+    """(default budget or None, {policy: budget}) in nanoseconds for a
+    PYAWSGUARD_TIME_BUDGETS value such as "50,s3-ssl-requests-policy=200"."""
+    default = None
+    budgets = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, milliseconds = entry.rpartition("=")
+        try:
+            budget = int(float(milliseconds) * 1e6)
+        except ValueError:
+            raise ValueError("%s: not a number of milliseconds: %r" % (BUDGETS_ENV, entry))
+        if name:
+            budgets[name.strip()] = budget
+        else:
+            default = budget
+    return default, budgets
+
+
+class PolicyBudget:
+    """Budget and circuit breaker of one resource policy spec."""
+
+    __slots__ = ("name", "resource_type", "budget_ns", "fail", "overruns", "open", "deferred")
+
+    def __init__(self, name, resource_type, budget_ns, fail=True):
+        self.name = name
+        self.resource_type = resource_type
+        self.budget_ns = budget_ns
+        # Evaluations not run are reported as violations
+        self.fail = fail
+        self.overruns = 0
+        self.open = False
+        self.deferred = 0
+
+
+class Budgets:
+    """Enforces the time budgets of the validate functions it guards."""
+
+    def __init__(self, default_ns=None, budgets_ns=None, total_ns=None, trips=DEFAULT_TRIPS, deferred_path=None,
+                 on_trip="fail"):
+        if on_trip not in ON_TRIP:
+            raise ValueError("%s must be one of %s: %r" % (ON_TRIP_ENV, ", ".join(ON_TRIP), on_trip))
+        self.default_ns = default_ns
+        self.budgets_ns = budgets_ns or {}
+        self.total_ns = total_ns
+        self.trips = trips
+        self.deferred_path = deferred_path
+        self.on_trip = on_trip
+        self.spent_ns = 0
+        self.total_spent = False
+        self.policies = []
+        self._lock = threading.Lock()
+        self._deferred_file = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def guard(self, spec, validate):
+        """validate wrapped to enforce the budget of spec; returned as is when neither
+        spec nor the pack has a budget."""
+        budget_ns = self.budgets_ns.get(spec.name, self.default_ns)
+        if budget_ns is None and self.total_ns is None:
+            return validate
+        # Specs without a level of their own are registered at the pack's, mandatory
+        policy = PolicyBudget(spec.name, spec.resource_type, budget_ns,
+                              spec.enforcement_level != "advisory" or self.on_trip == "fail")
+        self.policies.append(policy)
+        resource_type = spec.resource_type
+
+        def guarded(args, report_violation):
+            if args.resource_type != resource_type:
+                return
+            if policy.open:
+                self.defer(policy, args, "circuit breaker open", report_violation)
+                return
+            if self.total_spent:
+                self.defer(policy, args, "total time budget spent", report_violation)
+                return
+            start = _now_ns()
+            try:
+                validate(args, report_violation)
+            finally:
+                self.record(policy, args, _now_ns() - start)
+
+        return guarded
+
+    def record(self, policy, args, elapsed_ns):
+        with self._lock:
+            self.spent_ns += elapsed_ns
+            total_spent = not self.total_spent and self.total_ns is not None and self.spent_ns >= self.total_ns
+            if total_spent:
+                self.total_spent = True
+            over = policy.budget_ns is not None and elapsed_ns > policy.budget_ns
+            tripped = False
+            if over:
+                policy.overruns += 1
+                tripped = not policy.open and policy.overruns >= self.trips
+                if tripped:
+                    policy.open = True
+        if over:
+            sys.stderr.write("pyawsguard: %s took %.1f ms for %s, over its budget of %.1f ms\n"
+                             % (policy.name, elapsed_ns / 1e6, args.urn, policy.budget_ns / 1e6))
+        if tripped:
+            self._warn("%s exceeded its time budget %d times, its circuit breaker is open"
+                       % (policy.name, policy.overruns), policy.name + " is", [policy])
+        if total_spent:
+            self._warn("the total time budget of the resource policies is spent", "every resource policy is",
+                       self.policies)
+
+    def _warn(self, cause, subject, policies):
+        failing = any(policy.fail for policy in policies)
+        gated = all(policy.fail for policy in policies)
+        sys.stderr.write("pyawsguard: WARNING: %s: %s NO LONGER EVALUATED for the rest of the preview, %s\n" % (
+            cause, subject,
+            "the evaluations not run are reported as violations" if gated else
+            "the resources not evaluated are NOT GATED%s (deferred%s)" % (
+                " by the advisory policies" if failing else "",
+                " to " + self.deferred_path if self.deferred_path else "")))
+
+    def defer(self, policy, args, reason, report_violation=None):
+        """Records that policy was not run for the resource of args; when the policy fails
+        on trip, reports it as a violation through report_violation."""
+        entry = None
+        if self.deferred_path:
+            from pyawsguard.daemon import plain
+
+            entry = json.dumps({"policy": policy.name, "type": args.resource_type, "urn": args.urn,
+                                "name": args.name, "props": plain(args.props), "reason": reason}, sort_keys=True)
+        with self._lock:
+            first = policy.deferred == 0
+            policy.deferred += 1
+            if entry is not None:
+                if self._deferred_file is None:
+                    self._deferred_file = open(self.deferred_path, "a")
+                self._deferred_file.write(entry + "\n")
+                self._deferred_file.flush()
+        if first:
+            sys.stderr.write("pyawsguard: %s deferred from %s on (%s)\n" % (policy.name, args.urn, reason))
+        if policy.fail and report_violation is not None:
+            report_violation("%s (%s); the resource is not known to comply" % (NOT_EVALUATED, reason))
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._deferred_file is not None:
+                self._deferred_file.close()
+                self._deferred_file = None
+            deferred = [policy for policy in self.policies if policy.deferred]
+        failed = [policy for policy in deferred if policy.fail]
+        warned = [policy for policy in deferred if not policy.fail]
+        for policies, outcome in ((failed, " and were reported as violations"),
+                                  (warned, ", those resources were NOT GATED by these advisory policies")):
+            if policies:
+                sys.stderr.write("pyawsguard: WARNING: %d policy evaluations were not run within their time "
+                                 "budgets%s: %s%s\n" % (
+                                     sum(policy.deferred for policy in policies), outcome,
+                                     ", ".join("%s (%d)" % (policy.name, policy.deferred) for policy in policies),
+                                     "; evaluate them with: python -m pyawsguard.budgets " + self.deferred_path
+                                     if self.deferred_path else ""))
+
+
+_budgets = None
+
+
+def from_environment():
+    """The process wide Budgets when PYAWSGUARD_TIME_BUDGETS or
+    PYAWSGUARD_TIME_BUDGET_TOTAL is set, else None."""
+    global _budgets
+    budgets = os.environ.get(BUDGETS_ENV)
+    total = os.environ.get(TOTAL_BUDGET_ENV)
+    if not budgets and not total:
+        return None
+    if _budgets is None:
+        default_ns, budgets_ns = parse_budgets(budgets or "")
+        _budgets = Budgets(
+            default_ns,
+            budgets_ns,
+            int(float(total) * 1e6) if total else None,
+            int(os.environ.get(TRIPS_ENV) or DEFAULT_TRIPS),
+            os.environ.get(DEFERRED_ENV),
+            os.environ.get(ON_TRIP_ENV) or "fail",
+        )
+    return _budgets
+
+
+def run_deferred(path, policy_registry=None):
+    """Runs the deferred policy evaluations of the queue at path and yields the
+    evaluate.Violation objects they report. policy_registry defaults to the policies of
+    the pack configuration (pack_config.registry_from_environment), as in the preview."""
+    from pyawsguard.evaluate import ResourceArgs, _reporter
+    from pyawsguard.pack_config import registry_from_environment
+
+    policy_registry = policy_registry or registry_from_environment()
+    violations = []
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            args = ResourceArgs(entry["type"], entry["props"], entry["urn"], entry["name"])
+            for spec in policy_registry.specs_for(entry["type"]):
+                if spec.name == entry["policy"]:
+                    spec.validator(args, _reporter(violations, spec, args))
+            yield from violations
+            del violations[:]
+
+
+def main(argv=None):
+    from pyawsguard.evaluate import format_violation, violation_to_json
+
+    parser = argparse.ArgumentParser(
+        prog="python -m pyawsguard.budgets",
+        description="Evaluate the policy evaluations deferred by the time budgets of a preview.",
+    )
+    parser.add_argument("queue", help="file of the deferred evaluations ($PYAWSGUARD_DEFERRED of the preview)")
+    parser.add_argument("--format", choices=("text", "json"), default="text",
+                        help="'text' mirrors the pulumi preview output, 'json' writes one violation per line")
+    options = parser.parse_args(argv)
+
+    found = 0
+    mandatory = 0
+    for violation in run_deferred(options.queue):
+        if options.format == "json":
+            sys.stdout.write(violation_to_json(violation) + "\n")
+        else:
+            if not found:
+                sys.stdout.write("Policy Violations:\n")
+            sys.stdout.write(format_violation(violation) + "\n")
+        found += 1
+        if violation.enforcement_level == "mandatory":
+            mandatory += 1
+    sys.stderr.write("%d violations (%d mandatory) in the deferred evaluations of %s\n"
+                     % (found, mandatory, options.queue))
+    return 1 if mandatory else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
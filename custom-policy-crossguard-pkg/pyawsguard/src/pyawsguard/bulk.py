@@ -0,0 +1,159 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Columnar bulk evaluation for offline audits of large stacks.
+#
+# The validators that only test whether a single property holds one passing value are
+# described in COLUMN_PREDICATES. For those, the property of the resources of each type
+# is read into a column (camelCase, else snake_case, like the property views) and the
+# rows known to pass are selected for the whole column at once: from a bool array of
+# the rows holding the passing bool, a "typed" mask of the rows holding a str and the
+# str column, or a "present" mask for the properties that pass whenever they are set.
+# The arrays are NumPy's when it is installed, lists otherwise. The validator runs for
+# every other row, including the absent, unknown and oddly typed values, so the
+# violations, their messages and any logging are exactly those of the per-resource
+# evaluation. Every other policy, including the ones given parameters by the pack
+# configuration, runs per resource as usual.
+#
+# The resources are taken CHUNK_SIZE at a time, so the columns of one chunk are held in
+# memory, with what the stack policies read of the others (see evaluate.StackResources).
+#
+# benchmarks/bench_bulk.py checks the columns against the validators on synthetic
+# stacks with unusual values; keep it passing when a predicate or its validator changes.
+
+from itertools import islice
+
+from pyawsguard.evaluate import StackResources, _validate, _validate_stack, evaluate
+from pyawsguard.pack_config import registry_from_environment
+from pyawsguard.props import snake_case
+from pyawsguard.registry import PolicyRegistry
+
+try:
+    # Optional: selects the passing rows of whole columns
+    import numpy
+except ImportError:
+    numpy = None
+
+# Passing value of the properties that pass whenever they are set
+PRESENT = object()
+
+# validator_ref -> (property, passing value): the resource passes when the property holds
+# exactly the passing value (a bool or a str), or is set at all for PRESENT
+COLUMN_PREDICATES = {
+    "ebs_checks:ebs_encryption_validator": ("encrypted", True),
+    "kms_checks:kms_no_automatic_rotation_validator": ("enableKeyRotation", True),
+    "rds_checks:rds_deletion_protection_validator": ("deletionProtection", True),
+    "vpc_checks:vpc_flow_logs_validator": ("trafficType", "ALL"),
+    "s3_checks:s3_encryption_validator": ("serverSideEncryptionConfiguration", PRESENT),
+}
+
+# Resources taken at a time
+CHUNK_SIZE = 50000
+
+# Stands for the props that are not a plain dict; never changed
+_NO_PROPS = {}
+
+
+def column_values(rows, key):
+    """The value of the property key of each of the rows (resources of one type), read
+    like the property views read it: camelCase first, then snake_case, None when absent
+    or when the props are not a plain dict (the validator then decides)."""
+    props = [args.props if type(args.props) is dict else _NO_PROPS for args in rows]
+    values = [item.get(key) for item in props]
+    snake = snake_case(key)
+    if snake != key:
+        values = [item.get(snake) if value is None else value for item, value in zip(props, values)]
+    return values
+
+
+def passing_rows(values, passing):
+    """A mask of the values known to pass: a NumPy bool array, or a list of bools."""
+    count = len(values)
+    if passing is PRESENT:
+        if numpy is None:
+            return [value is not None for value in values]
+        return numpy.fromiter((value is not None for value in values), dtype=bool, count=count)
+
+    if type(passing) is bool:
+        # True and False are singletons: "is" compares the type and the value
+        if numpy is None:
+            return [value is passing for value in values]
+        return numpy.fromiter((value is passing for value in values), dtype=bool, count=count)
+
+    if numpy is None:
+        return [type(value) is str and value == passing for value in values]
+    typed = numpy.fromiter((type(value) is str for value in values), dtype=bool, count=count)
+    column = numpy.array([value if type(value) is str else "" for value in values], dtype=str)
+    return typed & (column == passing)
+
+
+def failing_rows(rows, predicate):
+    """Indexes of the rows (resources of one type) not known to pass the column
+    predicate; the validator decides for these."""
+    key, passing = predicate
+    mask = passing_rows(column_values(rows, key), passing)
+    if numpy is None:
+        return [index for index, passes in enumerate(mask) if not passes]
+    return numpy.flatnonzero(~mask).tolist()
+
+
+def evaluate_bulk(resources, policy_registry=None, cache=None):
+    """Same violations as evaluate(), in another order: the resources are taken chunk by
+    chunk and, in each chunk, type by type, the COLUMN_PREDICATES policies after the
+    others; the stack policies run last. With a ResultCache, the validators run for the
+    rows not known to pass use it like evaluate() does."""
+    policy_registry = policy_registry or registry_from_environment()
+
+    def by_column(spec):
+        # A predicate describes the validator without parameters
+        return spec.validator_ref in COLUMN_PREDICATES and not spec.parameters
+
+    column_specs = [spec for spec in policy_registry.specs if by_column(spec)]
+    other_registry = PolicyRegistry([spec for spec in policy_registry.specs if not by_column(spec)], ())
+    stack_resources = StackResources(policy_registry) if policy_registry.stack_specs else None
+
+    resources = iter(resources)
+    violations = []
+    while True:
+        chunk = list(islice(resources, CHUNK_SIZE))
+        if not chunk:
+            break
+        by_type = {}
+        for args in chunk:
+            rows = by_type.get(args.resource_type)
+            if rows is None:
+                rows = by_type[args.resource_type] = []
+            rows.append(args)
+            if stack_resources is not None:
+                stack_resources.add(args)
+        del chunk
+
+        for resource_type, rows in by_type.items():
+            if other_registry.specs_for(resource_type):
+                yield from evaluate(rows, other_registry, cache)
+
+        for spec in column_specs:
+            rows = by_type.get(spec.resource_type)
+            if not rows:
+                continue
+            for index in failing_rows(rows, COLUMN_PREDICATES[spec.validator_ref]):
+                _validate(rows[index], (spec,), cache, violations)
+            yield from violations
+            del violations[:]
+
+    if stack_resources is not None:
+        _validate_stack(stack_resources, policy_registry, violations)
+        yield from violations
@@ -0,0 +1,129 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Persistent cache of validation results for incremental evaluation.
+#
+# A result is stored per (policy name, policy version, resource URN, property hash).
+# The policy version is a hash of the source of the check module holding the
+# validator and of the pyawsguard modules it imports, so editing a check or a helper
+# it relies on invalidates the cached results without any manual step. Only the
+# latest result of each (policy, URN) pair is kept, which bounds the database to the
+# size of the stacks evaluated with it.
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sqlite3
+
+CACHE_FILE_NAME = "pyawsguard-results.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    policy TEXT NOT NULL,
+    urn TEXT NOT NULL,
+    version TEXT NOT NULL,
+    props_hash TEXT NOT NULL,
+    violations TEXT NOT NULL,
+    PRIMARY KEY (policy, urn)
+)
+"""
+
+_PACKAGE_IMPORT_RE = re.compile(rb"^\s*(?:from|import)\s+pyawsguard\.(\w+)", re.MULTILINE)
+
+_versions = {}
+
+
+def policy_version(spec):
+    """Hash of the source of the check module that holds the spec's validator, including
+    the pyawsguard modules it imports, and of the spec's own version (compiled rules)."""
+    module_name = spec.validator_ref.split(":")[0]
+    version = _versions.get(module_name)
+    if version is None:
+        digest = hashlib.sha256()
+        for source in _module_sources(module_name, set()):
+            digest.update(source)
+        version = _versions[module_name] = digest.hexdigest()[:16]
+    if spec.version is not None:
+        return hashlib.sha256((version + spec.version).encode("ascii")).hexdigest()[:16]
+    return version
+
+
+def _module_sources(module_name, seen):
+    seen.add(module_name)
+    with open(importlib.util.find_spec("pyawsguard." + module_name).origin, "rb") as f:
+        source = f.read()
+    yield source
+    for imported in _PACKAGE_IMPORT_RE.findall(source):
+        imported = imported.decode("ascii")
+        if imported not in seen:
+            yield from _module_sources(imported, seen)
+
+
+def props_hash(props):
+    """Hash of the canonical JSON form of a resource's properties."""
+    canonical = json.dumps(props, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite backed store of the violations each policy reported for a resource.
+
+    Several worker processes can share one cache file; writes are buffered and
+    committed in one transaction by flush().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._pending = []
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    @classmethod
+    def in_directory(cls, directory):
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, CACHE_FILE_NAME))
+
+    def get(self, spec, urn, resource_props_hash):
+        """The cached (urn, message) pairs for the resource, or None on a miss."""
+        row = self._db.execute(
+            "SELECT version, props_hash, violations FROM results WHERE policy = ? AND urn = ?",
+            (spec.name, urn),
+        ).fetchone()
+        if row is None or row[0] != policy_version(spec) or row[1] != resource_props_hash:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[2])
+
+    def put(self, spec, urn, resource_props_hash, violations):
+        """Records the (urn, message) pairs reported for the resource."""
+        self._pending.append((spec.name, urn, policy_version(spec), resource_props_hash, json.dumps(violations)))
+
+    def flush(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", self._pending)
+            del self._pending[:]
+
+    def close(self):
+        self.flush()
+        self._db.close()
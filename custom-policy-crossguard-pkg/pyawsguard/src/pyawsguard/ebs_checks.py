@@ -14,39 +14,26 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
 from pulumi import log
 
-import pulumi_aws as aws
-import json
-import time
-import os
-import datetime
+from pyawsguard.props import UNKNOWN, view_of
 
 ###################################
 # EBS Volume
 ###################################
 # EBS Encryption validator
-def ebs_encryption_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:ebs/volume:Volume": 
-        if "encrypted" not in args.props:
-            log.error("ebs,"+args.name + ",encrypted,false")
-            report_violation(
-                "Encryption is not enabled for the EBS Volume " + args.name )
-        elif args.props["encrypted"] != True:
-            log.error(args.name + "\tencrypted\tfalse")
-            report_violation(
-                "Encryption is not enabled for the EBS Volume " + args.name )
-
-ebs_encryption_policy = ResourceValidationPolicy(
-    name="ebs_encryption_policy",
-    description="Validating encryption configuration on EBS volumes.",
-    validate=ebs_encryption_validator,
-)
\ No newline at end of file
+def ebs_encryption_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    encrypted = view_of(args).encrypted
+    if encrypted is None:
+        log.error("ebs,"+args.name + ",encrypted,false")
+        report_violation(
+            "Encryption is not enabled for the EBS Volume " + args.name )
+    elif encrypted != True and encrypted is not UNKNOWN:
+        log.error(args.name + "\tencrypted\tfalse")
+        report_violation(
+            "Encryption is not enabled for the EBS Volume " + args.name )
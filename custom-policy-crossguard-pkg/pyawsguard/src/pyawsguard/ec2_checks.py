@@ -14,80 +14,67 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from pulumi import log
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+from pyawsguard.props import UNKNOWN, view_of
+from pyawsguard.security_groups import PortSet, format_ports, ingress_rules, internet_exposed_ports, sensitive_ports
 
+SSH_PORT = PortSet((22,))
+
+# Read once, when the first security group is validated
+SENSITIVE_PORTS = sensitive_ports()
+
+
+@lru_cache(maxsize=16)
+def _port_set(ports):
+    # The PortSet of the 'ports' parameter (a tuple) of the pack configuration
+    return SENSITIVE_PORTS if ports is None else PortSet(ports)
 
 ###################################
 # EC2 - Security Groups
 ###################################
 # Default Security Group Ingress rules validator
-def secgrp_default_no_ingress_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup":
-        if "ingress" in args.props and args.props["ingress"] != None and (len(args.props["ingress"]) > 0):
-            report_violation(
-                "There should be no Ingress rules in the VPC's Default security group " + args.name)
-
-secgrp_default_no_ingress = ResourceValidationPolicy(
-    name="secgrp-default-no-ingress",
-    description="Validating that the default security group of VPC has ingress rules",
-    validate=secgrp_default_no_ingress_validator,
-)
+def secgrp_default_no_ingress_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    ingress = view_of(args).ingress
+    if ingress and ingress is not UNKNOWN:
+        report_violation(
+            "There should be no Ingress rules in the VPC's Default security group " + args.name)
 
 # Default Security Group Egress rules validator
-def secgrp_default_no_egress_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup":
-        if "egress" in args.props and args.props["egress"] != None and (len(args.props["egress"]) > 0):
-            report_violation(
-                "There should be no Egress rules in the VPC's Default security group " + args.name)
-
-secgrp_default_no_egress = ResourceValidationPolicy(
-    name="secgrp-default-no-egress",
-    description="Validating that the default security group of VPC has egress rules",
-    validate=secgrp_default_no_egress_validator,
-)
+def secgrp_default_no_egress_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    egress = view_of(args).egress
+    if egress and egress is not UNKNOWN:
+        report_violation(
+            "There should be no Egress rules in the VPC's Default security group " + args.name)
 
 # Security Group SSH Ingress rules validator
-def security_grp_ssh_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:ec2/securityGroup:SecurityGroup": 
-        if "ingress" in args.props:
-            for ingress_rule in args.props["ingress"]:
-                if int(ingress_rule["fromPort"]) == 22 and int(ingress_rule["toPort"]) == 22 and ingress_rule["cidrBlocks"][0] == "0.0.0.0/0":
-                    report_violation(
-                        "This Security group " + args.name + " has allowed SSH access from all addresses."
-                    )
-                    break
-
-security_grp_ssh_policy_1 = ResourceValidationPolicy(
-    name="security-group-ssh-policy",
-    description="Validating if port 22 is open to all IPs for incoming SSH connections.",
-    validate=security_grp_ssh_validator,
-)
+def security_grp_ssh_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    if internet_exposed_ports(ingress_rules(view_of(args)), SSH_PORT):
+        report_violation(
+            "This Security group " + args.name + " has allowed SSH access from all addresses."
+        )
 
 # Security Group Rules Ingress validator
-def security_grp_rule_ssh_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:ec2/securityGroupRule:SecurityGroupRule": 
-        if "type" in args.props and args.props["type"] == "ingress":
-            if int(args.props["fromPort"]) == 22 and int(args.props["toPort"]) == 22 and args.props["cidrBlocks"][0] == "0.0.0.0/0":
-                report_violation(
-                    "This Security group " + args.name + " has allowed SSH access from all addresses " 
-               )
+def security_grp_rule_ssh_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    if internet_exposed_ports(ingress_rules(view_of(args), rule_resource=True), SSH_PORT):
+        report_violation(
+            "This Security group " + args.name + " has allowed SSH access from all addresses "
+        )
+
+# Security Group sensitive ports validator
+def security_grp_sensitive_ports_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation", ports=None):
+    exposed = internet_exposed_ports(ingress_rules(view_of(args)), _port_set(ports))
+    if exposed:
+        report_violation(
+            "This Security group " + args.name + " allows access from all addresses to ports " + format_ports(exposed))
 
-security_grp_ssh_policy_2 = ResourceValidationPolicy(
-    name="security-group-ssh-policy",
-    description="Validating if port 22 is open to all IPs for incoming SSH connections.",
-    validate=security_grp_rule_ssh_validator,
-)
\ No newline at end of file
+# Security Group Rule sensitive ports validator
+def security_grp_rule_sensitive_ports_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation", ports=None):
+    exposed = internet_exposed_ports(ingress_rules(view_of(args), rule_resource=True), _port_set(ports))
+    if exposed:
+        report_violation(
+            "This Security group rule " + args.name + " allows access from all addresses to ports " + format_ports(exposed))
@@ -14,64 +14,34 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-def default_log_types_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:eks/cluster:Cluster":
-        if "enabled_cluster_log_types" not in args.props or args.props["enabled_cluster_log_types"] is None:
-            report_violation(
-                "EKS Cluster should have all three log types (api, audit, authenticator) enabled by default")
-        else:
-            logTypes = args.props["enabledClusterLogTypes"]
-            if len(logTypes) < 3:
-                report_violation(
-                    "EKS Cluster should have all three log types (api, audit, authenticator) enabled by default")
-            elif "api" not in logTypes or "audit" not in logTypes or "authenticator" not in logTypes:
-                report_violation(
-                    "EKS Cluster should have all three log types (api, audit, authenticator) enabled by default")
+from pyawsguard.props import UNKNOWN, view_of
 
-default_log_types_policy = ResourceValidationPolicy(
-    name="eks-cluster-default-logs",
-    description="Validating if EKS Cluster has all three log types enabled by default",
-    validate=default_log_types_validator,
-)
+DEFAULT_LOG_TYPES = ("api", "audit", "authenticator")
 
-def tags_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:eks/cluster:Cluster":
-        if "tags" not in args.props or args.props["tags"] is None:
-            report_violation("EKS Cluster should have default tags")
-        else:
-            tags = args.props["tags"]
-            if "Name" not in tags or "env" not in tags or tags["Name"] is None or tags["env"] is None:
-                report_violation("EKS Cluster should have default tags")
+DEFAULT_REQUIRED_TAGS = ("Name", "env")
 
-tags_policy = ResourceValidationPolicy(
-    name="eks-cluster-tags_policy",
-    description="Validating if EKS Cluster has tags by default",
-    validate=tags_validator,
-)
+def default_log_types_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    log_types = view_of(args).enabled_cluster_log_types
+    if log_types is UNKNOWN or (log_types is not None and UNKNOWN in log_types):
+        return
+    if log_types is None or not all(log_type in log_types for log_type in DEFAULT_LOG_TYPES):
+        report_violation(
+            "EKS Cluster should have all three log types (api, audit, authenticator) enabled by default")
 
-def kms_key_for_encryption_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:eks/cluster:Cluster": 
-        if "encryption_config_key_arn" not in args.props or args.props["encryption_config_key_arn"] is None:
-            report_violation(
-                "Kubernetes Services should have AWS KMS key configured for encryption of secrets")
-
-kms_key_for_encryption_policy = ResourceValidationPolicy(
-    name="eks-cluster-kms-key",
-    description="Validating if EKS Cluster has AWS KMS key configured",
-    validate=kms_key_for_encryption_validator,
-)
+def tags_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation", required_tags=DEFAULT_REQUIRED_TAGS):
+    tags = view_of(args).tags
+    if tags is UNKNOWN:
+        return
+    if tags is None or any(tags.get(key) is None for key in required_tags):
+        report_violation("EKS Cluster should have default tags")
 
+def kms_key_for_encryption_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    # encryptionConfig.provider.keyArn, encryption_config.provider.key_arn in snake_case
+    if view_of(args).encryption_key_arn is None:
+        report_violation(
+            "Kubernetes Services should have AWS KMS key configured for encryption of secrets")
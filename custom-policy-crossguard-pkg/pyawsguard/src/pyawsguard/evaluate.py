@@ -0,0 +1,631 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Offline evaluation of the pyawsguard policies.
+#
+# Runs the same validators as the PolicyPack in-process against the resources of a
+# 'pulumi preview --json' document or a 'pulumi stack export', without the Pulumi CLI,
+# a backend login or AWS credentials:
+#
+#   python -m pyawsguard.evaluate plan.json [stack.json ...]
+#
+# The violations are printed in the same layout as the 'Policy Violations:' section of
+# 'pulumi preview', so preview_parser.py can read either. The exit code is 1 when a
+# mandatory violation was found. When several documents are given (for example one stack
+# export per account) they are evaluated in parallel worker processes and merged into one
+# report.
+# With --cache-dir, results are reused for resources that did not change since the
+# previous run (see cache.py). With --shard INDEX/COUNT only the resources whose URN
+# hashes into the shard are validated, and --merge combines the outputs of the shards
+# into the report of an unsharded run.
+# Every mode runs the policies the pack configuration of PYAWSGUARD_PACK_CONFIG leaves
+# active for the stack, at their configured levels (see pack_config.py).
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from operator import itemgetter
+
+from pyawsguard.cache import ResultCache, props_hash
+from pyawsguard.pack_config import active_registry, registry_from_environment
+from pyawsguard.registry import PACK_NAME
+from pyawsguard.resource_graph import IDENTIFIER_PROPERTIES, TYPE_IDENTIFIER_PROPERTIES, ResourceGraph
+
+try:
+    # Optional: streams the resources out of the document instead of loading it whole
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+# Level of the policies that do not set their own, the level of the PolicyPack
+ENFORCEMENT_LEVEL = "mandatory"
+
+# Where the resources live in each of the supported documents
+_STACK_EXPORT_PREFIX = "deployment.resources.item"
+_PREVIEW_PREFIX = "steps.item"
+
+Violation = namedtuple("Violation", ["policy_name", "description", "resource_type", "urn", "name", "message",
+                                     "enforcement_level"])
+
+# The properties each stack policy of the pack reads, by resource type, besides the ones
+# identifying a resource (see resource_graph.py). Until the stack policies run, only
+# these are kept of the resources of these types, and nothing of the other resources.
+# Stack policies not listed here are given every resource whole.
+STACK_POLICY_PROPERTIES = {
+    "stack_checks:vpc_flow_log_coverage_validator": {
+        "aws:ec2/vpc:Vpc": (),
+        "aws:ec2/flowLog:FlowLog": ("vpcId", "trafficType"),
+    },
+    "stack_checks:s3_bucket_protection_validator": {
+        "aws:s3/bucket:Bucket": (),
+        "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock": ("bucket",),
+        "aws:s3/bucketPolicy:BucketPolicy": ("bucket", "policy"),
+    },
+    "stack_checks:ebs_kms_key_rotation_validator": {
+        "aws:ebs/volume:Volume": ("kmsKeyId",),
+        "aws:kms/key:Key": ("enableKeyRotation",),
+    },
+}
+
+DocumentResult = namedtuple("DocumentResult", ["path", "resources", "violations", "cache_hits", "cache_misses"])
+
+
+class ResourceArgs:
+    """Stand-in for pulumi_policy.ResourceValidationArgs with the attributes the
+    validators read."""
+
+    __slots__ = ("resource_type", "props", "urn", "name", "opts", "provider", "id", "outputs",
+                 "property_dependencies")
+
+    def __init__(self, resource_type, props, urn, name=None, opts=None, provider=None, id=None, outputs=None,
+                 property_dependencies=None):
+        self.resource_type = resource_type
+        self.props = props
+        self.urn = urn
+        self.name = name if name is not None else urn.rsplit("::", 1)[-1]
+        self.opts = opts
+        self.provider = provider
+        # Used by the stack policies to resolve references between resources
+        self.id = id
+        self.outputs = outputs
+        self.property_dependencies = property_dependencies or {}
+
+    def get_config(self):
+        return {}
+
+    def __repr__(self):
+        return "ResourceArgs(%r)" % self.urn
+
+
+def resource_from_state(state):
+    """ResourceArgs for a resource state of a stack export or preview step, or None for
+    resources the policies never see (providers and component resources)."""
+    if not state.get("custom", True) or state["type"].startswith("pulumi:"):
+        return None
+    props = state.get("inputs")
+    if props is None:
+        props = state.get("outputs") or {}
+    return ResourceArgs(state["type"], props, state["urn"], provider=state.get("provider"), id=state.get("id"),
+                        outputs=state.get("outputs"), property_dependencies=state.get("propertyDependencies"))
+
+
+class StackArgs:
+    """Stand-in for pulumi_policy.StackValidationArgs, sharing one ResourceGraph between
+    the stack policies."""
+
+    __slots__ = ("resources", "graph")
+
+    def __init__(self, resources):
+        self.resources = resources
+        self.graph = ResourceGraph(resources)
+
+    def get_config(self):
+        return {}
+
+
+class StackResources:
+    """What the stack policies of policy_registry read of the resources added, kept while
+    the resource policies stream through a document. count is the number added."""
+
+    __slots__ = ("resources", "properties", "count")
+
+    def __init__(self, policy_registry):
+        self.resources = []
+        self.properties = _stack_properties(policy_registry.stack_specs)
+        self.count = 0
+
+    def add(self, args):
+        self.count += 1
+        if self.properties is None:
+            self.resources.append(args)
+            return
+        keys = self.properties.get(args.resource_type)
+        if keys is not None:
+            self.resources.append(ResourceArgs(args.resource_type, _select(args.props, keys), args.urn, args.name,
+                                               id=args.id, outputs=_select(args.outputs, keys),
+                                               property_dependencies=_select(args.property_dependencies, keys)))
+
+
+def _stack_properties(stack_specs):
+    # {resource type: properties read}, None when a stack policy may read anything
+    properties = {}
+    for spec in stack_specs:
+        reads = STACK_POLICY_PROPERTIES.get(spec.validator_ref)
+        if reads is None:
+            return None
+        for resource_type, keys in reads.items():
+            properties[resource_type] = properties.get(resource_type, ()) + keys
+    return {resource_type: frozenset(keys + IDENTIFIER_PROPERTIES + TYPE_IDENTIFIER_PROPERTIES.get(resource_type, ()))
+            for resource_type, keys in properties.items()}
+
+
+def _select(values, keys):
+    if not values:
+        return values
+    return {key: value for key, value in values.items() if key in keys}
+
+
+def resources_from_document(document):
+    """Resources of an already parsed preview or stack export document."""
+    if "deployment" in document:
+        states = document["deployment"].get("resources") or []
+    elif "steps" in document:
+        states = (step.get("newState") for step in document["steps"])
+    else:
+        # A bare checkpoint as found in the state backend
+        states = document.get("checkpoint", {}).get("latest", {}).get("resources") or []
+    for state in states:
+        if state is None:
+            continue
+        resource = resource_from_state(state)
+        if resource is not None:
+            yield resource
+
+
+def load_resources(path):
+    """Resources of the preview or stack export document at path ('-' for stdin)."""
+    f = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        if ijson is None:
+            yield from resources_from_document(json.load(f))
+            return
+        for prefix, item in _stream_items(f, (_STACK_EXPORT_PREFIX, _PREVIEW_PREFIX)):
+            state = item.get("newState") if prefix == _PREVIEW_PREFIX else item
+            if state is None:
+                continue
+            resource = resource_from_state(state)
+            if resource is not None:
+                yield resource
+    finally:
+        if path != "-":
+            f.close()
+
+
+def _stream_items(f, prefixes):
+    # Builds the array items found under any of the prefixes one at a time
+    builder = None
+    current = None
+    for prefix, event, value in ijson.parse(f):
+        if builder is None:
+            if event == "start_map" and prefix in prefixes:
+                builder = ObjectBuilder()
+                current = prefix
+                builder.event(event, value)
+            continue
+        builder.event(event, value)
+        if event == "end_map" and prefix == current:
+            yield current, builder.value
+            builder = None
+
+
+def evaluate(resources, policy_registry=None, cache=None):
+    """Runs the registered validators over resources and yields a Violation for every
+    reported violation. policy_registry defaults to the policies of the pack
+    configuration (pack_config.registry_from_environment).
+
+    With a ResultCache, validators are skipped for resources whose properties are
+    unchanged since the cache last saw them and the cached violations are replayed.
+    The stack policies run last, over what they read of all the resources (see
+    StackResources), and are never cached.
+    """
+    policy_registry = policy_registry or registry_from_environment()
+    violations = []
+    stack_resources = StackResources(policy_registry) if policy_registry.stack_specs else None
+    for args in resources:
+        if stack_resources is not None:
+            stack_resources.add(args)
+        _validate(args, policy_registry.specs_for(args.resource_type), cache, violations)
+        if violations:
+            yield from violations
+            del violations[:]
+
+    if stack_resources is not None:
+        _validate_stack(stack_resources, policy_registry, violations)
+        yield from violations
+
+
+def evaluate_shard(resources, shard, policy_registry=None, cache=None):
+    """evaluate() for one shard, shard=(index, count), of resources: only the resources
+    whose URN falls in the shard (see shard_of) are validated. The stack policies run in
+    shard 0, over all the resources.
+
+    Yields (position, violation), where position is the index of the violation's resource
+    in resources (the number of resources for the stack policies), which merge_shards
+    uses to restore the order of an unsharded run.
+    """
+    policy_registry = policy_registry or registry_from_environment()
+    index, count = shard
+    violations = []
+    stack_resources = StackResources(policy_registry) if index == 0 and policy_registry.stack_specs else None
+    position = 0
+    for position, args in enumerate(resources):
+        if stack_resources is not None:
+            stack_resources.add(args)
+        if shard_of(args.urn, count) != index:
+            continue
+        _validate(args, policy_registry.specs_for(args.resource_type), cache, violations)
+        if violations:
+            for violation in violations:
+                yield position, violation
+            del violations[:]
+
+    if stack_resources is not None:
+        _validate_stack(stack_resources, policy_registry, violations)
+        for violation in violations:
+            yield stack_resources.count, violation
+
+
+def shard_of(urn, count):
+    """The shard, out of count, of the resource with urn; the same in every process and
+    on every host (unlike hash())."""
+    return int.from_bytes(hashlib.sha1(urn.encode("utf-8")).digest()[:8], "big") % count
+
+
+def _validate(args, specs, cache, violations):
+    if cache is None:
+        for spec in specs:
+            spec.validator(args, _reporter(violations, spec, args))
+    elif specs:
+        resource_props_hash = props_hash(args.props)
+        for spec in specs:
+            cached = cache.get(spec, args.urn, resource_props_hash)
+            if cached is not None:
+                for urn, message in cached:
+                    violations.append(Violation(spec.name, spec.description, args.resource_type, urn, args.name,
+                                                message, spec.enforcement_level or ENFORCEMENT_LEVEL))
+                continue
+            reported = len(violations)
+            spec.validator(args, _reporter(violations, spec, args))
+            cache.put(spec, args.urn, resource_props_hash,
+                      [(violation.urn, violation.message) for violation in violations[reported:]])
+
+
+def _validate_stack(stack_resources, policy_registry, violations):
+    stack_args = StackArgs(stack_resources.resources)
+    for spec in policy_registry.stack_specs:
+        spec.validator(stack_args, _stack_reporter(violations, spec))
+
+
+def _reporter(violations, spec, args):
+    def report_violation(message, urn=None):
+        violations.append(Violation(spec.name, spec.description, args.resource_type, urn or args.urn, args.name,
+                                    message, spec.enforcement_level or ENFORCEMENT_LEVEL))
+
+    return report_violation
+
+
+def _stack_reporter(violations, spec):
+    def report_violation(message, urn=None):
+        # urn:pulumi:<stack>::<project>::<parent type$type>::<name>
+        parts = urn.split("::", 3) if urn else ()
+        resource_type = parts[2].rsplit("$", 1)[-1] if len(parts) == 4 else ""
+        name = parts[3] if len(parts) == 4 else ""
+        violations.append(Violation(spec.name, spec.description, resource_type, urn or "", name, message,
+                                    spec.enforcement_level or ENFORCEMENT_LEVEL))
+
+    return report_violation
+
+
+def format_violation(violation):
+    """The violation as printed in the 'Policy Violations:' section of 'pulumi preview'."""
+    return "    [%s]  %s  %s (%s: %s)\n    %s\n    %s" % (
+        violation.enforcement_level,
+        PACK_NAME,
+        violation.policy_name,
+        violation.resource_type,
+        violation.name,
+        violation.description,
+        violation.message,
+    )
+
+
+def violation_to_json(violation, document=None):
+    record = violation._asdict()
+    record["pack"] = PACK_NAME
+    if document is not None:
+        record["document"] = document
+    return json.dumps(record, sort_keys=True)
+
+
+def evaluate_document(path, cache_dir=None, bulk=False, shard=None, stream=False, pack=None):
+    """Evaluates a single document and returns its DocumentResult.
+
+    bulk evaluates the simple property checks per column instead of per resource (see
+    bulk.py). With shard=(index, count) only that
+    shard is evaluated (see evaluate_shard) and the violations are (position, violation)
+    pairs. With stream, the result is a StreamedResult whose violations are yielded
+    as the document is evaluated, rather than collected into a list. pack, (pack
+    configuration path, stack), selects the policies instead of the environment (the
+    daemon evaluates for its clients' environments).
+    """
+    result = StreamedResult(path)
+    policy_registry = active_registry(*pack) if pack is not None else registry_from_environment()
+    result.violations = _document_violations(result, policy_registry, cache_dir, bulk, shard)
+    if stream:
+        return result
+    violations = list(result.violations)
+    return DocumentResult(path, result.resources, violations, result.cache_hits, result.cache_misses)
+
+
+class StreamedResult:
+    """A DocumentResult whose violations are a generator: resources and the cache
+    counts are final once it is exhausted."""
+
+    __slots__ = ("path", "resources", "violations", "cache_hits", "cache_misses")
+
+    def __init__(self, path):
+        self.path = path
+        self.resources = 0
+        self.violations = ()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def _document_violations(result, policy_registry, cache_dir, bulk, shard):
+    cache = ResultCache.in_directory(cache_dir) if cache_dir else None
+
+    def counted(resources):
+        for resource in resources:
+            result.resources += 1
+            yield resource
+
+    try:
+        if bulk:
+            from pyawsguard.bulk import evaluate_bulk
+
+            yield from evaluate_bulk(counted(load_resources(result.path)), policy_registry, cache)
+        elif shard is not None:
+            yield from evaluate_shard(counted(load_resources(result.path)), shard, policy_registry, cache)
+        else:
+            yield from evaluate(counted(load_resources(result.path)), policy_registry, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+            result.cache_hits = cache.hits
+            result.cache_misses = cache.misses
+
+
+def evaluate_documents(paths, jobs=None, cache_dir=None, bulk=False, shard=None):
+    """Evaluates many documents, one per worker process, and yields the result of
+    evaluate_document for each of them in the order of paths.
+
+    The validators are CPU bound, so documents are sharded across a process pool
+    rather than threads. jobs defaults to the number of CPUs; with a single job,
+    a single document or stdin the documents are evaluated in this process, and
+    their violations streamed (StreamedResult); each must be exhausted before the next
+    document is evaluated.
+    """
+    paths = list(paths)
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    if jobs <= 1 or "-" in paths:
+        for path in paths:
+            yield evaluate_document(path, cache_dir, bulk, shard, stream=True)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(partial(evaluate_document, cache_dir=cache_dir, bulk=bulk, shard=shard), paths)
+
+
+def write_shard(out, results, shard):
+    """Writes the DocumentResults of a shard run to out, one JSON record per line: a
+    header per document followed by its violations and their positions. Returns the
+    number of violations."""
+    found = 0
+    for result in results:
+        # The violations come first, so the header has the counts of a streamed result
+        lines = [json.dumps({"document": result.path, "position": position, "violation": violation._asdict()},
+                            sort_keys=True) + "\n"
+                 for position, violation in result.violations]
+        out.write(json.dumps({"document": result.path, "shard": list(shard), "resources": result.resources,
+                              "cache_hits": result.cache_hits, "cache_misses": result.cache_misses},
+                             sort_keys=True) + "\n")
+        out.writelines(lines)
+        found += len(lines)
+    return found
+
+
+def merge_shards(paths):
+    """The DocumentResults of an unsharded run, from the files written by the shard runs
+    (write_shard) of the same documents. Every shard must be present exactly once."""
+    documents = OrderedDict()
+    count = None
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if "shard" in record:
+                    index, shards = record["shard"]
+                    if count is None:
+                        count = shards
+                    elif shards != count:
+                        raise ValueError("%s: shard %d/%d of a run with %d shards" % (path, index, shards, count))
+                    merged = documents.setdefault(record["document"], _MergedDocument(record["resources"]))
+                    if index in merged.shards:
+                        raise ValueError("%s: shard %d/%d of %s given twice" % (path, index, count, record["document"]))
+                    if record["resources"] != merged.resources:
+                        raise ValueError("%s: %s has %d resources in shard %d, %d in another shard"
+                                         % (path, record["document"], record["resources"], index, merged.resources))
+                    merged.shards.add(index)
+                    merged.cache_hits += record["cache_hits"]
+                    merged.cache_misses += record["cache_misses"]
+                else:
+                    documents[record["document"]].violations.append(
+                        (record["position"], Violation(**record["violation"])))
+    for path, merged in documents.items():
+        missing = sorted(set(range(count)) - merged.shards)
+        if missing:
+            raise ValueError("%s: missing shards %s of %d" % (path, ", ".join(map(str, missing)), count))
+        # Stable: the violations of a resource keep the order its shard reported them in
+        merged.violations.sort(key=itemgetter(0))
+        yield DocumentResult(path, merged.resources, [violation for _, violation in merged.violations],
+                             merged.cache_hits, merged.cache_misses)
+
+
+class _MergedDocument:
+    __slots__ = ("resources", "shards", "violations", "cache_hits", "cache_misses")
+
+    def __init__(self, resources):
+        self.resources = resources
+        self.shards = set()
+        self.violations = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def _shard(value):
+    # "index/count" -> (index, count)
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected INDEX/COUNT, e.g. 0/4: %r" % value)
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard index must be in 0..%d: %r" % (count - 1, value))
+    return index, count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyawsguard.evaluate",
+        description="Evaluate the pyawsguard policies against 'pulumi preview --json' or 'pulumi stack export' documents.",
+    )
+    parser.add_argument("documents", nargs="+", help="preview or stack export JSON files, '-' for stdin")
+    parser.add_argument("--format", choices=("text", "json"), default="text",
+                        help="'text' mirrors the pulumi preview output, 'json' writes one violation per line")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of documents evaluated in parallel (default: number of CPUs)")
+    parser.add_argument("--cache-dir", default=os.environ.get("PYAWSGUARD_CACHE_DIR"),
+                        help="directory of the incremental result cache (default: $PYAWSGUARD_CACHE_DIR, disabled if unset)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="evaluate the simple property checks per column, for audits of large stacks "
+                             "(uses NumPy when installed)")
+    parser.add_argument("--daemon", default=os.environ.get("PYAWSGUARD_DAEMON"), metavar="SOCKET",
+                        help="evaluate on the pyawsguard daemon listening on SOCKET, in this process if it is "
+                             "unreachable (default: $PYAWSGUARD_DAEMON)")
+    parser.add_argument("--sarif", metavar="PATH", help="also write the violations to a SARIF report")
+    parser.add_argument("--junit", metavar="PATH", help="also write the violations to a JUnit XML report")
+    parser.add_argument("--shard", type=_shard, metavar="INDEX/COUNT",
+                        help="only validate the resources of shard INDEX out of COUNT (by URN hash) and write its "
+                             "violations as JSON lines for --merge; shard 0 also runs the stack policies")
+    parser.add_argument("--merge", action="store_true",
+                        help="the documents are the outputs of the --shard runs; report them as one unsharded run")
+    options = parser.parse_args(argv)
+    if options.shard and (options.bulk or options.merge or options.sarif or options.junit):
+        parser.error("--shard cannot be combined with --bulk, --merge, --sarif or --junit")
+
+    start = time.perf_counter()
+    documents = 0
+    resources = 0
+    found = 0
+    mandatory = 0
+    hits = 0
+    misses = 0
+    out = sys.stdout
+    results = None
+    if options.shard:
+        results = evaluate_documents(options.documents, options.jobs, options.cache_dir, shard=options.shard)
+        found = write_shard(out, results, options.shard)
+        sys.stderr.write("Evaluated shard %d/%d of %d documents in %.1f ms: %d violations\n"
+                         % (options.shard + (len(options.documents), (time.perf_counter() - start) * 1000, found)))
+        # The exit code of the run is the one of --merge
+        return 0
+    if options.merge:
+        try:
+            results = list(merge_shards(options.documents))
+        except (OSError, ValueError, KeyError) as error:
+            sys.stderr.write("Cannot merge the shards: %s\n" % error)
+            return 2
+    elif options.daemon and "-" not in options.documents:
+        from pyawsguard.daemon import DaemonClient, DaemonError
+
+        try:
+            client = DaemonClient(options.daemon)
+            results, saved_ms = client.evaluate(options.documents, options.cache_dir, options.bulk)
+            client.close()
+            sys.stderr.write("Evaluated by the daemon on %s, %.1f ms of startup saved\n" % (options.daemon, saved_ms))
+        except DaemonError as error:
+            sys.stderr.write("pyawsguard daemon unavailable, evaluating in process: %s\n" % error)
+    if results is None:
+        results = evaluate_documents(options.documents, options.jobs, options.cache_dir, options.bulk)
+    with contextlib.ExitStack() as stack:
+        writers = []
+        if options.sarif or options.junit:
+            from pyawsguard.reports import JUnitWriter, SarifWriter, from_violation
+
+            if options.sarif:
+                writers.append(stack.enter_context(SarifWriter(stack.enter_context(open(options.sarif, "w")))))
+            if options.junit:
+                active = registry_from_environment()
+                policies = [(spec.name, spec.description) for spec in active.specs + active.stack_specs]
+                writers.append(stack.enter_context(
+                    JUnitWriter(stack.enter_context(open(options.junit, "w")), policies=policies, pack=PACK_NAME)))
+        for result in results:
+            documents += 1
+            for violation in result.violations:
+                if options.format == "json":
+                    out.write(violation_to_json(violation, document=result.path) + "\n")
+                else:
+                    if not found:
+                        out.write("Policy Violations:\n")
+                    out.write(format_violation(violation) + "\n")
+                for writer in writers:
+                    writer.write(from_violation(violation, PACK_NAME, violation.enforcement_level))
+                found += 1
+                if violation.enforcement_level == "mandatory":
+                    mandatory += 1
+            # Final once the violations of a streamed result are exhausted
+            resources += result.resources
+            hits += result.cache_hits
+            misses += result.cache_misses
+
+    elapsed = time.perf_counter() - start
+    sys.stderr.write("Evaluated %d resources from %d documents in %.1f ms: %d violations (%d mandatory)\n"
+                     % (resources, documents, elapsed * 1000, found, mandatory))
+    if options.cache_dir:
+        lookups = hits + misses
+        sys.stderr.write("Result cache %s: %d hits, %d misses (%.1f%% hit rate)\n"
+                         % (options.cache_dir, hits, misses, 100.0 * hits / lookups if lookups else 0.0))
+    return 1 if mandatory else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
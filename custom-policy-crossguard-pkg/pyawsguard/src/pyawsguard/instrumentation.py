@@ -0,0 +1,184 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Opt-in timing and counters for the validate functions of the PolicyPack.
+#
+# Enabled by setting PYAWSGUARD_STATS to the path of a JSON summary file:
+#
+#   PYAWSGUARD_STATS=stats.json pulumi preview --policy-pack ...
+#
+# Every validate registered by PolicyRegistry.pack_policies() is then wrapped to count
+# its calls, the calls for its own resource type and the violations it reports, and to
+# time each call with perf_counter_ns. The summary holds the cumulative time and the
+# p50/p99 latency of each policy. The engine may stop the analyzer without a clean
+# exit, so the summary is rewritten at most every FLUSH_INTERVAL seconds while
+# resources are validated, and once more at exit.
+#
+# PYAWSGUARD_CPROFILE=<path> additionally runs the validators under cProfile and dumps
+# the profile to path at exit (calls are serialized while profiling).
+
+import atexit
+import json
+import os
+import threading
+import time
+
+STATS_ENV = "PYAWSGUARD_STATS"
+CPROFILE_ENV = "PYAWSGUARD_CPROFILE"
+
+FLUSH_INTERVAL = 1.0
+
+try:
+    _now_ns = time.perf_counter_ns
+except AttributeError:
+    # Python 3.6
+    def _now_ns():
+        return int(time.perf_counter() * 1e9)
+
+
+class ValidatorStats:
+    """Counters and latencies of one instrumented validate function."""
+
+    __slots__ = ("name", "resource_type", "calls", "matched", "violations", "total_ns", "durations")
+
+    def __init__(self, name, resource_type):
+        self.name = name
+        self.resource_type = resource_type
+        self.calls = 0
+        self.matched = 0
+        self.violations = 0
+        self.total_ns = 0
+        # Durations of the calls for the validator's own resource type, the others
+        # only cost the dispatch comparison
+        self.durations = []
+
+    def summary(self):
+        durations = sorted(self.durations)
+        return {
+            "name": self.name,
+            "resource_type": self.resource_type,
+            "calls": self.calls,
+            "matched": self.matched,
+            "violations": self.violations,
+            "total_ms": self.total_ns / 1e6,
+            "matched_ms": sum(durations) / 1e6,
+            "p50_us": _percentile(durations, 50) / 1e3,
+            "p99_us": _percentile(durations, 99) / 1e3,
+            "max_us": (durations[-1] if durations else 0) / 1e3,
+        }
+
+
+def _percentile(values, percent):
+    # Nearest-rank percentile of sorted values
+    if not values:
+        return 0
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
+
+
+class Instrumentation:
+    """Collects ValidatorStats and writes the summary and the profile."""
+
+    def __init__(self, stats_path, profile_path=None):
+        self.stats_path = stats_path
+        self.profile_path = profile_path
+        self.stats = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._profiler = None
+        if profile_path:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+        atexit.register(self.close)
+
+    def instrument(self, spec, validate):
+        """validate wrapped to record its calls in a new ValidatorStats for spec."""
+        stats = ValidatorStats(spec.name, spec.resource_type)
+        self.stats.append(stats)
+        resource_type = spec.resource_type
+        lock = self._lock
+        profiler = self._profiler
+
+        def instrumented(args, report_violation):
+            reported = [0]
+
+            def counting_report_violation(*report_args, **report_kwargs):
+                reported[0] += 1
+                report_violation(*report_args, **report_kwargs)
+
+            start = _now_ns()
+            if profiler is None:
+                validate(args, counting_report_violation)
+            else:
+                with lock:
+                    profiler.runcall(validate, args, counting_report_violation)
+            elapsed = _now_ns() - start
+
+            with lock:
+                stats.calls += 1
+                stats.total_ns += elapsed
+                stats.violations += reported[0]
+                # Stack policies have no resource type and always match
+                if getattr(args, "resource_type", None) == resource_type:
+                    stats.matched += 1
+                    stats.durations.append(elapsed)
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self.write_summary()
+
+        return instrumented
+
+    def summary(self):
+        with self._lock:
+            policies = [stats.summary() for stats in self.stats]
+        policies.sort(key=lambda policy: policy["total_ms"], reverse=True)
+        return {
+            "calls": sum(policy["calls"] for policy in policies),
+            "violations": sum(policy["violations"] for policy in policies),
+            "total_ms": sum(policy["total_ms"] for policy in policies),
+            "policies": policies,
+        }
+
+    def write_summary(self):
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            summary = self.summary()
+            # Written next to the target and renamed, so a reader never sees a partial file
+            temp_path = "%s.%d.tmp" % (self.stats_path, os.getpid())
+            with open(temp_path, "w") as f:
+                json.dump(summary, f, indent=2)
+            os.replace(temp_path, self.stats_path)
+
+    def close(self):
+        self.write_summary()
+        if self._profiler is not None:
+            with self._lock:
+                self._profiler.dump_stats(self.profile_path)
+
+
+_instrumentation = None
+
+
+def from_environment():
+    """The process wide Instrumentation when PYAWSGUARD_STATS is set, else None."""
+    global _instrumentation
+    stats_path = os.environ.get(STATS_ENV)
+    if not stats_path:
+        return None
+    if _instrumentation is None:
+        _instrumentation = Instrumentation(stats_path, os.environ.get(CPROFILE_ENV))
+    return _instrumentation
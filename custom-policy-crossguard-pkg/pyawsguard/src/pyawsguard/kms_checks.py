@@ -14,42 +14,21 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
 
-from pulumi import log
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+from pyawsguard.props import view_of
 
 ###################################
 # KMS Keys
 ###################################
 # KMS Key automatic rotation validation
-def kms_no_automatic_rotation_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:kms/key:Key": 
-        if "enableKeyRotation" in args.props:
-            enable_key_rotation = args.props["enableKeyRotation"]
-            if enable_key_rotation == False:
-                report_violation(
-                    "KMS key automatic rotation should be turned on for key " + args.name )
-                    #"Read more here: https://docs.aws.amazon.com/kms/latest/developerguide/rotate-keys.html")
-        else:
-            report_violation(
-                    "KMS key automatic rotation should be turned on for key " + args.name )
-                    #"Read more here: https://docs.aws.amazon.com/kms/latest/developerguide/rotate-keys.html")
+def kms_no_automatic_rotation_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    enable_key_rotation = view_of(args).enable_key_rotation
+    if enable_key_rotation is None or enable_key_rotation == False:
+        report_violation(
+            "KMS key automatic rotation should be turned on for key " + args.name )
+            #"Read more here: https://docs.aws.amazon.com/kms/latest/developerguide/rotate-keys.html")
         
-
-kms_no_automatic_rotation = ResourceValidationPolicy(
-    name="kms-no-automatic-rotation",
-    description="Validating if KMS key automatic rotation is turned on.",
-    validate=kms_no_automatic_rotation_validator,
-)
\ No newline at end of file
@@ -0,0 +1,248 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Per-stack configuration of the PolicyPack.
+#
+# A pack configuration file (YAML or JSON), read from PYAWSGUARD_PACK_CONFIG, selects the
+# policies of each stack, overrides their enforcement level and sets their parameters:
+#
+#   pack_config:
+#     exclude: [eks-cluster-tags_policy]       # policy names, shell-style patterns
+#     policies:
+#       security-group-sensitive-ports:
+#         parameters: {ports: [23, 3389, 5432]}
+#     stacks:                                  # stack name patterns, applied in order
+#       "dev*":
+#         exclude: ["eks-*", rds_deletion_protection_policy]
+#         policies:
+#           s3-ssl-requests-policy: {enforcement: advisory}
+#       prod:
+#         include: ["*"]
+#
+# The top level applies to every stack; each section of 'stacks' whose pattern matches
+# the stack name (PYAWSGUARD_STACK, else PULUMI_STACK_NAME) is applied over it in file
+# order: 'include' replaces the policies selected so far (all by default), 'exclude' adds
+# to the excluded ones, and 'policies' sets the enforcement level (advisory, mandatory
+# or disabled) and updates the parameters of each policy.
+#
+# The configuration is resolved once per process into an ActiveRuleTable: the policies
+# to register with their enforcement level and the parameters of their validators
+# (keyword arguments of the validator function, bound when the validator is first used,
+# so resolving imports no check module). Excluded and disabled policies are not
+# registered at all, so the engine never sends them a resource.
+#
+# Every entry point runs the policies of active_rules_from_environment(): the PolicyPack
+# registers them, and the offline evaluator in all of its modes, the daemon, the
+# deferred evaluations of the time budgets and policy_check.py evaluate with
+# registry_from_environment(), a PolicyRegistry of the same policies.
+
+import fnmatch
+import hashlib
+import json
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+from pyawsguard.registry import PolicyRegistry, registry
+
+PACK_CONFIG_ENV = "PYAWSGUARD_PACK_CONFIG"
+STACK_ENV = "PYAWSGUARD_STACK"
+
+ENFORCEMENT_LEVELS = ("advisory", "mandatory", "disabled")
+
+# spec: the PolicySpec to register, its validator bound to the parameters
+# enforcement_level: of the configuration, else of the spec; None for the level of the pack
+ActiveRule = namedtuple("ActiveRule", ["spec", "enforcement_level", "parameters"])
+
+# The policies of the pack for one stack: ActiveRules of the resource and stack policies
+# in registration order, and the names of the policies excluded or disabled
+ActiveRuleTable = namedtuple("ActiveRuleTable", ["stack", "rules", "stack_rules", "excluded"])
+
+
+class PackConfig:
+    """A pack configuration document, checked."""
+
+    __slots__ = ("sections",)
+
+    def __init__(self, document):
+        # (stack name pattern, section); the top level applies to every stack
+        self.sections = [("*", _section(document, "top level"))]
+        for pattern, section in (document.get("stacks") or {}).items():
+            self.sections.append((pattern, _section(section or {}, "stack " + pattern)))
+
+    def settings(self, stack):
+        """(include patterns, exclude patterns, {policy: enforcement level},
+        {policy: parameters}) of the sections that apply to stack."""
+        include = ["*"]
+        exclude = []
+        enforcement = {}
+        parameters = {}
+        for pattern, section in self.sections:
+            if not fnmatch.fnmatchcase(stack or "", pattern):
+                continue
+            if section["include"] is not None:
+                include = list(section["include"])
+            exclude.extend(section["exclude"])
+            for name, policy in section["policies"].items():
+                if policy.get("enforcement") is not None:
+                    enforcement[name] = policy["enforcement"]
+                parameters.setdefault(name, {}).update(policy.get("parameters") or {})
+        return include, exclude, enforcement, parameters
+
+    def resolve(self, policy_registry, stack=None):
+        """The ActiveRuleTable of policy_registry's policies for stack."""
+        include, exclude, enforcement, parameters = self.settings(stack)
+        known = {spec.name for spec in policy_registry.specs + policy_registry.stack_specs}
+        for name in sorted(set(enforcement) | set(parameters)):
+            if name not in known:
+                raise ValueError("pack configuration: no policy named %r" % name)
+
+        def active(name):
+            return (any(fnmatch.fnmatchcase(name, pattern) for pattern in include)
+                    and not any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude)
+                    and enforcement.get(name) != "disabled")
+
+        excluded = []
+        tables = ([], [])
+        for table, specs in zip(tables, (policy_registry.specs, policy_registry.stack_specs)):
+            for spec in specs:
+                if not active(spec.name):
+                    if spec.name not in excluded:
+                        excluded.append(spec.name)
+                    continue
+                bound = _frozen(parameters.get(spec.name) or {})
+                level = enforcement.get(spec.name, spec.enforcement_level)
+                if bound or level != spec.enforcement_level:
+                    spec = spec.configured(level, bound, _version(spec, bound))
+                table.append(ActiveRule(spec, level, bound))
+        return ActiveRuleTable(stack, tuple(tables[0]), tuple(tables[1]), tuple(excluded))
+
+
+def _section(section, where):
+    include = section.get("include")
+    if include is not None and not isinstance(include, list):
+        raise ValueError("pack configuration, %s: 'include' must be a list" % where)
+    exclude = section.get("exclude") or []
+    if not isinstance(exclude, list):
+        raise ValueError("pack configuration, %s: 'exclude' must be a list" % where)
+    policies = section.get("policies") or {}
+    for name, policy in policies.items():
+        level = (policy or {}).get("enforcement")
+        if level is not None and level not in ENFORCEMENT_LEVELS:
+            raise ValueError("pack configuration, %s: %s: enforcement must be one of %s"
+                             % (where, name, ", ".join(ENFORCEMENT_LEVELS)))
+        if not isinstance((policy or {}).get("parameters") or {}, dict):
+            raise ValueError("pack configuration, %s: %s: 'parameters' must be a mapping" % (where, name))
+    return {"include": include, "exclude": exclude,
+            "policies": {name: policy or {} for name, policy in policies.items()}}
+
+
+def _frozen(value):
+    # Lists as tuples and mappings as read-only mappings, so a bound parameter can be
+    # neither changed by a validator nor unhashable for its caches
+    if isinstance(value, dict):
+        return MappingProxyType({key: _frozen(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_frozen(item) for item in value)
+    return value
+
+
+def _version(spec, parameters):
+    # Identifies the spec's definition together with its parameters, for the result cache
+    if not parameters:
+        return spec.version
+    version = hashlib.sha256(json.dumps([spec.version, parameters], sort_keys=True, default=dict).encode("utf-8"))
+    return version.hexdigest()[:16]
+
+
+def load_pack_config_file(path):
+    """The pack configuration of a YAML (.yaml, .yml) or JSON file."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    return PackConfig((document or {}).get("pack_config", document or {}))
+
+
+def stack_from_environment():
+    """The name of the stack the pack is loaded for: PYAWSGUARD_STACK, else
+    PULUMI_STACK_NAME (set by the buildspec), else None."""
+    return os.environ.get(STACK_ENV) or os.environ.get("PULUMI_STACK_NAME") or None
+
+
+def active_rules(policy_registry, config=None, stack=None):
+    """The ActiveRuleTable of policy_registry for stack; every policy, at its own level,
+    without a configuration."""
+    if config is None:
+        no_parameters = MappingProxyType({})
+        return ActiveRuleTable(
+            stack,
+            tuple(ActiveRule(spec, spec.enforcement_level, no_parameters) for spec in policy_registry.specs),
+            tuple(ActiveRule(spec, spec.enforcement_level, no_parameters) for spec in policy_registry.stack_specs),
+            (),
+        )
+    return config.resolve(policy_registry, stack)
+
+
+# (registry, configuration path, stack) -> ActiveRuleTable, and -> PolicyRegistry
+_tables = {}
+_registries = {}
+
+
+def active_rules_for(config_path, stack, policy_registry=None):
+    """The ActiveRuleTable of policy_registry (the pack's by default) for stack under the
+    configuration file at config_path (None for none), resolved once per process."""
+    policy_registry = policy_registry or registry
+    key = (policy_registry, config_path, stack)
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = active_rules(
+            policy_registry, load_pack_config_file(config_path) if config_path else None, stack)
+    return table
+
+
+def active_registry(config_path, stack, policy_registry=None):
+    """A PolicyRegistry of the policies of active_rules_for(), for the entry points that
+    evaluate in process; the specs carry the enforcement levels of the table."""
+    policy_registry = policy_registry or registry
+    key = (policy_registry, config_path, stack)
+    active = _registries.get(key)
+    if active is None:
+        table = active_rules_for(config_path, stack, policy_registry)
+        active = _registries[key] = PolicyRegistry([rule.spec for rule in table.rules],
+                                                   [rule.spec for rule in table.stack_rules])
+    return active
+
+
+def environment():
+    """(pack configuration path or None, stack name or None) of the environment:
+    PYAWSGUARD_PACK_CONFIG and stack_from_environment()."""
+    return os.environ.get(PACK_CONFIG_ENV) or None, stack_from_environment()
+
+
+def active_rules_from_environment(policy_registry=None):
+    """The ActiveRuleTable of policy_registry (the pack's by default) for the
+    configuration and the stack of environment(); what the PolicyPack registers."""
+    return active_rules_for(*environment(), policy_registry=policy_registry)
+
+
+def registry_from_environment():
+    """The PolicyRegistry of active_rules_from_environment(); what every entry point
+    that evaluates in process runs."""
+    return active_registry(*environment())
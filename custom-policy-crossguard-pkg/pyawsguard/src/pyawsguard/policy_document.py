@@ -0,0 +1,153 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Parsing of IAM policy documents shared by the resource policy checks (S3, SQS, ...).
+#
+# Generated stacks often attach the same policy text to many buckets and queues, so each
+# distinct document is parsed and normalized once and kept in a bounded LRU cache keyed
+# by a hash of its content. The normalized form removes the shorthand IAM allows:
+#   - Statement is always a tuple of statements
+#   - Principal/NotPrincipal map a principal type to a tuple of values; the "*"
+#     shorthand is {"AWS": ("*",)}
+#   - Action, NotAction, Resource and NotResource are tuples
+#   - Condition maps an operator to {lower-cased condition key: frozenset of values},
+#     with JSON booleans and numbers turned into the strings IAM compares them as
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+CACHE_SIZE = 1024
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class Statement:
+    """A normalized policy statement."""
+
+    __slots__ = ("sid", "effect", "principals", "not_principals", "actions", "not_actions",
+                 "resources", "not_resources", "conditions")
+
+    def __init__(self, raw):
+        self.sid = raw.get("Sid")
+        self.effect = raw.get("Effect")
+        self.principals = _principals(raw.get("Principal"))
+        self.not_principals = _principals(raw.get("NotPrincipal"))
+        self.actions = _strings(raw.get("Action"))
+        self.not_actions = _strings(raw.get("NotAction"))
+        self.resources = _strings(raw.get("Resource"))
+        self.not_resources = _strings(raw.get("NotResource"))
+        self.conditions = _conditions(raw.get("Condition"))
+
+    def is_public(self):
+        """True when the statement applies to anyone ("*" as the principal)."""
+        return "*" in self.principals.get("AWS", ())
+
+    def condition_values(self, operator, key):
+        """The values a condition key is compared against with operator, empty if the
+        statement has no such condition."""
+        return self.conditions.get(operator, {}).get(key.lower(), frozenset())
+
+
+class PolicyDocument:
+    """A normalized policy document."""
+
+    __slots__ = ("version", "id", "statements", "has_statement")
+
+    def __init__(self, raw):
+        self.version = raw.get("Version")
+        self.id = raw.get("Id")
+        self.has_statement = "Statement" in raw
+        statements = raw.get("Statement")
+        if isinstance(statements, dict):
+            statements = [statements]
+        self.statements = tuple(Statement(stmt) for stmt in statements or ())
+
+    def public_statements(self):
+        """Statements that grant access to anyone, i.e. any public statement that is not
+        a Deny."""
+        return [stmt for stmt in self.statements if stmt.effect != "Deny" and stmt.is_public()]
+
+    def requires_secure_transport(self):
+        """True when a Deny statement is conditioned on aws:SecureTransport being false,
+        the usual way of denying requests made without TLS. An Allow with that condition
+        grants access without TLS instead."""
+        return any(stmt.effect == "Deny" and "false" in stmt.condition_values("Bool", "aws:SecureTransport")
+                   for stmt in self.statements)
+
+
+def parse_policy(policy):
+    """The normalized PolicyDocument for policy, a JSON string or an already decoded dict.
+
+    Documents are cached by content hash, so the same text attached to many resources
+    is only parsed once. The returned document is shared and must not be modified.
+    """
+    if not isinstance(policy, str):
+        # Values unknown during a preview (props.UNKNOWN) are written as their repr
+        policy = json.dumps(policy, sort_keys=True, default=repr)
+    key = hashlib.sha1(policy.encode("utf-8")).digest()
+    with _cache_lock:
+        document = _cache.get(key)
+        if document is not None:
+            _cache.move_to_end(key)
+            return document
+    document = PolicyDocument(json.loads(policy))
+    with _cache_lock:
+        _cache[key] = document
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return document
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _strings(value):
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return (value,)
+
+
+def _principals(value):
+    if value is None:
+        return {}
+    if isinstance(value, str):
+        return {"AWS": (value,)}
+    return {kind: _strings(values) for kind, values in value.items()}
+
+
+def _condition_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _conditions(value):
+    if not value:
+        return {}
+    return {
+        operator: {
+            key.lower(): frozenset(_condition_value(v) for v in _strings(values))
+            for key, values in keys.items()
+        }
+        for operator, keys in value.items()
+    }
@@ -0,0 +1,390 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Normalized views of resource properties for the validators.
+#
+# Each type with validators has a view class below, with one attribute per property its
+# validators read. A property is read from its camelCase key and then its snake_case
+# key (the spelling of Python programs and of some state files), with plain dict
+# lookups; nested properties go through a key table made by key_table() from the dotted
+# camelCase path (integer segments index into lists). Most views read their properties
+# when they are made; the LazyPropertyView ones, of the types whose validators each read
+# a different property, when the attribute is read. view_class() makes a view class
+# from such paths, for the rule files (rules.py).
+#
+# view_of(args) returns a new view of the view class of the resource's type, or a
+# GenericView for the types without one; validators then read plain attributes:
+#
+# - an absent property, or one set to null, reads as None
+# - a value that is unknown during a preview reads as UNKNOWN (resource_graph), also
+#   inside lists and dicts, whether the props come from the policy SDK (unknown checking
+#   proxies) or from a preview document (sentinel strings)
+# - lists and dicts are returned as plain lists and dicts
+
+import re
+from collections.abc import Mapping, Sequence
+
+from pyawsguard.resource_graph import UNKNOWN
+
+# How the engine writes a value that is unknown during a preview, by type (see
+# pulumi_policy.proxy): boolean, number, string, array, asset, archive, object
+UNKNOWN_VALUES = frozenset((
+    "1c4a061d-8072-4f0a-a4cb-0ff528b18fe7",
+    "3eeb2bf0-c639-47a8-9e75-3b44932eb421",
+    "04da6b54-80e4-46f7-96ec-b56ff0331ba9",
+    "6a19a0b0-7e62-4c92-b797-7f8e31da9cc2",
+    "030794c1-ac77-496b-92df-f27374a8bd58",
+    "e48ece36-62e2-4504-bad9-02848725956a",
+    "dd056dcd-154b-4c76-9bd3-c8f88648b5ff",
+))
+
+# Types of the values resolve() returns as they are
+_SCALARS = frozenset((bool, int, float))
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def snake_case(key):
+    """enabledClusterLogTypes -> enabled_cluster_log_types"""
+    return _CAMEL_BOUNDARY.sub("_", key).lower()
+
+
+def key_table(path):
+    """The keys probed at each level of a dotted path: a list index, or the camelCase
+    key followed by its snake_case spelling when it differs."""
+    table = []
+    for segment in path.split("."):
+        if segment.isdigit():
+            table.append(int(segment))
+        else:
+            snake = snake_case(segment)
+            table.append((segment,) if snake == segment else (segment, snake))
+    return tuple(table)
+
+
+def _target(value):
+    # The dict or list an unknown checking proxy of the policy SDK wraps
+    if isinstance(value, (dict, list, str)):
+        return value
+    if isinstance(value, (Mapping, Sequence)):
+        return value["__target"]
+    return value
+
+
+def resolve(props, table):
+    """The value at the key table's path in props, normalized as described above."""
+    value = props
+    for keys in table:
+        kind = type(value)
+        if kind is not dict and kind is not list:
+            value = _target(value)
+            kind = type(value)
+        if kind is dict and keys.__class__ is tuple:
+            found = value.get(keys[0])
+            if found is None and len(keys) > 1:
+                found = value.get(keys[1])
+            value = found
+        elif kind is list and keys.__class__ is int:
+            value = value[keys] if keys < len(value) else None
+        else:
+            return None
+        if value is None:
+            return None
+    kind = type(value)
+    if kind is str:
+        return UNKNOWN if value in UNKNOWN_VALUES else value
+    if kind is bool or kind is int or kind is float:
+        return value
+    return normalized(value)
+
+
+def normalized(value):
+    """value with the SDK proxies replaced by plain lists and dicts, and the unknown
+    sentinels by UNKNOWN. Plain containers without unknown values are returned as they
+    are, not copied."""
+    kind = type(value)
+    if kind is str:
+        return UNKNOWN if value in UNKNOWN_VALUES else value
+    if kind is dict:
+        if not _plain(value.values()):
+            return {key: normalized(item) for key, item in value.items()}
+        return value
+    if kind is list:
+        if not _plain(value):
+            return [normalized(item) for item in value]
+        return value
+    target = _target(value)
+    return value if target is value else _copy(target)
+
+
+def _plain(items):
+    # True when none of items, nor anything they contain, is a proxy or an unknown value
+    for item in items:
+        kind = type(item)
+        if kind is str:
+            if item in UNKNOWN_VALUES:
+                return False
+        elif kind is dict:
+            if not _plain(item.values()):
+                return False
+        elif kind is list:
+            if not _plain(item):
+                return False
+        elif item is not None and kind not in _SCALARS:
+            return False
+    return True
+
+
+def _copy(value):
+    # A proxied value: always copied, so no proxy reaches the validators
+    value = _target(value)
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return UNKNOWN if isinstance(value, str) and value in UNKNOWN_VALUES else value
+
+
+def _props(props):
+    # The dict of the props, unwrapping an SDK proxy; an empty dict for any other value
+    props = _target(props)
+    return props if type(props) is dict else {}
+
+
+def _get(props, key, snake=None):
+    """The normalized value of the top-level property key (then snake) of a props dict."""
+    value = props.get(key)
+    if value is None and snake is not None:
+        value = props.get(snake)
+    if value is None or type(value) in _SCALARS:
+        return value
+    return normalized(value)
+
+
+class PropertyView:
+    """Base of the view classes; each has one slot per property its validators read."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            "%s=%r" % (attribute, getattr(self, attribute)) for attribute in self.__slots__))
+
+
+class BucketView(PropertyView):
+    __slots__ = ("server_side_encryption_configuration",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.server_side_encryption_configuration = _get(props, "serverSideEncryptionConfiguration",
+                                                          "server_side_encryption_configuration")
+
+
+class BucketPublicAccessBlockView(PropertyView):
+    __slots__ = ("block_public_acls", "block_public_policy", "ignore_public_acls", "restrict_public_buckets")
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.block_public_acls = _get(props, "blockPublicAcls", "block_public_acls")
+        self.block_public_policy = _get(props, "blockPublicPolicy", "block_public_policy")
+        self.ignore_public_acls = _get(props, "ignorePublicAcls", "ignore_public_acls")
+        self.restrict_public_buckets = _get(props, "restrictPublicBuckets", "restrict_public_buckets")
+
+
+class PolicyView(PropertyView):
+    """BucketPolicy and QueuePolicy."""
+
+    __slots__ = ("policy",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.policy = _get(props, "policy")
+
+
+class KeyView(PropertyView):
+    __slots__ = ("enable_key_rotation",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.enable_key_rotation = _get(props, "enableKeyRotation", "enable_key_rotation")
+
+
+class FlowLogView(PropertyView):
+    __slots__ = ("traffic_type",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.traffic_type = _get(props, "trafficType", "traffic_type")
+
+
+class VolumeView(PropertyView):
+    __slots__ = ("encrypted",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.encrypted = _get(props, "encrypted")
+
+
+class InstanceView(PropertyView):
+    __slots__ = ("deletion_protection",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.deletion_protection = _get(props, "deletionProtection", "deletion_protection")
+
+
+class LazyPropertyView(PropertyView):
+    """Base of the views of the types whose validators each read one of the properties:
+    a property is read when its attribute is, from the props the view was made of."""
+
+    __slots__ = ("_props",)
+
+    # Names of the attributes, for repr()
+    attributes = ()
+
+    def __init__(self, props):
+        self._props = props if type(props) is dict else _props(props)
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            "%s=%r" % (attribute, getattr(self, attribute)) for attribute in self.attributes))
+
+
+class DefaultSecurityGroupView(LazyPropertyView):
+    __slots__ = ()
+    attributes = ("ingress", "egress")
+
+    @property
+    def ingress(self):
+        return _get(self._props, "ingress")
+
+    @property
+    def egress(self):
+        return _get(self._props, "egress")
+
+
+class SecurityGroupView(PropertyView):
+    __slots__ = ("ingress",)
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.ingress = _get(props, "ingress")
+
+
+class SecurityGroupRuleView(PropertyView):
+    __slots__ = ("type", "protocol", "from_port", "to_port", "cidr_blocks", "ipv6_cidr_blocks")
+
+    def __init__(self, props):
+        if type(props) is not dict:
+            props = _props(props)
+        self.type = _get(props, "type")
+        self.protocol = _get(props, "protocol")
+        self.from_port = _get(props, "fromPort", "from_port")
+        self.to_port = _get(props, "toPort", "to_port")
+        self.cidr_blocks = _get(props, "cidrBlocks", "cidr_blocks")
+        self.ipv6_cidr_blocks = _get(props, "ipv6CidrBlocks", "ipv6_cidr_blocks")
+
+
+_ENCRYPTION_KEY_ARN = key_table("encryptionConfig.provider.keyArn")
+
+
+class ClusterView(LazyPropertyView):
+    __slots__ = ()
+    attributes = ("enabled_cluster_log_types", "tags", "encryption_key_arn")
+
+    @property
+    def enabled_cluster_log_types(self):
+        return _get(self._props, "enabledClusterLogTypes", "enabled_cluster_log_types")
+
+    @property
+    def tags(self):
+        return _get(self._props, "tags")
+
+    @property
+    def encryption_key_arn(self):
+        return resolve(self._props, _ENCRYPTION_KEY_ARN)
+
+
+# Resource type -> view class
+VIEWS = {
+    "aws:s3/bucket:Bucket": BucketView,
+    "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock": BucketPublicAccessBlockView,
+    "aws:s3/bucketPolicy:BucketPolicy": PolicyView,
+    "aws:sqs/queuePolicy:QueuePolicy": PolicyView,
+    "aws:kms/key:Key": KeyView,
+    "aws:ec2/flowLog:FlowLog": FlowLogView,
+    "aws:ebs/volume:Volume": VolumeView,
+    "aws:rds/instance:Instance": InstanceView,
+    "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup": DefaultSecurityGroupView,
+    "aws:ec2/securityGroup:SecurityGroup": SecurityGroupView,
+    "aws:ec2/securityGroupRule:SecurityGroupRule": SecurityGroupRuleView,
+    "aws:eks/cluster:Cluster": ClusterView,
+}
+
+
+class GenericView:
+    """View of the props of a type without a view class: an attribute reads the property
+    of its name in camelCase, then as it is spelled, when it is read."""
+
+    __slots__ = ("_props",)
+
+    def __init__(self, props):
+        self._props = props
+
+    def __getattr__(self, attribute):
+        if attribute.startswith("_"):
+            raise AttributeError(attribute)
+        return resolve(self._props, ((camel_case(attribute), attribute),))
+
+    def __repr__(self):
+        return "GenericView(%r)" % (self._props,)
+
+
+def camel_case(attribute):
+    """enabled_cluster_log_types -> enabledClusterLogTypes"""
+    first, *rest = attribute.split("_")
+    return first + "".join(part[:1].upper() + part[1:] for part in rest)
+
+
+def view_class(resource_type, schema):
+    """A PropertyView subclass for the {attribute: property path} schema of resource_type,
+    resolving every path when a view is made."""
+    name = "".join(part[:1].upper() + part[1:] for part in re.split(r"[^A-Za-z0-9]+", resource_type.split(":")[-1]))
+    fields = tuple((attribute, key_table(path)) for attribute, path in schema.items())
+
+    def __init__(self, props):
+        props = _target(props)
+        for attribute, table in fields:
+            setattr(self, attribute, resolve(props, table))
+
+    return type(name + "View", (PropertyView,), {"__slots__": tuple(schema), "__init__": __init__})
+
+
+def view_of(args):
+    """A new view of the props of the validation args: of the view class of its type, a
+    GenericView for the other types.
+
+    The views are not cached, since the props of a validation can be changed or reused
+    for another type after it."""
+    return VIEWS.get(args.resource_type, GenericView)(args.props)
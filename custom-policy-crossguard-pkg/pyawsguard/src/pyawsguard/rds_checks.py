@@ -14,35 +14,19 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
 
-from pulumi import log
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+from pyawsguard.props import UNKNOWN, view_of
 
 ###################################
 # RDS Instance
 ###################################
 # RDS Deletion protection validation
-def rds_deletion_protection_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:rds/instance:Instance": 
-        if "deletionProtection" not in args.props or args.props["deletionProtection"] == "None":
-            report_violation(
-                "Deletion protection is not enabled for the RDS Instance " + args.name )
-
-
-rds_deletion_protection_policy = ResourceValidationPolicy(
-    name="rds_deletion_protection_policy",
-    description="Validating deletion protection on RDS instances.",
-    validate=rds_deletion_protection_validator,
-)
\ No newline at end of file
+def rds_deletion_protection_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    deletion_protection = view_of(args).deletion_protection
+    if deletion_protection != True and deletion_protection is not UNKNOWN:
+        report_violation(
+            "Deletion protection is not enabled for the RDS Instance " + args.name )
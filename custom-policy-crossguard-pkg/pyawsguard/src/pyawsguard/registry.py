@@ -0,0 +1,410 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Registry of the pyawsguard policies, indexed by Pulumi type token.
+#
+# Every policy is declared once here together with the resource type it validates.
+# The validators in the *_checks modules no longer test args.resource_type themselves:
+# the registry checks it in front of them. The offline evaluator looks the validators
+# up with specs_for(), so there a resource only reaches the validators that apply to
+# it. The registry does not make the pack faster under pulumi preview: the policy SDK
+# calls every policy of the pack for every resource, and the number of calls stays
+# policies x resources (benchmarks/bench_dispatch.py). The pack keeps one policy per
+# spec, since the engine reports violations and applies enforcement levels by policy
+# name.
+#
+# Validators are referenced by name and their check module is only imported the first
+# time a resource of a matching type is validated, so loading the pack imports nothing
+# but the policy SDK. The parameters a pack configuration sets for a validator are
+# bound then too.
+
+import importlib
+
+from pyawsguard.rules import rules_from_environment
+from pyawsguard.tags import tag_policies_from_environment
+
+# Name under which the policies are published by the PolicyPack in __main__.py
+PACK_NAME = "aws-python"
+
+
+class PolicySpec:
+    """A single policy: its name and description as reported by the engine, the Pulumi
+    type token it applies to (None for a stack policy) and the validator run for
+    resources of that type, given as a "module:function" reference relative to the
+    pyawsguard package.
+
+    Validators that are not a function of a check module, such as compiled rules, are
+    passed directly as validator, with a version identifying their definition.
+    enforcement_level ("advisory" or "mandatory") is the level the policy is registered
+    at unless the pack configuration sets one; None for the level of the pack.
+    parameters are keyword arguments bound to the validator (see pack_config.py).
+    """
+
+    __slots__ = ("name", "description", "resource_type", "validator_ref", "version", "enforcement_level",
+                 "parameters", "_function", "_validator")
+
+    def __init__(self, name, description, resource_type, validator_ref, validator=None, version=None,
+                 enforcement_level=None, parameters=None):
+        self.name = name
+        self.description = description
+        self.resource_type = resource_type
+        self.validator_ref = validator_ref
+        self.version = version
+        self.enforcement_level = enforcement_level
+        self.parameters = parameters or None
+        self._function = validator
+        self._validator = None
+
+    @property
+    def validator(self):
+        """The validator function, importing its check module and binding the
+        parameters on first use."""
+        validator = self._validator
+        if validator is None:
+            validator = self._function
+            if validator is None:
+                module_name, function_name = self.validator_ref.split(":")
+                module = importlib.import_module("pyawsguard." + module_name)
+                validator = self._function = getattr(module, function_name)
+            if self.parameters:
+                validator = _bind(self, validator)
+            self._validator = validator
+        return validator
+
+    def configured(self, enforcement_level, parameters=None, version=None):
+        """This policy at enforcement_level, with the parameters bound to its validator
+        and version identifying them; nothing is imported until the validator is used."""
+        return PolicySpec(self.name, self.description, self.resource_type, self.validator_ref,
+                          validator=self._function, version=version or self.version,
+                          enforcement_level=enforcement_level, parameters=parameters)
+
+    def __repr__(self):
+        return "PolicySpec(%r, %r)" % (self.name, self.resource_type)
+
+
+# Declaration order is the order in which the policies are registered in the PolicyPack.
+POLICY_SPECS = (
+    PolicySpec(
+        "s3_public_access_block",
+        "Validating the publicRead or publicReadWrite permission on AWS S3 buckets.",
+        "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock",
+        "s3_checks:s3_public_access_block_validator",
+    ),
+    PolicySpec(
+        "sqs-no-public-access",
+        "Validating if SQS policy has public access permissions.",
+        "aws:sqs/queuePolicy:QueuePolicy",
+        "sqs_checks:sqs_no_public_access_validator",
+    ),
+    PolicySpec(
+        "kms-no-automatic-rotation",
+        "Validating if KMS key automatic rotation is turned on.",
+        "aws:kms/key:Key",
+        "kms_checks:kms_no_automatic_rotation_validator",
+    ),
+    PolicySpec(
+        "vpc-flow-logs-policy",
+        "Validating if VPC flow logs are created for VPC.",
+        "aws:ec2/flowLog:FlowLog",
+        "vpc_checks:vpc_flow_logs_validator",
+    ),
+    PolicySpec(
+        "s3_encryption_policy",
+        "Validating default encryption configuration on AWS S3 buckets.",
+        "aws:s3/bucket:Bucket",
+        "s3_checks:s3_encryption_validator",
+    ),
+    PolicySpec(
+        "ebs_encryption_policy",
+        "Validating encryption configuration on EBS volumes.",
+        "aws:ebs/volume:Volume",
+        "ebs_checks:ebs_encryption_validator",
+    ),
+    PolicySpec(
+        "rds_deletion_protection_policy",
+        "Validating deletion protection on RDS instances.",
+        "aws:rds/instance:Instance",
+        "rds_checks:rds_deletion_protection_validator",
+    ),
+    PolicySpec(
+        "secgrp-default-no-ingress",
+        "Validating that the default security group of VPC has ingress rules",
+        "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup",
+        "ec2_checks:secgrp_default_no_ingress_validator",
+    ),
+    PolicySpec(
+        "secgrp-default-no-egress",
+        "Validating that the default security group of VPC has egress rules",
+        "aws:ec2/defaultSecurityGroup:DefaultSecurityGroup",
+        "ec2_checks:secgrp_default_no_egress_validator",
+    ),
+    PolicySpec(
+        "security-group-ssh-policy",
+        "Validating if port 22 is open to all IPs for incoming SSH connections.",
+        "aws:ec2/securityGroup:SecurityGroup",
+        "ec2_checks:security_grp_ssh_validator",
+    ),
+    PolicySpec(
+        "security-group-ssh-policy",
+        "Validating if port 22 is open to all IPs for incoming SSH connections.",
+        "aws:ec2/securityGroupRule:SecurityGroupRule",
+        "ec2_checks:security_grp_rule_ssh_validator",
+    ),
+    PolicySpec(
+        "security-group-sensitive-ports",
+        "Validating that no sensitive port (remote administration, databases) is open to all IPs.",
+        "aws:ec2/securityGroup:SecurityGroup",
+        "ec2_checks:security_grp_sensitive_ports_validator",
+    ),
+    PolicySpec(
+        "security-group-sensitive-ports",
+        "Validating that no sensitive port (remote administration, databases) is open to all IPs.",
+        "aws:ec2/securityGroupRule:SecurityGroupRule",
+        "ec2_checks:security_grp_rule_sensitive_ports_validator",
+    ),
+    PolicySpec(
+        "s3-ssl-requests-policy",
+        "Validating that S3 buckets have TLS checks in bucket policy.",
+        "aws:s3/bucketPolicy:BucketPolicy",
+        "s3_checks:s3_ssl_requests_validator",
+    ),
+    PolicySpec(
+        "eks-cluster-default-logs",
+        "Validating if EKS Cluster has all three log types enabled by default",
+        "aws:eks/cluster:Cluster",
+        "eks_checks:default_log_types_validator",
+    ),
+    PolicySpec(
+        "eks-cluster-tags_policy",
+        "Validating if EKS Cluster has tags by default",
+        "aws:eks/cluster:Cluster",
+        "eks_checks:tags_validator",
+    ),
+    PolicySpec(
+        "eks-cluster-kms-key",
+        "Validating if EKS Cluster has AWS KMS key configured",
+        "aws:eks/cluster:Cluster",
+        "eks_checks:kms_key_for_encryption_validator",
+    ),
+)
+
+
+# Stack policies validate the resources of a stack together, after all of them are
+# registered; they have no resource type and see every resource. Registered in the
+# PolicyPack after the resource policies. They are advisory, so adding them does not
+# fail the previews of existing stacks; a pack configuration can make them mandatory.
+STACK_POLICY_SPECS = (
+    PolicySpec(
+        "vpc-flow-log-coverage",
+        "Validating that every VPC has a flow log capturing ALL traffic.",
+        None,
+        "stack_checks:vpc_flow_log_coverage_validator",
+        enforcement_level="advisory",
+    ),
+    PolicySpec(
+        "s3-bucket-protection",
+        "Validating that every S3 bucket has a public access block and a bucket policy enforcing TLS.",
+        None,
+        "stack_checks:s3_bucket_protection_validator",
+        enforcement_level="advisory",
+    ),
+    PolicySpec(
+        "ebs-kms-key-rotation",
+        "Validating that EBS volumes are encrypted with KMS keys that have automatic rotation turned on.",
+        None,
+        "stack_checks:ebs_kms_key_rotation_validator",
+        enforcement_level="advisory",
+    ),
+)
+
+
+class PolicyRegistry:
+    """Index of policy specs by the Pulumi type token they validate."""
+
+    def __init__(self, specs=POLICY_SPECS, stack_specs=STACK_POLICY_SPECS):
+        self.specs = tuple(specs)
+        self.stack_specs = tuple(stack_specs)
+        # The specs of a name are registered as one policy dispatching on the type, a
+        # second validator for the same type would silently replace the first
+        registered = set()
+        for spec in self.specs + self.stack_specs:
+            if (spec.name, spec.resource_type) in registered:
+                raise ValueError("policy %s: registered twice for %s" % (spec.name, spec.resource_type or "the stack"))
+            registered.add((spec.name, spec.resource_type))
+        by_type = {}
+        for spec in self.specs:
+            by_type.setdefault(spec.resource_type, []).append(spec)
+        self._by_type = {resource_type: tuple(specs) for resource_type, specs in by_type.items()}
+
+    def resource_types(self):
+        """The type tokens that have at least one policy registered."""
+        return frozenset(self._by_type)
+
+    def specs_for(self, resource_type):
+        """The policy specs that apply to resource_type, in registration order."""
+        return self._by_type.get(resource_type, ())
+
+    def pack_policies(self, active=None):
+        """ResourceValidationPolicy and StackValidationPolicy objects for the PolicyPack.
+
+        active, an ActiveRuleTable of pack_config.py, selects the policies registered,
+        their enforcement levels and parameters; by default every policy is registered
+        at the level of the pack.
+
+        The engine calls every policy of the pack for every resource; each policy's
+        validate rejects other resource types before the validator body is entered,
+        which saves the validator call but not the SDK's own work. With PYAWSGUARD_STATS
+        set, the dispatchers are timed and counted (see instrumentation.py). With
+        PYAWSGUARD_TIME_BUDGETS set, the resource policies are held to their time
+        budgets (see budgets.py).
+        """
+        from pulumi_policy import ResourceValidationPolicy, StackValidationPolicy
+
+        from pulumi_policy import EnforcementLevel
+
+        from pyawsguard import budgets
+        from pyawsguard.instrumentation import from_environment
+        from pyawsguard.pack_config import active_rules
+
+        if active is None:
+            active = active_rules(self)
+
+        instrumentation = from_environment()
+        time_budgets = budgets.from_environment()
+        policies = []
+        # Policy names must be unique in a pack: the specs of a policy that covers several
+        # types (e.g. a tag policy) are registered as one policy dispatching on the type
+        by_name = {}
+        for rule in active.rules:
+            spec = rule.spec
+            validate = _dispatch(spec)
+            if instrumentation is not None:
+                validate = instrumentation.instrument(spec, validate)
+            if time_budgets is not None:
+                validate = time_budgets.guard(spec, validate)
+            if spec.name not in by_name:
+                by_name[spec.name] = (rule, {})
+            by_name[spec.name][1][spec.resource_type] = validate
+        for rule, validators in by_name.values():
+            spec = rule.spec
+            policies.append(ResourceValidationPolicy(
+                name=spec.name,
+                description=spec.description,
+                validate=validators[spec.resource_type] if len(validators) == 1 else _dispatch_by_type(validators),
+                enforcement_level=_enforcement_level(EnforcementLevel, rule),
+            ))
+        for rule in active.stack_rules:
+            spec = rule.spec
+            validate = _run_stack_validator(spec)
+            if instrumentation is not None:
+                validate = instrumentation.instrument(spec, validate)
+            policies.append(StackValidationPolicy(
+                name=spec.name,
+                description=spec.description,
+                validate=validate,
+                enforcement_level=_enforcement_level(EnforcementLevel, rule),
+            ))
+        return policies
+
+
+def rule_specs(rule_policies):
+    """PolicySpecs for rule policies compiled by pyawsguard.rules, one per resource type."""
+    return tuple(
+        PolicySpec(policy.name, policy.description, rule_set.resource_type, "rules:" + rule_set.resource_type,
+                   validator=rule_set.validate, version=policy.digest)
+        for policy in rule_policies
+        for rule_set in policy.rule_sets
+    )
+
+
+def tag_specs(tag_policies):
+    """PolicySpecs for tag policies compiled by pyawsguard.tags, one per governed type."""
+    return tuple(
+        PolicySpec(policy.name, policy.description, schema.resource_type, "tags:" + schema.resource_type,
+                   validator=schema.validate, version=policy.digest)
+        for policy in tag_policies
+        for schema in policy.schemas
+    )
+
+
+def _enforcement_level(levels, rule):
+    # None leaves the policy at the enforcement level of the pack
+    return levels(rule.enforcement_level) if rule.enforcement_level is not None else None
+
+
+def _bind(spec, validator):
+    # validator with the keyword arguments of spec.parameters set, checked against its
+    # signature so that a wrong parameter names the policy and the configuration
+    import functools
+    import inspect
+
+    try:
+        inspect.signature(validator).bind(None, None, **spec.parameters)
+    except TypeError as error:
+        raise ValueError("pack configuration: %s (%s) does not take the parameters %s: %s"
+                         % (spec.name, spec.validator_ref, ", ".join(sorted(spec.parameters)), error))
+    return functools.partial(validator, **spec.parameters)
+
+
+def _dispatch(spec):
+    resource_type = spec.resource_type
+
+    def validate(args, report_violation):
+        if args.resource_type == resource_type:
+            spec.validator(args, report_violation)
+
+    return validate
+
+
+def _dispatch_by_type(validators):
+    def validate(args, report_violation):
+        validator = validators.get(args.resource_type)
+        if validator is not None:
+            validator(args, report_violation)
+
+    return validate
+
+
+def check_policy_names(policies, specs=POLICY_SPECS + STACK_POLICY_SPECS):
+    """Raises ValueError when one of policies (compiled rule or tag policies) is named
+    like one of the policy specs or like another of policies: the specs of a name are
+    registered as a single policy, which would silently merge them."""
+    taken = {spec.name for spec in specs}
+    for policy in policies:
+        if policy.name in taken:
+            raise ValueError("policy %s: the name is already used by another policy of the pack" % policy.name)
+        taken.add(policy.name)
+
+
+def _environment_specs():
+    # The rule policies of the files in PYAWSGUARD_RULES followed by the tag policies of
+    # the files in PYAWSGUARD_TAG_POLICY
+    rule_policies = rules_from_environment()
+    tag_policies = tag_policies_from_environment()
+    check_policy_names(rule_policies + tag_policies)
+    return rule_specs(rule_policies) + tag_specs(tag_policies)
+
+
+# The built-in policies followed by the policies of the rule and tag policy files
+registry = PolicyRegistry(POLICY_SPECS + _environment_specs())
+
+
+def _run_stack_validator(spec):
+    # Defers the import of the check module to the first stack validation
+    def validate(args, report_violation):
+        spec.validator(args, report_violation)
+
+    return validate
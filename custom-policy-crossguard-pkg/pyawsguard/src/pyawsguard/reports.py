@@ -0,0 +1,203 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# SARIF and JUnit XML reports of policy violations.
+#
+# The writers take one violation at a time and write it out immediately, so a report
+# never holds more than the set of policies seen in memory. SARIF results are written
+# before the tool section, which lists the rules (policies) seen, and is written when
+# the report is closed. JUnit reports have one failing test case per violation
+# ("skipped" for advisory ones) and, when the writer is given the policies that were
+# evaluated, one passing test case for each policy without violations.
+#
+# Reports are written by 'python -m pyawsguard.evaluate --sarif ... --junit ...', or
+# from the event log of a 'pulumi preview' (all policy packs) with
+#
+#   python -m pyawsguard.reports --sarif violations.sarif --junit violations.xml policy-events.json
+
+import argparse
+import contextlib
+import hashlib
+import json
+import sys
+from collections import namedtuple
+from xml.sax.saxutils import escape, quoteattr
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# Enforcement level -> SARIF result level
+SARIF_LEVELS = {"mandatory": "error", "remediate": "error", "advisory": "warning", "disabled": "note"}
+
+ReportRecord = namedtuple("ReportRecord", [
+    "policy", "description", "pack", "enforcement_level", "urn", "resource_type", "name", "message"])
+
+
+def from_violation(violation, pack, enforcement_level):
+    """ReportRecord of a pyawsguard.evaluate.Violation."""
+    return ReportRecord(violation.policy_name, violation.description, pack, enforcement_level, violation.urn,
+                        violation.resource_type, violation.name, violation.message)
+
+
+def records_from_events(lines):
+    """ReportRecords of an engine event log ('pulumi preview --event-log' or '--json'), or
+    of the lines written by 'python -m pyawsguard.evaluate --format json'."""
+    for line in lines:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        policy_event = event.get("policyEvent")
+        if policy_event is not None:
+            urn = policy_event.get("resourceUrn") or ""
+            parts = urn.split("::", 3)
+            yield ReportRecord(
+                policy_event.get("policyName", ""),
+                policy_event.get("description", ""),
+                policy_event.get("policyPackName", ""),
+                policy_event.get("enforcementLevel", "mandatory"),
+                urn,
+                parts[2].rsplit("$", 1)[-1] if len(parts) == 4 else "",
+                parts[3] if len(parts) == 4 else "",
+                policy_event.get("message", "").strip(),
+            )
+        elif "policy_name" in event:
+            yield ReportRecord(event["policy_name"], event.get("description", ""), event.get("pack", ""),
+                               event.get("enforcement_level", "mandatory"), event.get("urn", ""),
+                               event.get("resource_type", ""), event.get("name", ""), event.get("message", ""))
+
+
+class SarifWriter:
+    """Streams a SARIF 2.1.0 log with one run to a text file."""
+
+    def __init__(self, f, tool_name="pyawsguard", tool_version=None):
+        self._f = f
+        self._tool_name = tool_name
+        self._tool_version = tool_version
+        self._rules = {}
+        self._first = True
+        f.write('{"$schema": %s, "version": "2.1.0", "runs": [{"results": [' % json.dumps(SARIF_SCHEMA))
+
+    def write(self, record):
+        rule = self._rules.get(record.policy)
+        if rule is None:
+            rule = self._rules[record.policy] = {
+                "id": record.policy,
+                "shortDescription": {"text": record.description or record.policy},
+                "properties": {"pack": record.pack},
+            }
+        result = {
+            "ruleId": record.policy,
+            "level": SARIF_LEVELS.get(record.enforcement_level, "error"),
+            "message": {"text": record.message or record.description},
+            "locations": [{"logicalLocations": [{
+                "fullyQualifiedName": record.urn,
+                "name": record.name,
+                "kind": "resource",
+            }]}],
+            "partialFingerprints": {"policyResource/v1": _fingerprint(record.policy, record.urn)},
+            "properties": {"resourceType": record.resource_type, "enforcementLevel": record.enforcement_level},
+        }
+        self._f.write(("\n" if self._first else ",\n") + json.dumps(result, sort_keys=True))
+        self._first = False
+
+    def close(self):
+        driver = {"name": self._tool_name, "rules": list(self._rules.values())}
+        if self._tool_version:
+            driver["version"] = self._tool_version
+        self._f.write('\n], "tool": {"driver": %s}}]}\n' % json.dumps(driver, sort_keys=True))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JUnitWriter:
+    """Streams a JUnit XML report to a text file. The test suite carries no totals, they
+    are only known at the end; report viewers such as CodeBuild count the test cases."""
+
+    def __init__(self, f, suite_name="pyawsguard", policies=(), pack=None):
+        self._f = f
+        self._pack = pack
+        # Policies reported as passing at the end unless they have a violation
+        self._passing = {name: description for name, description in policies}
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites name=%s>\n<testsuite name=%s>\n'
+                % (quoteattr(suite_name), quoteattr(suite_name)))
+
+    def write(self, record):
+        self._passing.pop(record.policy, None)
+        resource = "%s: %s" % (record.resource_type, record.name) if record.name else record.urn or "stack"
+        detail = escape("\n".join(text for text in (record.description, record.urn) if text))
+        if record.enforcement_level == "advisory":
+            outcome = "<skipped message=%s/>" % quoteattr(record.message)
+        else:
+            outcome = "<failure message=%s type=%s>%s</failure>" % (
+                quoteattr(record.message), quoteattr(record.enforcement_level or "mandatory"), detail)
+        self._f.write("<testcase classname=%s name=%s>%s</testcase>\n" % (
+            quoteattr(self._classname(record.pack, record.policy)), quoteattr(resource), outcome))
+
+    @staticmethod
+    def _classname(pack, policy):
+        return "%s.%s" % (pack, policy) if pack else policy
+
+    def close(self):
+        for name in sorted(self._passing):
+            self._f.write("<testcase classname=%s name=%s/>\n" % (
+                quoteattr(self._classname(self._pack, name)), quoteattr(self._passing[name])))
+        self._f.write("</testsuite>\n</testsuites>\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _fingerprint(policy, urn):
+    return hashlib.sha256(("%s\0%s" % (policy, urn)).encode("utf-8")).hexdigest()[:32]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyawsguard.reports",
+        description="Write SARIF and JUnit XML reports from 'pulumi preview' event logs.")
+    parser.add_argument("logs", nargs="+", help="event logs ('pulumi preview --event-log') or evaluator JSON lines")
+    parser.add_argument("--sarif", help="path of the SARIF report")
+    parser.add_argument("--junit", help="path of the JUnit XML report")
+    options = parser.parse_args(argv)
+    if not options.sarif and not options.junit:
+        parser.error("give --sarif, --junit or both")
+
+    count = 0
+    with contextlib.ExitStack() as stack:
+        # Unwound in reverse order: every writer is closed before its file
+        writers = []
+        if options.sarif:
+            writers.append(stack.enter_context(SarifWriter(stack.enter_context(open(options.sarif, "w")))))
+        if options.junit:
+            writers.append(stack.enter_context(JUnitWriter(stack.enter_context(open(options.junit, "w")))))
+        for path in options.logs:
+            with open(path) as f:
+                for record in records_from_events(f):
+                    for writer in writers:
+                        writer.write(record)
+                    count += 1
+    sys.stderr.write("%d violations reported\n" % count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Index of the resources of a stack for the cross-resource (stack) policies.
+#
+# The graph is built in one pass over the resources, indexing them by type and URN.
+# The joins the stack checks need ("the flow logs whose vpcId is this VPC", "the key
+# this volume's kmsKeyId points at") are answered from reference indexes built on
+# first use, each with a single pass over the resources of one type, so a check over
+# the whole stack stays linear instead of scanning every resource for every resource.
+#
+# A property refers to another resource either through the engine's property
+# dependencies (how references to not yet created resources are known during a
+# preview) or by holding one of its identifiers: its id, its arn, or a type specific
+# name such as the bucket name. Values that are unknown during a preview are skipped
+# instead of failing the whole stack policy.
+
+import sys
+
+# Properties identifying a resource of any type, besides its property dependencies
+IDENTIFIER_PROPERTIES = ("id", "arn")
+
+# Additional identifying properties of some types, e.g. what BucketPolicy.bucket holds
+TYPE_IDENTIFIER_PROPERTIES = {
+    "aws:s3/bucket:Bucket": ("bucket",),
+    "aws:sqs/queue:Queue": ("url",),
+}
+
+
+# How the engine writes an unknown string in preview documents
+UNKNOWN_STRING_VALUE = "04da6b54-80e4-46f7-96ec-b56ff0331ba9"
+
+
+class _NoUnknownValues(Exception):
+    pass
+
+
+def _unknown_value_error():
+    # Only the policy SDK wraps props in unknown checking proxies. The class is looked
+    # up when an exception is raised, so the offline evaluator never imports the SDK.
+    proxy = sys.modules.get("pulumi_policy.proxy")
+    return proxy.UnknownValueError if proxy is not None else _NoUnknownValues
+
+
+class Unknown:
+    """Placeholder returned by known() for a value that is unknown during a preview."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "UNKNOWN"
+
+
+UNKNOWN = Unknown()
+
+
+def known(props, key, default=None):
+    """props[key], default when absent or UNKNOWN when the value is not known yet."""
+    try:
+        value = props.get(key, default)
+    except _unknown_value_error():
+        return UNKNOWN
+    if value is None:
+        return default
+    if value == UNKNOWN_STRING_VALUE:
+        return UNKNOWN
+    return value
+
+
+def graph_of(args):
+    """The ResourceGraph of the stack validation args, reusing the one the offline
+    evaluator shares between the stack policies."""
+    graph = getattr(args, "graph", None)
+    if graph is None:
+        graph = ResourceGraph(args.resources)
+    return graph
+
+
+class ResourceGraph:
+    """Resources of a stack indexed by type, URN and the references between them."""
+
+    def __init__(self, resources):
+        self.resources = []
+        self._by_type = {}
+        self._by_urn = {}
+        for resource in resources:
+            self.resources.append(resource)
+            self._by_type.setdefault(resource.resource_type, []).append(resource)
+            self._by_urn[resource.urn] = resource
+        self._identifiers = {}
+        self._referrers = {}
+
+    def of_type(self, resource_type):
+        """The resources of resource_type, in stack order."""
+        return self._by_type.get(resource_type, ())
+
+    def get(self, urn):
+        return self._by_urn.get(urn)
+
+    def references(self, resource, key, resource_type):
+        """The resources of resource_type that the property key of resource refers to."""
+        found = {}
+        for urn in _dependency_urns(resource, key):
+            target = self._by_urn.get(urn)
+            if target is not None and target.resource_type == resource_type:
+                found[urn] = target
+        identifiers = self._identifier_index(resource_type)
+        for value in _reference_values(resource.props, key):
+            for target in identifiers.get(value, ()):
+                found[target.urn] = target
+        return list(found.values())
+
+    def referrers(self, target, resource_type, key):
+        """The resources of resource_type whose property key refers to target."""
+        index = self._referrer_index(resource_type, key)
+        found = {}
+        for reference in (target.urn,) + _identifiers(target):
+            for resource in index.get(reference, ()):
+                found[resource.urn] = resource
+        return list(found.values())
+
+    def _identifier_index(self, resource_type):
+        index = self._identifiers.get(resource_type)
+        if index is None:
+            index = self._identifiers[resource_type] = {}
+            for resource in self.of_type(resource_type):
+                for identifier in _identifiers(resource):
+                    index.setdefault(identifier, []).append(resource)
+        return index
+
+    def _referrer_index(self, resource_type, key):
+        index = self._referrers.get((resource_type, key))
+        if index is None:
+            index = self._referrers[(resource_type, key)] = {}
+            for resource in self.of_type(resource_type):
+                for reference in _dependency_urns(resource, key) + _reference_values(resource.props, key):
+                    index.setdefault(reference, []).append(resource)
+        return index
+
+
+def _dependency_urns(resource, key):
+    # Engine resources hold PolicyResource objects, offline resources the URNs
+    dependencies = (getattr(resource, "property_dependencies", None) or {}).get(key) or ()
+    return tuple(dependency if isinstance(dependency, str) else dependency.urn for dependency in dependencies)
+
+
+def _reference_values(props, key):
+    value = known(props, key)
+    if isinstance(value, str):
+        return (value,)
+    if isinstance(value, (list, tuple)):
+        try:
+            return tuple(item for item in value if isinstance(item, str) and item != UNKNOWN_STRING_VALUE)
+        except _unknown_value_error():
+            return ()
+    return ()
+
+
+def _identifiers(resource):
+    keys = IDENTIFIER_PROPERTIES + TYPE_IDENTIFIER_PROPERTIES.get(resource.resource_type, ())
+    identifiers = []
+    # Offline resources keep their outputs, where ids and arns live, next to the inputs
+    for props in (resource.props, getattr(resource, "outputs", None) or {}):
+        for key in keys:
+            value = known(props, key)
+            if isinstance(value, str) and value:
+                identifiers.append(value)
+    resource_id = getattr(resource, "id", None)
+    if resource_id:
+        identifiers.append(resource_id)
+    return tuple(identifiers)
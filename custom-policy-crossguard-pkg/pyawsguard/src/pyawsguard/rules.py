@@ -0,0 +1,262 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Declarative policy rules.
+#
+# A rule file (YAML or JSON) lists rules of the form:
+#
+#   name: custom-rules                    # policy name, the default
+#   description: Validating the RDS and S3 rules.   # policy description, optional
+#   rules:
+#     - name: rds-storage-encrypted
+#       type: aws:rds/instance:Instance
+#       property: storageEncrypted        # dotted path, e.g. encryptionConfig.provider.keyArn
+#       operator: equals
+#       value: true
+#       message: "Storage encryption is not enabled for the RDS Instance {name}"
+#
+# The property/operator/value triple states what a compliant resource looks like; a
+# rule may instead list several of them under "conditions", all of which must hold.
+# A missing property, or one set to null, only satisfies "absent" and "empty". A
+# property that is unknown during a preview gives no verdict: its condition neither
+# holds nor fails. The message may refer to {name}, {urn} and {type} of the resource,
+# and is reported prefixed with the rule name.
+#
+# A rule file is one policy of the pack. Its rules are compiled once per resource type
+# when the pack is loaded: the property paths of the type's rules into a view class
+# (props.py) that resolves each of them once per resource, and the operators and
+# regular expressions into predicates. Each type is registered as a policy spec of the
+# file's name, so a resource is only tested against the rules of its type, in one
+# validator call. Rule files are read from the paths in PYAWSGUARD_RULES (separated
+# by os.pathsep); with several files, a file without a name is named after it.
+
+import hashlib
+import json
+import os
+import re
+
+from pyawsguard.props import UNKNOWN, view_class
+
+RULES_ENV = "PYAWSGUARD_RULES"
+
+DEFAULT_POLICY_NAME = "custom-rules"
+
+
+def _exists(expected):
+    return lambda value: value is not None
+
+
+def _absent(expected):
+    return lambda value: value is None
+
+
+def _equals(expected):
+    return lambda value: value is not None and value == expected
+
+
+def _not_equals(expected):
+    return lambda value: value is None or value != expected
+
+
+def _in(expected):
+    expected = _as_list(expected)
+    return lambda value: value is not None and value in expected
+
+
+def _not_in(expected):
+    expected = _as_list(expected)
+    return lambda value: value is None or value not in expected
+
+
+def _contains(expected):
+    return lambda value: isinstance(value, (list, tuple, str)) and expected in value
+
+
+def _contains_all(expected):
+    expected = _as_list(expected)
+
+    def test(value):
+        return isinstance(value, (list, tuple)) and all(item in value for item in expected)
+
+    return test
+
+
+def _matches(expected):
+    pattern = re.compile(expected)
+    return lambda value: isinstance(value, str) and pattern.search(value) is not None
+
+
+def _greater_or_equal(expected):
+    return lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value >= expected
+
+
+def _less_or_equal(expected):
+    return lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value <= expected
+
+
+def _empty(expected):
+    return lambda value: value is None or (hasattr(value, "__len__") and len(value) == 0)
+
+
+def _not_empty(expected):
+    return lambda value: value is not None and not (hasattr(value, "__len__") and len(value) == 0)
+
+
+# Operator name -> factory building the predicate from the rule's expected value
+OPERATORS = {
+    "exists": _exists,
+    "absent": _absent,
+    "equals": _equals,
+    "not_equals": _not_equals,
+    "in": _in,
+    "not_in": _not_in,
+    "contains": _contains,
+    "contains_all": _contains_all,
+    "matches": _matches,
+    "greater_or_equal": _greater_or_equal,
+    "less_or_equal": _less_or_equal,
+    "empty": _empty,
+    "not_empty": _not_empty,
+}
+
+
+def _as_list(expected):
+    if not isinstance(expected, (list, tuple)):
+        raise ValueError("expected a list of values, got %r" % (expected,))
+    return list(expected)
+
+
+def _has_unknown(value):
+    # True when a list or dict holds an unknown value, at any depth
+    if value is UNKNOWN:
+        return True
+    if isinstance(value, list):
+        return any(_has_unknown(item) for item in value)
+    if isinstance(value, dict):
+        return any(_has_unknown(item) for item in value.values())
+    return False
+
+
+class CompiledRule:
+    """A rule compiled into ((view attribute, predicate), ...) and its message."""
+
+    __slots__ = ("name", "resource_type", "tests", "message")
+
+    def __init__(self, rule, attributes):
+        # attributes: {property path: view attribute} shared by the rules of a type
+        for key in ("name", "type", "message"):
+            if key not in rule:
+                raise ValueError("rule %s: missing %r" % (rule.get("name", "?"), key))
+        self.name = rule["name"]
+        self.resource_type = rule["type"]
+        tests = []
+        for condition in rule.get("conditions") or [rule]:
+            if "property" not in condition:
+                raise ValueError("rule %s: missing 'property'" % self.name)
+            attribute = attributes.setdefault(condition["property"], "p%d" % len(attributes))
+            tests.append((attribute, _compile_condition(self.name, condition)))
+        self.tests = tuple(tests)
+        self.message = "%s: %s" % (self.name, rule["message"])
+        try:
+            self.message.format(name="", urn="", type="")
+        except (KeyError, IndexError) as error:
+            raise ValueError("rule %s: unknown placeholder %s in message" % (self.name, error))
+
+    def __repr__(self):
+        return "CompiledRule(%r, %r)" % (self.name, self.resource_type)
+
+
+def _compile_condition(rule_name, condition):
+    operator = condition.get("operator", "equals")
+    factory = OPERATORS.get(operator)
+    if factory is None:
+        raise ValueError("rule %s: unknown operator %r" % (rule_name, operator))
+    try:
+        return factory(condition.get("value"))
+    except (ValueError, re.error) as error:
+        raise ValueError("rule %s: %s" % (rule_name, error))
+
+
+class RuleSet:
+    """The rules of a policy for one resource type, compiled into one validator."""
+
+    __slots__ = ("resource_type", "rules", "view")
+
+    def __init__(self, resource_type, rules):
+        self.resource_type = resource_type
+        attributes = {}
+        self.rules = tuple(CompiledRule(rule, attributes) for rule in rules)
+        names = [rule.name for rule in self.rules]
+        for name in names:
+            if names.count(name) > 1:
+                raise ValueError("rule %s: defined twice for %s" % (name, resource_type))
+        self.view = view_class(resource_type, {attribute: path for path, attribute in attributes.items()})
+
+    def validate(self, args, report_violation):
+        view = self.view(args.props)
+        for rule in self.rules:
+            for attribute, test in rule.tests:
+                value = getattr(view, attribute)
+                if value is not UNKNOWN and not test(value) and not _has_unknown(value):
+                    report_violation(rule.message.format(name=args.name, urn=args.urn, type=args.resource_type))
+                    break
+
+    def __repr__(self):
+        return "RuleSet(%r, %d rules)" % (self.resource_type, len(self.rules))
+
+
+class RulePolicy:
+    """A rule file compiled into a RuleSet per resource type of its rules."""
+
+    __slots__ = ("name", "description", "rule_sets", "digest")
+
+    def __init__(self, document, default_name=DEFAULT_POLICY_NAME):
+        if not isinstance(document, dict):
+            document = {"rules": document}
+        self.name = document.get("name") or default_name
+        self.description = document.get("description", "Validating the declarative rules of %s." % self.name)
+        # Identifies the policy's definition, so cached results are invalidated when it changes
+        self.digest = hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        by_type = {}
+        for rule in document.get("rules") or ():
+            if "type" not in rule:
+                raise ValueError("rule %s: missing 'type'" % rule.get("name", "?"))
+            by_type.setdefault(rule["type"], []).append(rule)
+        self.rule_sets = tuple(RuleSet(resource_type, rules) for resource_type, rules in by_type.items())
+
+    def __repr__(self):
+        return "RulePolicy(%r, %d types)" % (self.name, len(self.rule_sets))
+
+
+def load_rule_file(path, default_name=DEFAULT_POLICY_NAME):
+    """The rule policy of a YAML (.yaml, .yml) or JSON rule file, compiled."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    return RulePolicy(document or {}, default_name)
+
+
+def rules_from_environment():
+    """The compiled rule policies of the files listed in PYAWSGUARD_RULES."""
+    paths = [path for path in os.environ.get(RULES_ENV, "").split(os.pathsep) if path]
+    if len(paths) == 1:
+        return [load_rule_file(paths[0])]
+    return [load_rule_file(path, "%s-%s" % (DEFAULT_POLICY_NAME, os.path.splitext(os.path.basename(path))[0]))
+            for path in paths]
@@ -14,77 +14,44 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
 
-from pulumi import log
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+from pyawsguard.policy_document import parse_policy
+from pyawsguard.props import UNKNOWN, view_of
 
 ###################################
 # S3
 ###################################
 # S3 Public Access Block validator
-def s3_public_access_block_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock":         
-        block_public_acls = args.props["blockPublicAcls"]
-        block_public_policy = args.props["blockPublicPolicy"]   
-        ignore_public_acls = args.props["ignorePublicAcls"]
-        restrict_public_buckets = args.props["restrictPublicBuckets"]
-        if not block_public_acls or not block_public_policy or not ignore_public_acls or not restrict_public_buckets:
-            report_violation(
-                "Public access is not blocked for the bucket " + args.name )
-                #"Read more about blocking public access here: https://docs.aws.amazon.com/AmazonS3/latest/dev/access-control-block-public-access.html")
-
-s3_public_access_block = ResourceValidationPolicy(
-    name="s3_public_access_block",
-    description="Validating the publicRead or publicReadWrite permission on AWS S3 buckets.",
-    validate=s3_public_access_block_validator,
-)
+def s3_public_access_block_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    block = view_of(args)
+    flags = (block.block_public_acls, block.block_public_policy, block.ignore_public_acls, block.restrict_public_buckets)
+    # A flag that is unknown during a preview is not held against the bucket
+    if any(not flag for flag in flags if flag is not UNKNOWN):
+        report_violation(
+            "Public access is not blocked for the bucket " + args.name )
+            #"Read more about blocking public access here: https://docs.aws.amazon.com/AmazonS3/latest/dev/access-control-block-public-access.html")
 
 # S3 Bucket policy validator
-def s3_ssl_requests_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:s3/bucketPolicy:BucketPolicy":
-        if "policy" in args.props:
-            flag = 0
-            policy = json.loads(args.props["policy"])
-            if 'Statement' in policy:
-                for stmt in policy["Statement"]:
-                    if "Condition" in stmt and "Bool" in stmt["Condition"] and "aws:SecureTransport" in stmt["Condition"]["Bool"] and stmt["Condition"]["Bool"]["aws:SecureTransport"] == "false":
-                        flag = 1
-                        break
-                if flag == 0:
-                    report_violation("S3 Secure transport flag is not set in bucket policy for " + args.name )
-            else:
-                report_violation("No statements found in policy " + args.name )
+def s3_ssl_requests_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    document = view_of(args).policy
+    if document is UNKNOWN:
+        return
+    if document is not None:
+        policy = parse_policy(document)
+        if policy.has_statement:
+            if not policy.requires_secure_transport():
+                report_violation("S3 Secure transport flag is not set in bucket policy for " + args.name )
         else:
-            report_violation("No policy found in " + args.name )
-
-
-s3_ssl_requests = ResourceValidationPolicy(
-    name="s3-ssl-requests-policy",
-    description="Validating that S3 buckets have TLS checks in bucket policy.",
-    validate=s3_ssl_requests_validator,
-)
+            report_violation("No statements found in policy " + args.name )
+    else:
+        report_violation("No policy found in " + args.name )
 
 # S3 Encryption validator
-def s3_encryption_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:s3/bucket:Bucket":
-        if "serverSideEncryptionConfiguration" not in args.props or args.props["serverSideEncryptionConfiguration"] == None:
-            report_violation(
-                "Default encryption is not enabled for the S3 bucket " + args.name )
-
-s3_encryption_policy = ResourceValidationPolicy(
-    name="s3_encryption_policy",
-    description="Validating default encryption configuration on AWS S3 buckets.",
-    validate=s3_encryption_validator,
-)
\ No newline at end of file
+def s3_encryption_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    if view_of(args).server_side_encryption_configuration is None:
+        report_violation(
+            "Default encryption is not enabled for the S3 bucket " + args.name )
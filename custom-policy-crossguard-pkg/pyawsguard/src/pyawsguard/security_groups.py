@@ -0,0 +1,192 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Exposure analysis of security group ingress rules.
+#
+# The ingress rules of a SecurityGroup (its "ingress" list) or of a SecurityGroupRule,
+# read through their props views, are turned into port intervals and ipaddress networks:
+#   - protocol "-1" (all traffic) opens every port, whatever fromPort/toPort say;
+#     tcp and udp open fromPort..toPort; other protocols (icmp, ...) open no port
+#   - every entry of cidrBlocks and ipv6CidrBlocks is considered, a rule is open to the
+#     internet when one of them is a wide public network such as 0.0.0.0/0 or ::/0
+#   - a rule whose protocol is missing, or whose protocol or ports are unknown during a
+#     preview or not numbers, is skipped, as are unknown CIDR blocks: they are not held
+#     against the group
+# A PortSet holds the sensitive ports as sorted disjoint intervals, so whether a rule
+# opens any of them is a single bisection, whatever the number of ports and rules.
+
+import bisect
+import ipaddress
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from pyawsguard.props import UNKNOWN
+
+# Ports reported by security-group-sensitive-ports when PYAWSGUARD_SENSITIVE_PORTS is
+# not set: remote administration and database ports. SSH (22) has its own policy.
+DEFAULT_SENSITIVE_PORTS = (23, 1433, 1521, 3306, 3389, 5432, 6379, 9200, 11211, 27017)
+
+SENSITIVE_PORTS_ENV = "PYAWSGUARD_SENSITIVE_PORTS"
+
+# A public network with at most this prefix length is treated as the internet, which
+# covers 0.0.0.0/0 and ::/0 as well as their usual splits such as 0.0.0.0/1
+INTERNET_MAX_PREFIX = {4: 8, 6: 16}
+
+ALL_PORTS = (0, 65535)
+
+_PORT_PROTOCOLS = frozenset(("tcp", "udp", "6", "17"))
+_ALL_PROTOCOLS = frozenset(("-1", "all"))
+
+IngressRule = namedtuple("IngressRule", ["from_port", "to_port", "cidrs"])
+
+
+class PortSet:
+    """A set of ports stored as sorted, disjoint, inclusive intervals."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, ports):
+        intervals = sorted(_interval(port) for port in ports)
+        starts = []
+        ends = []
+        for start, end in intervals:
+            if ends and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+
+    def overlaps(self, from_port, to_port):
+        """True when a port of the set lies within from_port..to_port."""
+        # Intervals are disjoint: only the last one starting at or before to_port can
+        # reach from_port
+        index = bisect.bisect_right(self.starts, to_port) - 1
+        return index >= 0 and self.ends[index] >= from_port
+
+    def intersection(self, from_port, to_port):
+        """The (start, end) intervals of the set within from_port..to_port."""
+        first = max(bisect.bisect_right(self.ends, from_port - 1), 0)
+        last = bisect.bisect_right(self.starts, to_port)
+        return [(max(start, from_port), min(end, to_port))
+                for start, end in zip(self.starts[first:last], self.ends[first:last])]
+
+
+def _interval(port):
+    # 22, "22" or "8000-8100"
+    if isinstance(port, str) and "-" in port:
+        start, end = port.split("-", 1)
+        return int(start), int(end)
+    return int(port), int(port)
+
+
+def sensitive_ports():
+    """The PortSet configured with PYAWSGUARD_SENSITIVE_PORTS (comma separated ports
+    and ranges), DEFAULT_SENSITIVE_PORTS otherwise."""
+    configured = os.environ.get(SENSITIVE_PORTS_ENV)
+    if configured:
+        return PortSet(port.strip() for port in configured.split(",") if port.strip())
+    return PortSet(DEFAULT_SENSITIVE_PORTS)
+
+
+@lru_cache(maxsize=4096)
+def is_internet(cidr):
+    """True when the CIDR block is a wide public network, e.g. 0.0.0.0/0 or ::/0."""
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except ValueError:
+        return False
+    return network.prefixlen <= INTERNET_MAX_PREFIX[network.version] and not network.is_private
+
+
+def ingress_rules(view, rule_resource=False):
+    """IngressRules of the props view (props.view_of) of a SecurityGroup, or of a
+    SecurityGroupRule with rule_resource (empty for an egress rule)."""
+    if rule_resource:
+        if view.type != "ingress":
+            return []
+        rule = _rule(view.protocol, view.from_port, view.to_port, view.cidr_blocks, view.ipv6_cidr_blocks)
+        return [rule] if rule is not None else []
+    rules = view.ingress
+    if not isinstance(rules, list):
+        # None, or UNKNOWN during a preview
+        return []
+    normalized = []
+    for rule in rules:
+        if type(rule) is not dict:
+            continue
+        # The entries of the ingress list keep the spelling of the program
+        if "fromPort" in rule or "cidrBlocks" in rule or "toPort" in rule:
+            rule = _rule(rule.get("protocol"), rule.get("fromPort"), rule.get("toPort"), rule.get("cidrBlocks"),
+                         rule.get("ipv6CidrBlocks"))
+        else:
+            rule = _rule(rule.get("protocol"), rule.get("from_port"), rule.get("to_port"), rule.get("cidr_blocks"),
+                         rule.get("ipv6_cidr_blocks"))
+        if rule is not None:
+            normalized.append(rule)
+    return normalized
+
+
+def _rule(protocol, from_port, to_port, cidr_blocks, ipv6_cidr_blocks):
+    # The IngressRule of the values of a rule, None when it opens no port or its
+    # protocol or ports cannot be told
+    ports = _ports(protocol, from_port, to_port)
+    if ports is None:
+        return None
+    cidrs = ()
+    for blocks in (cidr_blocks, ipv6_cidr_blocks):
+        if type(blocks) is list:
+            cidrs += tuple(cidr for cidr in blocks if type(cidr) is str)
+    return IngressRule(ports[0], ports[1], cidrs)
+
+
+def _ports(protocol, from_port, to_port):
+    if protocol is UNKNOWN or protocol is None:
+        return None
+    protocol = str(protocol).lower()
+    if protocol in _ALL_PROTOCOLS:
+        return ALL_PORTS
+    if protocol not in _PORT_PROTOCOLS:
+        return None
+    try:
+        from_port = int(0 if from_port is None else from_port)
+        to_port = int(65535 if to_port is None else to_port)
+    except (TypeError, ValueError):
+        # UNKNOWN, or a value that is not a port
+        return None
+    if from_port > to_port:
+        from_port, to_port = to_port, from_port
+    return from_port, to_port
+
+
+def internet_exposed_ports(rules, ports):
+    """The PortSet of the ports reachable from the internet through rules, None when
+    there is none."""
+    exposed = []
+    for rule in rules:
+        if ports.overlaps(rule.from_port, rule.to_port) and any(is_internet(cidr) for cidr in rule.cidrs):
+            exposed.extend(ports.intersection(rule.from_port, rule.to_port))
+    return PortSet("%d-%d" % interval for interval in exposed) if exposed else None
+
+
+def format_ports(port_set):
+    """"22, 3306, 8000-8100" for the intervals of port_set."""
+    return ", ".join(
+        str(start) if start == end else "%d-%d" % (start, end)
+        for start, end in zip(port_set.starts, port_set.ends)
+    )
@@ -14,36 +14,24 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
 
-from pulumi import log
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+from pyawsguard.policy_document import parse_policy
+from pyawsguard.props import UNKNOWN, view_of
 
 ###################################
 # SQS
 ###################################
 # SQS No public read validation
-def sqs_no_public_access_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:sqs/queuePolicy:QueuePolicy": 
-        policy = json.loads(args.props["policy"])
-        if "Principal" in policy["Statement"][0] and policy["Statement"][0]["Principal"] == "*":
-            report_violation(
-                "Principal in SQS policy cannot be * for queue " + args.name )
-                #"Read more here: https://docs.aws.amazon.com/AWSSimpleQueueService/latest/SQSDeveloperGuide/sqs-security-best-practices.html#ensure-queues-not-publicly-accessible")
-
-sqs_no_public_access = ResourceValidationPolicy(
-    name="sqs-no-public-access",
-    description="Validating if SQS policy has public access permissions.",
-    validate=sqs_no_public_access_validator,
-)
\ No newline at end of file
+def sqs_no_public_access_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    document = view_of(args).policy
+    if document is None or document is UNKNOWN:
+        return
+    policy = parse_policy(document)
+    if policy.public_statements():
+        report_violation(
+            "Principal in SQS policy cannot be * for queue " + args.name )
+            #"Read more here: https://docs.aws.amazon.com/AWSSimpleQueueService/latest/SQSDeveloperGuide/sqs-security-best-practices.html#ensure-queues-not-publicly-accessible")
@@ -0,0 +1,84 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, StackValidationArgs
+
+from pyawsguard.policy_document import parse_policy
+from pyawsguard.resource_graph import UNKNOWN, graph_of, known
+
+VPC = "aws:ec2/vpc:Vpc"
+FLOW_LOG = "aws:ec2/flowLog:FlowLog"
+BUCKET = "aws:s3/bucket:Bucket"
+BUCKET_PUBLIC_ACCESS_BLOCK = "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock"
+BUCKET_POLICY = "aws:s3/bucketPolicy:BucketPolicy"
+VOLUME = "aws:ebs/volume:Volume"
+KMS_KEY = "aws:kms/key:Key"
+
+###################################
+# VPC - Flow logs
+###################################
+
+# Every VPC has a flow log capturing all traffic
+def vpc_flow_log_coverage_validator(args: "StackValidationArgs", report_violation: "ReportViolation"):
+    graph = graph_of(args)
+    for vpc in graph.of_type(VPC):
+        flow_logs = graph.referrers(vpc, FLOW_LOG, "vpcId")
+        if not any(known(flow_log.props, "trafficType") in ("ALL", UNKNOWN) for flow_log in flow_logs):
+            report_violation(
+                "No flow log with trafficType ALL is created for the VPC " + vpc.name, vpc.urn)
+
+
+###################################
+# S3
+###################################
+
+# Every bucket has a public access block and a bucket policy that enforces TLS
+def s3_bucket_protection_validator(args: "StackValidationArgs", report_violation: "ReportViolation"):
+    graph = graph_of(args)
+    for bucket in graph.of_type(BUCKET):
+        if not graph.referrers(bucket, BUCKET_PUBLIC_ACCESS_BLOCK, "bucket"):
+            report_violation(
+                "No BucketPublicAccessBlock is attached to the bucket " + bucket.name, bucket.urn)
+        if not any(_requires_secure_transport(policy) for policy in graph.referrers(bucket, BUCKET_POLICY, "bucket")):
+            report_violation(
+                "No bucket policy requiring secure transport is attached to the bucket " + bucket.name, bucket.urn)
+
+
+def _requires_secure_transport(bucket_policy):
+    policy = known(bucket_policy.props, "policy")
+    if policy is UNKNOWN:
+        return True
+    return policy is not None and parse_policy(policy).requires_secure_transport()
+
+
+###################################
+# EBS Volume
+###################################
+
+# The KMS key of every encrypted volume has automatic rotation turned on
+def ebs_kms_key_rotation_validator(args: "StackValidationArgs", report_violation: "ReportViolation"):
+    graph = graph_of(args)
+    for volume in graph.of_type(VOLUME):
+        # Keys outside of the stack cannot be checked, and without kmsKeyId the AWS
+        # managed key, which is rotated automatically, is used
+        for key in graph.references(volume, "kmsKeyId", KMS_KEY):
+            if known(key.props, "enableKeyRotation", False) not in (True, UNKNOWN):
+                report_violation(
+                    "The KMS key " + key.name + " of the EBS Volume " + volume.name
+                    + " does not have automatic rotation turned on", volume.urn)
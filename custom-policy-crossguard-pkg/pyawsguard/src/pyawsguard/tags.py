@@ -0,0 +1,203 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Tag compliance policy.
+#
+# A tag policy file (YAML or JSON) lists the tag keys that are required on a resource
+# and the values they may take:
+#
+#   tag_policy:
+#     name: tag-compliance            # policy name, the default for a single file
+#     types: [aws:s3/bucket:Bucket]   # types governed, default TAGGABLE_TYPES
+#     tags:
+#       - key: CostCenter
+#         required: true
+#         pattern: "^CC-[0-9]{4}$"
+#       - key: env
+#         values: [dev, test, prod]
+#       - key: Name
+#         required: true
+#         types: [aws:eks/cluster:Cluster]   # only for these types
+#
+# A key that is not required is only checked when it is set. The value of a key must be
+# one of its allowed values, if any are listed, and match each of its patterns whole.
+# Tags, or a tag value, unknown during a preview are not checked: an unknown value counts
+# as set but is never reported.
+#
+# The policy is compiled once per type when the pack is loaded: the required keys into
+# a frozenset, and the allowed values and patterns of each key into one frozenset and
+# one regular expression (the patterns are combined with lookaheads). A resource's
+# tags are then checked in a single pass, at a cost that depends on the number of its
+# tags rather than on the number of rules. Each type is registered as a policy spec of
+# the same name; the tag policy files are read from the paths in PYAWSGUARD_TAG_POLICY
+# (separated by os.pathsep). With several files, a file without a name is named
+# tag-compliance-<file name>, so each file is a policy of its own.
+
+import hashlib
+import json
+import os
+import re
+
+from pyawsguard.props import UNKNOWN, UNKNOWN_VALUES, key_table, resolve
+
+TAG_POLICY_ENV = "PYAWSGUARD_TAG_POLICY"
+
+DEFAULT_POLICY_NAME = "tag-compliance"
+
+# Types governed by a tag policy that does not list its own
+TAGGABLE_TYPES = (
+    "aws:s3/bucket:Bucket",
+    "aws:kms/key:Key",
+    "aws:ebs/volume:Volume",
+    "aws:ec2/instance:Instance",
+    "aws:ec2/vpc:Vpc",
+    "aws:ec2/subnet:Subnet",
+    "aws:ec2/securityGroup:SecurityGroup",
+    "aws:ec2/flowLog:FlowLog",
+    "aws:rds/instance:Instance",
+    "aws:rds/cluster:Cluster",
+    "aws:eks/cluster:Cluster",
+    "aws:sqs/queue:Queue",
+    "aws:sns/topic:Topic",
+    "aws:lambda/function:Function",
+    "aws:dynamodb/table:Table",
+    "aws:iam/role:Role",
+    "aws:cloudwatch/logGroup:LogGroup",
+    "aws:lb/loadBalancer:LoadBalancer",
+)
+
+_TAGS = key_table("tags")
+
+
+class TagSchema:
+    """The tag rules of a policy for one resource type, compiled."""
+
+    __slots__ = ("resource_type", "required", "checks")
+
+    def __init__(self, resource_type, rules):
+        self.resource_type = resource_type
+        self.required = frozenset(rule["key"] for rule in rules if rule.get("required"))
+        values = {}
+        patterns = {}
+        for rule in rules:
+            if "values" in rule:
+                values.setdefault(rule["key"], set()).update(str(value) for value in rule["values"])
+            if "pattern" in rule and rule["pattern"] not in patterns.get(rule["key"], ()):
+                patterns.setdefault(rule["key"], []).append(rule["pattern"])
+        # key -> (allowed values or None, combined pattern or None)
+        self.checks = {
+            key: (frozenset(values[key]) if key in values else None,
+                  _combine(patterns[key]) if key in patterns else None)
+            for key in set(values) | set(patterns)
+        }
+
+    def problems(self, tags):
+        """Descriptions of what is wrong with tags (a dict, or None), empty when they
+        comply. Unknown values (UNKNOWN or an engine sentinel) are not checked."""
+        if not tags:
+            return ["missing required tags %s" % ", ".join(sorted(self.required))] if self.required else []
+        problems = []
+        required = self.required
+        present = 0
+        for key, value in tags.items():
+            if value is None:
+                continue
+            if key in required:
+                present += 1
+            check = self.checks.get(key)
+            if check is None or value is UNKNOWN or (value.__class__ is str and value in UNKNOWN_VALUES):
+                continue
+            allowed, pattern = check
+            if allowed is not None and (value.__class__ is not str or value not in allowed):
+                problems.append("tag %s=%s is not one of %s" % (key, value, ", ".join(sorted(allowed))))
+            if pattern is not None and (not isinstance(value, str) or pattern.match(value) is None):
+                problems.append("tag %s=%s does not match the required format" % (key, value))
+        if present < len(required):
+            # Only a resource that lacks a required key pays for finding out which
+            missing = sorted(key for key in required if tags.get(key) is None)
+            problems.insert(0, "missing required tags %s" % ", ".join(missing))
+        return problems
+
+    def validate(self, args, report_violation):
+        # Plain props are read as they are: problems() recognizes the unknown values of
+        # the keys it checks, rather than every value being normalized first
+        props = args.props
+        tags = props.get("tags") if type(props) is dict else resolve(props, _TAGS)
+        if tags is UNKNOWN or (tags.__class__ is str and tags in UNKNOWN_VALUES):
+            return
+        problems = self.problems(tags if isinstance(tags, dict) else None)
+        if problems:
+            report_violation("Tags do not comply with the tag policy: %s" % "; ".join(problems))
+
+    def __repr__(self):
+        return "TagSchema(%r, %d required, %d checked)" % (self.resource_type, len(self.required), len(self.checks))
+
+
+def _combine(patterns):
+    # One expression that matches a whole value only when every pattern does
+    return re.compile("".join("(?=(?:%s)\\Z)" % pattern for pattern in patterns[:-1]) + "(?:%s)\\Z" % patterns[-1])
+
+
+class TagPolicy:
+    """A tag policy document compiled into a TagSchema per governed type."""
+
+    __slots__ = ("name", "description", "schemas", "digest")
+
+    def __init__(self, document, default_name=DEFAULT_POLICY_NAME):
+        self.name = document.get("name") or default_name
+        self.description = document.get("description", "Validating that resources carry the required tags.")
+        # Identifies the policy's definition, so cached results are invalidated when it changes
+        self.digest = hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        rules = document.get("tags") or ()
+        for rule in rules:
+            if "key" not in rule:
+                raise ValueError("tag policy %s: a tag rule has no 'key'" % self.name)
+            if "pattern" in rule:
+                try:
+                    re.compile(rule["pattern"])
+                except re.error as error:
+                    raise ValueError("tag policy %s: key %s: %s" % (self.name, rule["key"], error))
+        types = tuple(document.get("types") or TAGGABLE_TYPES)
+        for rule in rules:
+            types += tuple(resource_type for resource_type in rule.get("types", ()) if resource_type not in types)
+        self.schemas = tuple(
+            TagSchema(resource_type, [rule for rule in rules if resource_type in rule.get("types", (resource_type,))])
+            for resource_type in types
+        )
+
+    def __repr__(self):
+        return "TagPolicy(%r, %d types)" % (self.name, len(self.schemas))
+
+
+def load_tag_policy_file(path, default_name=DEFAULT_POLICY_NAME):
+    """The tag policy of a YAML (.yaml, .yml) or JSON file, compiled."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    return TagPolicy((document or {}).get("tag_policy", document or {}), default_name)
+
+
+def tag_policies_from_environment():
+    """The compiled tag policies of the files listed in PYAWSGUARD_TAG_POLICY."""
+    paths = [path for path in os.environ.get(TAG_POLICY_ENV, "").split(os.pathsep) if path]
+    if len(paths) == 1:
+        return [load_tag_policy_file(paths[0])]
+    return [load_tag_policy_file(path, "%s-%s" % (DEFAULT_POLICY_NAME, os.path.splitext(os.path.basename(path))[0]))
+            for path in paths]
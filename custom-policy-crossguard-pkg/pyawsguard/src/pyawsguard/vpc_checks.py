@@ -14,35 +14,20 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from pulumi_policy import (
-    EnforcementLevel,
-    PolicyPack,
-    ReportViolation,
-    ResourceValidationArgs,
-    ResourceValidationPolicy,
-)
+from typing import TYPE_CHECKING
 
-from pulumi import log
+if TYPE_CHECKING:
+    from pulumi_policy import ReportViolation, ResourceValidationArgs
 
-import pulumi_aws as aws
-import json
-import time
-import datetime
-import os
+from pyawsguard.props import UNKNOWN, view_of
 
 ###################################
 # VPC - Flow logs
 ###################################
 # VPC Flow logs validation
-def vpc_flow_logs_validator(args: ResourceValidationArgs, report_violation: ReportViolation):
-    if args.resource_type == "aws:ec2/flowLog:FlowLog": 
-        if "trafficType" not in args.props or args.props["trafficType"] != "ALL":
-            report_violation(
-                "VPC flow logs not enabled in the expected configuration for the VPC " + args.name
-            )
-
-vpc_flow_logs_policy = ResourceValidationPolicy(
-    name="vpc-flow-logs-policy",
-    description="Validating if VPC flow logs are created for VPC.",
-    validate=vpc_flow_logs_validator,
-)
\ No newline at end of file
+def vpc_flow_logs_validator(args: "ResourceValidationArgs", report_violation: "ReportViolation"):
+    traffic_type = view_of(args).traffic_type
+    if traffic_type != "ALL" and traffic_type is not UNKNOWN:
+        report_violation(
+            "VPC flow logs not enabled in the expected configuration for the VPC " + args.name
+        )
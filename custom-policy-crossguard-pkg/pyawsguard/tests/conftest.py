@@ -0,0 +1,63 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Shared fixtures of the pyawsguard tests.
+#
+#   python -m pytest        # from custom-policy-crossguard-pkg/pyawsguard, see setup.cfg
+#
+# The tests run against src/ and the synthetic stack generator of benchmarks/ without
+# installing the package. The settings the pack reads from the environment are cleared
+# for every test, so a developer's PYAWSGUARD_* variables do not change the results.
+
+import json
+import os
+
+import pytest
+
+from synthetic_stack import generate_states, urn
+
+from pyawsguard.evaluate import ResourceArgs
+
+# Value the engine sends for a string that is unknown during a preview
+UNKNOWN_STRING = "04da6b54-80e4-46f7-96ec-b56ff0331ba9"
+
+
+@pytest.fixture(autouse=True)
+def pack_environment(monkeypatch):
+    for name in list(os.environ):
+        if name.startswith("PYAWSGUARD_") or name == "PULUMI_STACK_NAME":
+            monkeypatch.delenv(name)
+
+
+def resource(resource_type, props, name="resource"):
+    """ResourceArgs of a resource of the synthetic stack."""
+    return ResourceArgs(resource_type, props, urn(resource_type, name), name)
+
+
+def messages(validator, args, **parameters):
+    """The messages validator reports for args."""
+    reported = []
+    validator(args, lambda message, urn=None: reported.append(message), **parameters)
+    return reported
+
+
+@pytest.fixture
+def stack_export(tmp_path):
+    """Path of a stack export of the synthetic stack, 10 resources of each type."""
+    path = tmp_path / "stack.json"
+    with open(str(path), "w") as f:
+        json.dump({"version": 3, "deployment": {"resources": list(generate_states(10))}}, f)
+    return str(path)
@@ -0,0 +1,148 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Tests of the time budgets (pyawsguard.budgets).
+
+import json
+import time
+
+import pytest
+
+from conftest import resource
+from pyawsguard.budgets import NOT_EVALUATED, Budgets, main, parse_budgets, run_deferred
+from pyawsguard.pack_config import PACK_CONFIG_ENV
+from pyawsguard.registry import PolicyRegistry, PolicySpec
+
+KEY = "aws:kms/key:Key"
+
+# Milliseconds
+BUDGET = 20
+SLOW = 60
+
+
+def slow_validator(args, report_violation):
+    if args.props.get("slow"):
+        time.sleep(SLOW / 1000)
+    report_violation("checked " + args.name)
+
+
+SPEC = PolicySpec("slow-policy", "Test", KEY, "kms_checks:kms_no_automatic_rotation_validator",
+                  validator=slow_validator)
+ADVISORY_SPEC = SPEC.configured("advisory")
+
+
+def keys(*slow):
+    return [resource(KEY, {"slow": value}, "key-%d" % index) for index, value in enumerate(slow)]
+
+
+def run(guarded, resources):
+    reported = []
+    for args in resources:
+        guarded(args, lambda message, urn=None: reported.append(message))
+    return reported
+
+
+def test_parse_budgets():
+    assert parse_budgets("50, s3-ssl-requests-policy=200,kms=0.5") == (
+        50000000, {"s3-ssl-requests-policy": 200000000, "kms": 500000})
+    with pytest.raises(ValueError, match="not a number of milliseconds"):
+        parse_budgets("fast")
+
+
+def test_policies_without_a_budget_are_not_guarded():
+    budgets = Budgets(budgets_ns={"other-policy": 1})
+    assert budgets.guard(SPEC, slow_validator) is slow_validator
+    budgets.close()
+
+
+def test_calls_over_their_budget_open_the_circuit_breaker(tmp_path, capsys):
+    queue = str(tmp_path / "deferred.jsonl")
+    budgets = Budgets(default_ns=BUDGET * 1000000, trips=2, deferred_path=queue, on_trip="warn")
+    guarded = budgets.guard(ADVISORY_SPEC, slow_validator)
+    # A call over its budget runs to its end and reports its violations
+    assert run(guarded, keys(False, True, False)) == ["checked key-0", "checked key-1", "checked key-2"]
+    policy = budgets.policies[0]
+    assert (policy.overruns, policy.open, policy.deferred) == (1, False, 0)
+
+    # The second overrun opens the circuit breaker: the policy is no longer run
+    assert run(guarded, keys(True, False)) == ["checked key-0"]
+    assert (policy.overruns, policy.open, policy.deferred) == (2, True, 1)
+    budgets.close()
+    errors = capsys.readouterr().err
+    assert "slow-policy is NO LONGER EVALUATED" in errors
+    assert "NOT GATED by these advisory policies" in errors
+
+    with open(queue) as f:
+        deferred = [json.loads(line) for line in f]
+    assert [(entry["name"], entry["policy"]) for entry in deferred] == [("key-1", "slow-policy")]
+    # Out of band, without budgets
+    violations = list(run_deferred(queue, PolicyRegistry([SPEC], ())))
+    assert [violation.message for violation in violations] == ["checked key-1"]
+
+
+@pytest.mark.parametrize("on_trip", ["fail", "warn"])
+def test_mandatory_policies_fail_the_evaluations_not_run(capsys, on_trip):
+    budgets = Budgets(default_ns=BUDGET * 1000000, trips=1, on_trip=on_trip)
+    guarded = budgets.guard(SPEC, slow_validator)
+    reported = run(guarded, keys(True, False))
+    assert reported[0] == "checked key-0"
+    assert reported[1].startswith(NOT_EVALUATED + " (circuit breaker open)")
+    budgets.close()
+    assert "reported as violations" in capsys.readouterr().err
+
+
+def test_advisory_policies_fail_by_default():
+    budgets = Budgets(default_ns=BUDGET * 1000000, trips=1)
+    reported = run(budgets.guard(ADVISORY_SPEC, slow_validator), keys(True, False))
+    assert reported[1].startswith(NOT_EVALUATED)
+    budgets.close()
+
+
+def test_the_total_budget_bounds_every_policy():
+    budgets = Budgets(total_ns=BUDGET * 1000000, on_trip="warn")
+    reported = run(budgets.guard(ADVISORY_SPEC, slow_validator), keys(True, False, False))
+    assert reported == ["checked key-0"]
+    assert budgets.total_spent
+    assert budgets.policies[0].deferred == 2
+    budgets.close()
+
+
+def test_errors_of_the_validator_are_raised():
+    def failing(args, report_violation):
+        raise RuntimeError("broken validator")
+
+    budgets = Budgets(default_ns=SLOW * 1000000)
+    with pytest.raises(RuntimeError, match="broken validator"):
+        budgets.guard(SPEC, failing)(keys(False)[0], None)
+    budgets.close()
+
+
+def test_unknown_on_trip_setting():
+    with pytest.raises(ValueError, match="PYAWSGUARD_BUDGET_ON_TRIP must be one of fail, warn"):
+        Budgets(on_trip="ignore")
+
+
+@pytest.mark.parametrize("enforcement, exit_code", [(None, 1), ("advisory", 0)])
+def test_main_fails_only_for_mandatory_violations(tmp_path, monkeypatch, capsys, enforcement, exit_code):
+    queue = tmp_path / "deferred.jsonl"
+    queue.write_text(json.dumps({"policy": "kms-no-automatic-rotation", "type": KEY, "urn": "urn", "name": "key",
+                                 "props": {}, "reason": "circuit breaker open"}) + "\n")
+    if enforcement:
+        config = tmp_path / "pack-config.json"
+        config.write_text(json.dumps({"policies": {"kms-no-automatic-rotation": {"enforcement": enforcement}}}))
+        monkeypatch.setenv(PACK_CONFIG_ENV, str(config))
+    assert main([str(queue)]) == exit_code
+    assert "KMS key automatic rotation should be turned on for key key" in capsys.readouterr().out
@@ -0,0 +1,129 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the columnar bulk evaluation (pyawsguard.bulk): the same violations as the
+# per-resource validators, with and without NumPy.
+
+import pytest
+
+from synthetic_stack import generate_states
+
+import pyawsguard.bulk as bulk
+from conftest import UNKNOWN_STRING, resource
+from pyawsguard.cache import ResultCache
+from pyawsguard.evaluate import evaluate, resource_from_state
+from pyawsguard.props import snake_case
+from pyawsguard.registry import POLICY_SPECS, PolicyRegistry, PolicySpec
+
+# Values of the column properties that the masks must treat like the validators do
+ODD_VALUES = (True, False, None, 0, 1, 1.0, "", "true", "false", "ALL", "all", "REJECT", {}, {"rule": {}}, [],
+              [True], [1, 2], UNKNOWN_STRING, "1c4a061d-8072-4f0a-a4cb-0ff528b18fe7")
+
+_ABSENT = object()
+
+
+@pytest.fixture(params=["numpy", "pure python"])
+def columns(request, monkeypatch):
+    if request.param == "numpy":
+        if bulk.numpy is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(bulk, "numpy", None)
+    return request.param
+
+
+def column_specs():
+    return [spec for spec in POLICY_SPECS if spec.validator_ref in bulk.COLUMN_PREDICATES]
+
+
+def test_column_predicates_cover_validators_of_the_pack():
+    assert sorted(spec.validator_ref for spec in column_specs()) == sorted(bulk.COLUMN_PREDICATES)
+
+
+@pytest.mark.parametrize("spelling", ["camelCase", "snake_case", "both"])
+def test_parity_on_unusual_values(columns, spelling):
+    resources = []
+    for spec in column_specs():
+        key = bulk.COLUMN_PREDICATES[spec.validator_ref][0]
+        snake = snake_case(key)
+        for index, value in enumerate(ODD_VALUES + (_ABSENT,)):
+            props = {"other": index}
+            if value is not _ABSENT:
+                if spelling == "snake_case":
+                    props[snake] = value
+                elif spelling == "both":
+                    # camelCase is read first, snake_case when it is null
+                    props[key] = None if index % 2 else value
+                    props[snake] = ODD_VALUES[-index]
+                else:
+                    props[key] = value
+            resources.append(resource(spec.resource_type, props, "%s-%d" % (key, index)))
+    registry = PolicyRegistry(column_specs(), ())
+    expected = sorted(evaluate(resources, registry))
+    assert expected
+    assert sorted(bulk.evaluate_bulk(resources, registry)) == expected
+
+
+def test_parity_on_the_synthetic_stack(columns, monkeypatch):
+    # In chunks smaller than the stack, the stack policies still see every resource
+    monkeypatch.setattr(bulk, "CHUNK_SIZE", 100)
+    resources = [resource_from_state(state) for state in generate_states(20, violating=0.3)]
+    registry = PolicyRegistry()
+    assert sorted(bulk.evaluate_bulk(iter(resources), registry)) == sorted(evaluate(resources, registry))
+
+
+def test_only_the_rows_not_known_to_pass_are_validated(columns):
+    values = [
+        {"deletionProtection": True},
+        {"deletionProtection": False},
+        {"deletionProtection": UNKNOWN_STRING},
+        {},
+        {"deletionProtection": 1},
+        {"deletion_protection": True},
+        {"deletionProtection": None, "deletion_protection": True},
+        {"deletionProtection": False, "deletion_protection": True},
+    ]
+    rows = [resource("aws:rds/instance:Instance", props, "db-%d" % index) for index, props in enumerate(values)]
+    predicate = bulk.COLUMN_PREDICATES["rds_checks:rds_deletion_protection_validator"]
+    assert bulk.failing_rows(rows, predicate) == [1, 2, 3, 4, 7]
+
+
+def test_the_result_cache_is_used(tmp_path):
+    resources = [resource_from_state(state) for state in generate_states(10, violating=0.5)]
+    registry = PolicyRegistry()
+    runs = []
+    for _ in range(2):
+        cache = ResultCache.in_directory(str(tmp_path))
+        runs.append((sorted(bulk.evaluate_bulk(resources, registry, cache)), cache.hits))
+        cache.close()
+    assert runs[0][0] == runs[1][0] == sorted(evaluate(resources, registry))
+    assert runs[0][1] == 0 and runs[1][1] > 0
+
+
+def test_policies_with_parameters_run_per_resource(columns):
+    # A column predicate describes the validator without parameters: with parameters,
+    # the validator must see every resource, not only the rows the predicate selects
+    def rotated_keys(args, report_violation, marker=None):
+        if args.props.get("enableKeyRotation") is True:
+            report_violation("%s: %s" % (marker, args.name))
+
+    spec = PolicySpec("rotated-keys", "Test", "aws:kms/key:Key", "kms_checks:kms_no_automatic_rotation_validator",
+                      validator=rotated_keys, parameters={"marker": "rotated"})
+    resources = [resource("aws:kms/key:Key", {"enableKeyRotation": rotation}, "key-%s" % rotation)
+                 for rotation in (True, False)]
+    violations = list(bulk.evaluate_bulk(resources, PolicyRegistry([spec], ())))
+    assert [violation.message for violation in violations] == ["rotated: key-True"]
@@ -0,0 +1,71 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the incremental result cache (pyawsguard.cache) of the offline evaluator.
+
+from conftest import resource
+from pyawsguard.cache import ResultCache, policy_version
+from pyawsguard.evaluate import evaluate
+from pyawsguard.registry import POLICY_SPECS, PolicyRegistry
+
+KEY = "aws:kms/key:Key"
+QUEUE_POLICY = "aws:sqs/queuePolicy:QueuePolicy"
+
+SPECS = [spec for spec in POLICY_SPECS if spec.resource_type in (KEY, QUEUE_POLICY)]
+
+
+def keys(*rotations):
+    return [resource(KEY, {"enableKeyRotation": rotation}, "key-%d" % index)
+            for index, rotation in enumerate(rotations)]
+
+
+def run(resources, registry, cache_dir):
+    cache = ResultCache.in_directory(cache_dir)
+    violations = list(evaluate(resources, registry, cache))
+    cache.close()
+    return violations, cache.hits, cache.misses
+
+
+def test_unchanged_resources_replay_their_violations(tmp_path):
+    registry = PolicyRegistry(SPECS, ())
+    resources = keys(False, True, False)
+    expected = list(evaluate(resources, registry))
+    assert len(expected) == 2
+    assert run(resources, registry, str(tmp_path)) == (expected, 0, 3)
+    assert run(resources, registry, str(tmp_path)) == (expected, 3, 0)
+
+
+def test_changed_props_are_validated_again(tmp_path):
+    registry = PolicyRegistry(SPECS, ())
+    run(keys(False, True), registry, str(tmp_path))
+    violations, hits, misses = run(keys(True, True), registry, str(tmp_path))
+    assert (violations, hits, misses) == ([], 1, 1)
+
+
+def test_a_changed_policy_invalidates_its_results(tmp_path):
+    spec = SPECS[[spec.resource_type for spec in SPECS].index(KEY)]
+    run(keys(False), PolicyRegistry([spec], ()), str(tmp_path))
+    # The same policy with parameters or a new definition has another version
+    changed = spec.configured(spec.enforcement_level, version="new definition")
+    assert policy_version(changed) != policy_version(spec)
+    violations, hits, misses = run(keys(False), PolicyRegistry([changed], ()), str(tmp_path))
+    assert (len(violations), hits, misses) == (1, 0, 1)
+
+
+def test_the_policy_version_follows_the_check_module_and_its_imports():
+    versions = {spec.validator_ref.split(":")[0]: policy_version(spec) for spec in POLICY_SPECS}
+    assert len(set(versions.values())) == len(versions)
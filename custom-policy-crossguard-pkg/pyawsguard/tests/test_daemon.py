@@ -0,0 +1,70 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Tests of the resident daemon (pyawsguard.daemon), served on a socket of the test's
+# temporary directory.
+
+import threading
+
+import pytest
+
+from pyawsguard import daemon
+from pyawsguard.evaluate import evaluate_document
+from pyawsguard.registry import PolicyRegistry, registry
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "daemon.sock")
+    server = daemon._Server(path, daemon._Handler)
+    server.daemon = daemon.Daemon()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_documents_are_evaluated_by_the_daemon(server, stack_export):
+    client = daemon.DaemonClient(server.server_address)
+    results, saved_ms = client.evaluate([stack_export, stack_export])
+    expected = evaluate_document(stack_export)
+    assert [result.violations for result in results] == [expected.violations] * 2
+    assert results[0].resources == expected.resources
+    assert saved_ms == round(server.daemon.load_ms, 1)
+
+    stats = client.request("stats")
+    client.close()
+    # Status requests are not evaluations and save nothing
+    assert (stats["evaluations"], stats["documents"], stats["resources"]) == (1, 2, 2 * expected.resources)
+    assert stats["saved_ms"] == round(server.daemon.load_ms, 1)
+
+
+def test_clients_with_other_policies_are_refused(server, stack_export, monkeypatch):
+    other = PolicyRegistry(registry.specs[1:], registry.stack_specs)
+    assert daemon.fingerprint(other) != daemon.fingerprint(registry)
+    monkeypatch.setattr(daemon, "registry", other)
+    client = daemon.DaemonClient(server.server_address)
+    with pytest.raises(daemon.DaemonError, match="the policies of the client differ"):
+        client.evaluate([stack_export])
+    assert client.request("stats")["refused"] == 1
+    client.close()
+
+
+def test_the_fingerprint_follows_the_enforcement_levels():
+    levels = PolicyRegistry([spec.configured("advisory") for spec in registry.specs], registry.stack_specs)
+    assert daemon.fingerprint(levels) != daemon.fingerprint(registry)
+    assert daemon.fingerprint(PolicyRegistry(registry.specs, registry.stack_specs)) == daemon.fingerprint(registry)
@@ -0,0 +1,119 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the offline evaluator (python -m pyawsguard.evaluate).
+
+import json
+
+import pytest
+
+from synthetic_stack import generate_states, urn
+
+from conftest import UNKNOWN_STRING
+from pyawsguard.evaluate import (StackResources, StreamedResult, evaluate, evaluate_documents, load_resources, main,
+                                 resource_from_state)
+from pyawsguard.registry import STACK_POLICY_SPECS, PolicyRegistry, PolicySpec
+
+VPC = "aws:ec2/vpc:Vpc"
+VOLUME = "aws:ebs/volume:Volume"
+
+
+def state(resource_type, name, inputs):
+    return {"urn": urn(resource_type, name), "type": resource_type, "custom": True, "inputs": inputs}
+
+
+def write(tmp_path, name, document, indent=None):
+    path = tmp_path / name
+    path.write_text(json.dumps(document, indent=indent))
+    return str(path)
+
+
+def export(tmp_path, *states):
+    return write(tmp_path, "stack.json", {"deployment": {"resources": list(states)}})
+
+
+def test_preview_documents_with_unknown_values(tmp_path):
+    path = write(tmp_path, "preview.json", {"steps": [
+        {"op": "create", "newState": state(VOLUME, "data", {"encrypted": UNKNOWN_STRING})},
+        {"op": "delete"},
+        {"op": "create", "newState": dict(state("pulumi:providers:aws", "default", {}), custom=True)},
+    ]}, indent=2)
+    resources = list(load_resources(path))
+    assert [(args.resource_type, args.name) for args in resources] == [(VOLUME, "data")]
+    assert main([path]) == 0
+
+
+@pytest.mark.parametrize("states, exit_code", [
+    # vpc-flow-log-coverage is advisory: reported without failing the run
+    ([state(VPC, "vpc", {"cidrBlock": "10.0.0.0/16"})], 0),
+    ([state(VOLUME, "volume", {"encrypted": False})], 1),
+])
+def test_only_mandatory_violations_fail_the_run(tmp_path, capsys, states, exit_code):
+    assert main([export(tmp_path, *states), "--format", "json"]) == exit_code
+    violations = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(violations) == 1
+    assert violations[0]["enforcement_level"] == ("mandatory" if exit_code else "advisory")
+
+
+def test_documents_evaluated_in_process_are_streamed(tmp_path):
+    path = export(tmp_path, state(VOLUME, "volume", {"encrypted": False}))
+    result, = evaluate_documents([path], jobs=1)
+    assert isinstance(result, StreamedResult)
+    assert not isinstance(result.violations, list)
+    assert result.resources == 0
+    assert [violation.name for violation in result.violations] == ["volume"]
+    assert result.resources == 1
+
+
+def test_reports(tmp_path, capsys):
+    path = export(tmp_path, state(VOLUME, "volume", {"encrypted": False}), state(VPC, "vpc", {}))
+    sarif = str(tmp_path / "report.sarif")
+    junit = str(tmp_path / "report.xml")
+    assert main([path, "--sarif", sarif, "--junit", junit]) == 1
+    assert capsys.readouterr().out.startswith("Policy Violations:\n")
+    with open(sarif) as f:
+        results = json.load(f)["runs"][0]["results"]
+    assert sorted(result["ruleId"] for result in results) == ["ebs_encryption_policy", "vpc-flow-log-coverage"]
+    with open(junit) as f:
+        report = f.read()
+    # Advisory violations are skipped test cases, every active policy is a test case
+    assert (report.count("<failure"), report.count("<skipped")) == (1, 1)
+    assert 'vpc-flow-logs-policy" name=' in report
+
+
+def test_stack_policies_keep_only_what_they_read():
+    resources = [resource_from_state(state) for state in generate_states(20, violating=0.5)]
+    kept = StackResources(PolicyRegistry((), STACK_POLICY_SPECS))
+    for args in resources:
+        kept.add(args)
+    assert kept.count == len(resources)
+    assert {args.resource_type for args in kept.resources} == {
+        "aws:ec2/vpc:Vpc", "aws:ec2/flowLog:FlowLog", "aws:s3/bucket:Bucket", "aws:ebs/volume:Volume",
+        "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock", "aws:s3/bucketPolicy:BucketPolicy",
+        "aws:kms/key:Key"}
+    assert all(set(args.props) <= {"id", "arn", "bucket", "policy"}
+               for args in kept.resources if args.resource_type == "aws:s3/bucketPolicy:BucketPolicy")
+
+    # Stack policies that do not declare what they read see every resource whole
+    whole = [PolicySpec(spec.name, spec.description, None, "custom:" + spec.name, validator=spec.validator,
+                        enforcement_level=spec.enforcement_level) for spec in STACK_POLICY_SPECS]
+    kept = StackResources(PolicyRegistry((), whole))
+    for args in resources:
+        kept.add(args)
+    assert kept.resources == resources
+    violations = list(evaluate(resources, PolicyRegistry((), STACK_POLICY_SPECS)))
+    assert violations and violations == list(evaluate(resources, PolicyRegistry((), whole)))
@@ -0,0 +1,163 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the pack configuration (pyawsguard.pack_config) and of its use by every
+# entry point.
+
+import json
+
+import pytest
+
+from conftest import resource
+from pyawsguard import budgets
+from pyawsguard.evaluate import evaluate, evaluate_document
+from pyawsguard.pack_config import (
+    PACK_CONFIG_ENV,
+    STACK_ENV,
+    PackConfig,
+    active_registry,
+    active_rules,
+    registry_from_environment,
+)
+from pyawsguard.registry import PolicyRegistry
+
+CONFIG = {
+    "exclude": ["eks-cluster-tags_policy"],
+    "policies": {
+        "security-group-sensitive-ports": {"parameters": {"ports": [5432]}},
+    },
+    "stacks": {
+        "*-dev": {
+            "exclude": ["eks-*", "rds_deletion_protection_policy"],
+            "policies": {"kms-no-automatic-rotation": {"enforcement": "advisory"}},
+        },
+        "data-*": {"include": ["s3*", "kms-*"]},
+        "legacy": {"policies": {"ebs_encryption_policy": {"enforcement": "disabled"}}},
+    },
+}
+
+KEY = "aws:kms/key:Key"
+SECURITY_GROUP = "aws:ec2/securityGroup:SecurityGroup"
+
+
+def names(rules):
+    return {rule.spec.name for rule in rules}
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "pack-config.json"
+    path.write_text(json.dumps({"pack_config": CONFIG}))
+    monkeypatch.setenv(PACK_CONFIG_ENV, str(path))
+    return str(path)
+
+
+def test_without_a_configuration_every_policy_is_active():
+    registry = PolicyRegistry()
+    table = active_rules(registry)
+    assert [rule.spec for rule in table.rules] == list(registry.specs)
+    assert [rule.spec for rule in table.stack_rules] == list(registry.stack_specs)
+    assert table.excluded == ()
+
+
+def test_stack_sections_apply_in_order():
+    registry = PolicyRegistry()
+    config = PackConfig(CONFIG)
+    prod = config.resolve(registry, "prod")
+    assert prod.excluded == ("eks-cluster-tags_policy",)
+    dev = config.resolve(registry, "app-dev")
+    assert set(dev.excluded) == {"eks-cluster-default-logs", "eks-cluster-tags_policy", "eks-cluster-kms-key",
+                                 "rds_deletion_protection_policy"}
+    data = config.resolve(registry, "data-lake")
+    assert names(data.rules) == {"s3_public_access_block", "s3_encryption_policy", "s3-ssl-requests-policy",
+                                 "kms-no-automatic-rotation"}
+    assert names(data.stack_rules) == {"s3-bucket-protection"}
+    assert "ebs_encryption_policy" not in names(config.resolve(registry, "legacy").rules)
+
+
+def test_enforcement_levels_and_parameters():
+    dev = PackConfig(CONFIG).resolve(PolicyRegistry(), "app-dev")
+    kms = next(rule for rule in dev.rules if rule.spec.name == "kms-no-automatic-rotation")
+    assert kms.enforcement_level == kms.spec.enforcement_level == "advisory"
+    ports = [rule for rule in dev.rules if rule.spec.name == "security-group-sensitive-ports"]
+    assert [dict(rule.parameters) for rule in ports] == [{"ports": (5432,)}] * 2
+    assert all(rule.spec.parameters == rule.parameters for rule in ports)
+
+
+def test_parameters_are_bound_to_the_validator():
+    registry = active_registry(None, None, PolicyRegistry())
+    configured = PackConfig(CONFIG).resolve(PolicyRegistry(), "prod")
+    spec = next(rule.spec for rule in configured.rules if rule.spec.resource_type == SECURITY_GROUP
+                and rule.spec.name == "security-group-sensitive-ports")
+    group = resource(SECURITY_GROUP, {"ingress": [
+        {"protocol": "tcp", "fromPort": 3306, "toPort": 5432, "cidrBlocks": ["0.0.0.0/0"]}]}, "group")
+    default = [violation.message for violation in evaluate([group], registry)
+               if violation.policy_name == spec.name]
+    assert default == ["This Security group group allows access from all addresses to ports 3306, 3389, 5432"]
+    assert [violation.message for violation in evaluate([group], PolicyRegistry([spec], ()))] == [
+        "This Security group group allows access from all addresses to ports 5432"]
+
+
+def test_unknown_parameters_are_rejected_on_first_use():
+    config = PackConfig({"policies": {"kms-no-automatic-rotation": {"parameters": {"bogus": 1}}}})
+    spec = next(rule.spec for rule in config.resolve(PolicyRegistry()).rules if rule.parameters)
+    with pytest.raises(ValueError, match="kms-no-automatic-rotation .* does not take the parameters bogus"):
+        spec.validator
+
+
+@pytest.mark.parametrize("document, error", [
+    ({"policies": {"no-such-policy": {"enforcement": "advisory"}}}, "no policy named 'no-such-policy'"),
+    ({"policies": {"kms-no-automatic-rotation": {"enforcement": "strict"}}}, "enforcement must be one of"),
+    ({"exclude": "kms-no-automatic-rotation"}, "'exclude' must be a list"),
+    ({"stacks": {"dev": {"include": "*"}}}, "stack dev: 'include' must be a list"),
+    ({"policies": {"kms-no-automatic-rotation": {"parameters": [1]}}}, "'parameters' must be a mapping"),
+])
+def test_invalid_configurations(document, error):
+    with pytest.raises(ValueError, match=error):
+        PackConfig(document).resolve(PolicyRegistry())
+
+
+def test_the_active_registry_is_resolved_once(config_file):
+    assert active_registry(config_file, "prod") is active_registry(config_file, "prod")
+    assert active_registry(config_file, "prod") is not active_registry(config_file, "app-dev")
+
+
+def test_every_offline_mode_runs_the_configured_policies(config_file, monkeypatch, stack_export):
+    monkeypatch.setenv(STACK_ENV, "data-lake")
+    expected = evaluate_document(stack_export).violations
+    assert {violation.policy_name for violation in expected} == {
+        "s3_encryption_policy", "s3_public_access_block", "s3-ssl-requests-policy", "kms-no-automatic-rotation",
+        "s3-bucket-protection"}
+    assert registry_from_environment() is active_registry(config_file, "data-lake")
+    assert sorted(evaluate_document(stack_export, bulk=True).violations) == sorted(expected)
+    shards = [evaluate_document(stack_export, shard=(index, 2)).violations for index in range(2)]
+    assert sorted(violation for shard in shards for _, violation in shard) == sorted(expected)
+    # The daemon evaluates for the configuration and stack of its client
+    monkeypatch.delenv(PACK_CONFIG_ENV)
+    assert evaluate_document(stack_export, pack=(config_file, "data-lake")).violations == expected
+    assert evaluate_document(stack_export).violations != expected
+
+
+def test_deferred_evaluations_run_the_configured_policies(config_file, monkeypatch, tmp_path):
+    monkeypatch.setenv(STACK_ENV, "app-dev")
+    queue = tmp_path / "deferred.jsonl"
+    queue.write_text(json.dumps({"policy": "kms-no-automatic-rotation", "type": KEY, "name": "key",
+                                 "urn": "urn:pulumi:app-dev::p::aws:kms/key:Key::key",
+                                 "props": {"enableKeyRotation": False}, "reason": "test"}) + "\n")
+    violations = list(budgets.run_deferred(str(queue)))
+    assert [(violation.policy_name, violation.enforcement_level) for violation in violations] == [
+        ("kms-no-automatic-rotation", "advisory")]
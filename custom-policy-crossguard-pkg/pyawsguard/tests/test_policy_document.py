@@ -0,0 +1,60 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the policy document parser (pyawsguard.policy_document).
+
+import json
+
+import pytest
+
+from pyawsguard.policy_document import clear_cache, parse_policy
+
+
+def tls_statement(effect):
+    return {"Effect": effect, "Principal": "*", "Action": "s3:*", "Resource": "arn:aws:s3:::bucket/*",
+            "Condition": {"Bool": {"aws:SecureTransport": "false"}}}
+
+
+def document(*statements):
+    return json.dumps({"Version": "2012-10-17", "Statement": list(statements)})
+
+
+@pytest.mark.parametrize("statements, required", [
+    ([tls_statement("Deny")], True),
+    # An Allow on the same condition grants access without TLS
+    ([tls_statement("Allow")], False),
+    ([{"Effect": "Deny", "Principal": "*", "Action": "s3:*", "Condition": {"Bool": {"aws:SecureTransport": "true"}}}],
+     False),
+    ([], False),
+])
+def test_requires_secure_transport(statements, required):
+    assert parse_policy(document(*statements)).requires_secure_transport() is required
+
+
+def test_a_single_statement_and_public_statements():
+    policy = parse_policy({"Statement": {"Effect": "Allow", "Principal": {"AWS": ["*"]}, "Action": "sqs:*"}})
+    assert len(policy.statements) == 1
+    assert policy.public_statements() == list(policy.statements)
+    assert policy.statements[0].actions == ("sqs:*",)
+    assert parse_policy(document(tls_statement("Deny"))).public_statements() == []
+
+
+def test_documents_are_parsed_once_per_text():
+    clear_cache()
+    text = document(tls_statement("Deny"))
+    assert parse_policy(text) is parse_policy(text)
+    assert parse_policy(text) is not parse_policy(document(tls_statement("Allow")))
@@ -0,0 +1,96 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the property views (pyawsguard.props).
+
+from conftest import UNKNOWN_STRING, resource
+from pyawsguard.props import (UNKNOWN, GenericView, camel_case, key_table, normalized, resolve, snake_case, view_class,
+                              view_of)
+
+VOLUME = "aws:ebs/volume:Volume"
+KEY = "aws:kms/key:Key"
+CLUSTER = "aws:eks/cluster:Cluster"
+
+
+def test_snake_case_and_key_table():
+    assert snake_case("enabledClusterLogTypes") == "enabled_cluster_log_types"
+    assert key_table("encryptionConfig.provider.keyArn") == (
+        ("encryptionConfig", "encryption_config"), ("provider",), ("keyArn", "key_arn"))
+    assert key_table("rules.0.name") == (("rules",), 0, ("name",))
+    assert camel_case("enabled_cluster_log_types") == "enabledClusterLogTypes"
+
+
+def test_camel_case_and_snake_case_properties_read_alike():
+    camel = view_of(resource(CLUSTER, {"enabledClusterLogTypes": ["api"],
+                                       "encryptionConfig": {"provider": {"keyArn": "arn:key"}}}))
+    snake = view_of(resource(CLUSTER, {"enabled_cluster_log_types": ["api"],
+                                       "encryption_config": {"provider": {"key_arn": "arn:key"}}}))
+    for view in (camel, snake):
+        assert view.enabled_cluster_log_types == ["api"]
+        assert view.encryption_key_arn == "arn:key"
+        assert view.tags is None
+
+
+def test_unknown_values_read_as_unknown():
+    view = view_of(resource(CLUSTER, {"tags": UNKNOWN_STRING, "encryptionConfig": {"provider": UNKNOWN_STRING}}))
+    assert view.tags is UNKNOWN
+    # A path through an unknown value has no value
+    assert view.encryption_key_arn is None
+    assert normalized({"a": [UNKNOWN_STRING, 1], "b": "x"}) == {"a": [UNKNOWN, 1], "b": "x"}
+
+
+def test_plain_values_are_not_copied():
+    tags = {"Name": "cluster"}
+    assert view_of(resource(CLUSTER, {"tags": tags})).tags is tags
+
+
+def test_resolve_indexes_lists():
+    props = {"rules": [{"name": "first"}, {"name": "second"}]}
+    assert resolve(props, key_table("rules.1.name")) == "second"
+    assert resolve(props, key_table("rules.2.name")) is None
+    assert resolve(props, key_table("rules.name")) is None
+
+
+def test_view_class_of_a_schema():
+    view = view_class("aws:sqs/queue:Queue", {"delay": "delaySeconds", "dlq": "redrivePolicy.deadLetterTargetArn"})
+    queue = view({"delay_seconds": 5, "redrivePolicy": {"deadLetterTargetArn": "arn:dlq"}})
+    assert type(queue).__name__ == "QueueView"
+    assert (queue.delay, queue.dlq) == (5, "arn:dlq")
+
+
+def test_views_follow_the_type_and_the_props_of_each_call():
+    # The same props object validated as two types, and changed between two calls
+    props = {"encrypted": False, "enableKeyRotation": False}
+    assert view_of(resource(VOLUME, props)).encrypted is False
+    assert view_of(resource(KEY, props)).enable_key_rotation is False
+    args = resource(VOLUME, props)
+    props["encrypted"] = True
+    assert view_of(args).encrypted is True
+    args.props = {"encrypted": UNKNOWN_STRING}
+    assert view_of(args).encrypted is UNKNOWN
+
+
+def test_types_without_a_view_class_get_a_generic_view():
+    view = view_of(resource("aws:sqs/queue:Queue", {"delaySeconds": 5, "kms_master_key_id": UNKNOWN_STRING}))
+    assert isinstance(view, GenericView)
+    assert (view.delay_seconds, view.kms_master_key_id, view.fifo_queue) == (5, UNKNOWN, None)
+
+
+def test_views_of_missing_props():
+    assert view_of(resource(VOLUME, None)).encrypted is None
+    assert repr(view_of(resource(CLUSTER, {"tags": {}}))) == (
+        "ClusterView(enabled_cluster_log_types=None, tags={}, encryption_key_arn=None)")
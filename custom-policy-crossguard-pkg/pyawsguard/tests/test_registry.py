@@ -0,0 +1,103 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the policy registry (pyawsguard.registry).
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import resource
+from pyawsguard.registry import POLICY_SPECS, STACK_POLICY_SPECS, PolicyRegistry, PolicySpec, check_policy_names
+from pyawsguard.rules import RulePolicy
+
+VOLUME = "aws:ebs/volume:Volume"
+SECURITY_GROUP = "aws:ec2/securityGroup:SecurityGroup"
+SECURITY_GROUP_RULE = "aws:ec2/securityGroupRule:SecurityGroupRule"
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+
+def test_specs_for_returns_the_specs_of_the_type_in_registration_order():
+    registry = PolicyRegistry()
+    specs = registry.specs_for(SECURITY_GROUP)
+    assert [spec.name for spec in specs] == ["security-group-ssh-policy", "security-group-sensitive-ports"]
+    assert all(spec.resource_type == SECURITY_GROUP for spec in specs)
+    assert registry.specs_for("aws:iam/role:Role") == ()
+    assert registry.resource_types() == frozenset(spec.resource_type for spec in POLICY_SPECS)
+
+
+def test_a_policy_registered_twice_for_a_type_is_rejected():
+    spec = PolicySpec("ebs_encryption_policy", "Duplicate", VOLUME, "ebs_checks:ebs_encryption_validator")
+    with pytest.raises(ValueError, match="ebs_encryption_policy: registered twice for aws:ebs/volume:Volume"):
+        PolicyRegistry(POLICY_SPECS + (spec,))
+    with pytest.raises(ValueError, match="registered twice for the stack"):
+        PolicyRegistry(POLICY_SPECS, STACK_POLICY_SPECS + STACK_POLICY_SPECS[:1])
+
+
+def test_a_rule_policy_named_like_a_builtin_policy_is_rejected():
+    # It would have replaced the built-in validator in the pack
+    policy = RulePolicy({"name": "s3_encryption_policy", "rules": []})
+    with pytest.raises(ValueError, match="s3_encryption_policy: the name is already used"):
+        check_policy_names([policy])
+    with pytest.raises(ValueError, match="custom: the name is already used"):
+        check_policy_names([RulePolicy({"name": "custom"}), RulePolicy({"name": "custom"})])
+
+
+def test_the_validator_is_imported_on_first_use():
+    spec = PolicySpec("test", "Test", VOLUME, "ebs_checks:ebs_encryption_validator")
+    from pyawsguard import ebs_checks
+
+    assert spec.validator is ebs_checks.ebs_encryption_validator
+
+
+def test_loading_the_registry_and_the_pack_configuration_imports_no_check_module(tmp_path):
+    config = tmp_path / "pack.json"
+    config.write_text('{"policies": {"security-group-sensitive-ports": {"parameters": {"ports": [5432]}}}}')
+    script = (
+        "import sys\n"
+        "from pyawsguard.pack_config import active_rules_from_environment, registry_from_environment\n"
+        "active_rules_from_environment(); registry_from_environment()\n"
+        "print(sorted(name for name in sys.modules if name.endswith('_checks')))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC, PYAWSGUARD_PACK_CONFIG=str(config))
+    output = subprocess.check_output([sys.executable, "-c", script], env=env, universal_newlines=True)
+    assert output.strip() == "[]"
+
+
+def test_pack_policies_registers_one_policy_per_name_dispatching_on_the_type():
+    pytest.importorskip("pulumi_policy")
+    registry = PolicyRegistry()
+    policies = registry.pack_policies()
+    names = [policy.name for policy in policies]
+    assert len(names) == len(set(names))
+    assert set(names) == {spec.name for spec in POLICY_SPECS + STACK_POLICY_SPECS}
+
+    ssh = next(policy for policy in policies if policy.name == "security-group-ssh-policy")
+    open_ssh = {"protocol": "tcp", "fromPort": 22, "toPort": 22, "cidrBlocks": ["0.0.0.0/0"]}
+    reported = []
+
+    def report(message, urn=None):
+        reported.append(message)
+
+    ssh.validate(resource(SECURITY_GROUP, {"ingress": [open_ssh]}, "group"), report)
+    ssh.validate(resource(SECURITY_GROUP_RULE, dict(open_ssh, type="ingress"), "rule"), report)
+    ssh.validate(resource(VOLUME, {"encrypted": False}, "volume"), report)
+    assert len(reported) == 2
+    assert "group" in reported[0] and "rule" in reported[1]
@@ -0,0 +1,137 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the declarative rules (pyawsguard.rules).
+
+import json
+
+import pytest
+
+from conftest import UNKNOWN_STRING, messages, resource
+from pyawsguard.evaluate import evaluate
+from pyawsguard.registry import PolicyRegistry, check_policy_names, rule_specs
+from pyawsguard.rules import RULES_ENV, RulePolicy, rules_from_environment
+
+INSTANCE = "aws:rds/instance:Instance"
+BUCKET = "aws:s3/bucket:Bucket"
+
+RULES = {
+    "name": "storage-rules",
+    "rules": [
+        {"name": "rds-storage-encrypted", "type": INSTANCE, "property": "storageEncrypted", "value": True,
+         "message": "Storage encryption is not enabled for {name}"},
+        {"name": "rds-engine", "type": INSTANCE, "message": "{type} {name} runs an unsupported engine",
+         "conditions": [
+             {"property": "engine", "operator": "in", "value": ["postgres", "mysql"]},
+             {"property": "engineVersion", "operator": "matches", "value": "[0-9]+(\\.[0-9]+)*"},
+         ]},
+        {"name": "bucket-versioning", "type": BUCKET, "property": "versioning.enabled", "value": True,
+         "message": "Versioning is off"},
+    ],
+}
+
+
+def rule_set(resource_type):
+    return next(rule_set for rule_set in RulePolicy(RULES).rule_sets if rule_set.resource_type == resource_type)
+
+
+def instance(**props):
+    return resource(INSTANCE, props, "db")
+
+
+def test_one_validator_per_type():
+    policy = RulePolicy(RULES)
+    assert [(rule_set.resource_type, len(rule_set.rules)) for rule_set in policy.rule_sets] == [
+        (INSTANCE, 2), (BUCKET, 1)]
+    assert [(spec.name, spec.resource_type) for spec in rule_specs([policy])] == [
+        ("storage-rules", INSTANCE), ("storage-rules", BUCKET)]
+
+
+def test_each_failing_rule_is_reported_with_its_name():
+    validate = rule_set(INSTANCE).validate
+    assert messages(validate, instance(storageEncrypted=True, engine="postgres", engineVersion="15.4")) == []
+    assert messages(validate, instance(storage_encrypted=False, engine="oracle-ee", engineVersion="19")) == [
+        "rds-storage-encrypted: Storage encryption is not enabled for db",
+        "rds-engine: aws:rds/instance:Instance db runs an unsupported engine",
+    ]
+    # A missing property fails equals
+    assert messages(validate, instance(engine="mysql", engineVersion="8.0")) == [
+        "rds-storage-encrypted: Storage encryption is not enabled for db"]
+    # Every condition must hold
+    assert messages(validate, instance(storageEncrypted=True, engine="mysql", engineVersion="latest")) == [
+        "rds-engine: aws:rds/instance:Instance db runs an unsupported engine"]
+
+
+def test_nested_properties():
+    validate = rule_set(BUCKET).validate
+    assert messages(validate, resource(BUCKET, {"versioning": {"enabled": True}})) == []
+    assert messages(validate, resource(BUCKET, {"versioning": {"enabled": False}})) == [
+        "bucket-versioning: Versioning is off"]
+
+
+@pytest.mark.parametrize("props", [
+    {"storageEncrypted": UNKNOWN_STRING, "engine": UNKNOWN_STRING, "engineVersion": "1"},
+    {"storageEncrypted": UNKNOWN_STRING, "engine": "postgres", "engineVersion": UNKNOWN_STRING},
+])
+def test_unknown_values_give_no_verdict(props):
+    assert messages(rule_set(INSTANCE).validate, instance(**props)) == []
+
+
+def test_operators():
+    policy = RulePolicy({"rules": [
+        {"name": "size", "type": INSTANCE, "message": "m", "conditions": [
+            {"property": "allocatedStorage", "operator": "greater_or_equal", "value": 20},
+            {"property": "allocatedStorage", "operator": "less_or_equal", "value": 100},
+        ]},
+        {"name": "logs", "type": INSTANCE, "property": "enabledCloudwatchLogsExports", "operator": "contains_all",
+         "value": ["audit", "error"], "message": "m"},
+        {"name": "subnet", "type": INSTANCE, "property": "dbSubnetGroupName", "operator": "exists", "message": "m"},
+    ]})
+    validate = policy.rule_sets[0].validate
+    logs = ["audit", "error", "general"]
+    assert messages(validate, instance(allocatedStorage=50, enabledCloudwatchLogsExports=logs,
+                                       dbSubnetGroupName="private")) == []
+    assert messages(validate, instance(allocatedStorage=500, enabledCloudwatchLogsExports=["audit"])) == [
+        "size: m", "logs: m", "subnet: m"]
+
+
+@pytest.mark.parametrize("rules, error", [
+    ([{"name": "r", "type": INSTANCE, "property": "p", "operator": "between", "message": "m"}], "unknown operator"),
+    ([{"name": "r", "type": INSTANCE, "property": "p", "message": "m {nope}"}], "unknown placeholder"),
+    ([{"name": "r", "type": INSTANCE, "message": "m"}], "missing 'property'"),
+    ([{"name": "r", "property": "p", "message": "m"}], "missing 'type'"),
+    ([{"name": "r", "type": INSTANCE, "property": "p", "message": "m"}] * 2, "defined twice"),
+])
+def test_invalid_rules(rules, error):
+    with pytest.raises(ValueError, match=error):
+        RulePolicy({"rules": rules})
+
+
+def test_rule_files_of_the_environment(tmp_path, monkeypatch):
+    paths = []
+    for name in ("rds", "s3"):
+        path = tmp_path / (name + ".json")
+        path.write_text(json.dumps({"rules": [rule for rule in RULES["rules"] if name in rule["type"]]}))
+        paths.append(str(path))
+    monkeypatch.setenv(RULES_ENV, ":".join(paths))
+    policies = rules_from_environment()
+    assert [policy.name for policy in policies] == ["custom-rules-rds", "custom-rules-s3"]
+    check_policy_names(policies)
+    registry = PolicyRegistry(rule_specs(policies), ())
+    violations = list(evaluate([instance(storageEncrypted=False, engine="mysql", engineVersion="8")], registry))
+    assert [(violation.policy_name, violation.message) for violation in violations] == [
+        ("custom-rules-rds", "rds-storage-encrypted: Storage encryption is not enabled for db")]
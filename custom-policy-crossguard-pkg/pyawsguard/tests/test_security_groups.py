@@ -0,0 +1,114 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the security group exposure analysis (pyawsguard.security_groups) and of the
+# security group policies.
+
+import pytest
+
+from conftest import UNKNOWN_STRING, messages, resource
+from pyawsguard import ec2_checks
+from pyawsguard.evaluate import evaluate
+from pyawsguard.props import view_of
+from pyawsguard.registry import POLICY_SPECS, PolicyRegistry
+from pyawsguard.security_groups import PortSet, format_ports, ingress_rules, internet_exposed_ports, is_internet
+
+SECURITY_GROUP = "aws:ec2/securityGroup:SecurityGroup"
+SECURITY_GROUP_RULE = "aws:ec2/securityGroupRule:SecurityGroupRule"
+
+
+def group(*rules):
+    return resource(SECURITY_GROUP, {"ingress": list(rules)}, "group")
+
+
+def rule(protocol="tcp", from_port=22, to_port=22, cidrs=("0.0.0.0/0",), ipv6_cidrs=()):
+    return {"protocol": protocol, "fromPort": from_port, "toPort": to_port, "cidrBlocks": list(cidrs),
+            "ipv6CidrBlocks": list(ipv6_cidrs)}
+
+
+def test_port_set_merges_intervals():
+    ports = PortSet((22, "8000-8100", 23, "8050-8200", 3389))
+    assert (ports.starts, ports.ends) == ([22, 3389, 8000], [23, 3389, 8200])
+    assert ports.overlaps(0, 22) and ports.overlaps(8200, 9000)
+    assert not ports.overlaps(24, 3388)
+    assert ports.intersection(23, 8010) == [(23, 23), (3389, 3389), (8000, 8010)]
+    assert format_ports(ports) == "22-23, 3389, 8000-8200"
+
+
+@pytest.mark.parametrize("cidr, internet", [
+    ("0.0.0.0/0", True),
+    ("0.0.0.0/1", True),
+    ("::/0", True),
+    ("10.0.0.0/8", False),
+    ("203.0.113.0/24", False),
+    ("not a network", False),
+])
+def test_is_internet(cidr, internet):
+    assert is_internet(cidr) is internet
+
+
+@pytest.mark.parametrize("ingress, exposed", [
+    (rule(), "22"),
+    (rule(from_port=0, to_port=1024), "22"),
+    # Protocol -1 opens every port, whatever the ports say
+    (rule(protocol="-1", from_port=0, to_port=0), "22"),
+    (rule(cidrs=(), ipv6_cidrs=("::/0",)), "22"),
+    (rule(cidrs=("10.0.0.0/16", "0.0.0.0/0")), "22"),
+    (rule(protocol="icmp", from_port=-1, to_port=-1), None),
+    # A rule without a protocol is skipped like one of an unknown protocol
+    (rule(protocol=None), None),
+    (rule(cidrs=("10.0.0.0/16",)), None),
+    (rule(from_port=80, to_port=443), None),
+])
+def test_ssh_exposure(ingress, exposed):
+    found = internet_exposed_ports(ingress_rules(view_of(group(ingress))), PortSet((22,)))
+    assert (format_ports(found) if found else None) == exposed
+
+
+def test_snake_case_ingress_rules():
+    ingress = {"protocol": "tcp", "from_port": 22, "to_port": 22, "cidr_blocks": ["0.0.0.0/0"]}
+    assert messages(ec2_checks.security_grp_ssh_validator, group(ingress))
+
+
+def test_security_group_rule_resources():
+    open_ssh = dict(rule(), type="ingress")
+    assert messages(ec2_checks.security_grp_rule_ssh_validator, resource(SECURITY_GROUP_RULE, open_ssh))
+    egress = dict(rule(), type="egress")
+    assert not messages(ec2_checks.security_grp_rule_ssh_validator, resource(SECURITY_GROUP_RULE, egress))
+
+
+def test_sensitive_ports_parameter():
+    ingress = rule(from_port=3000, to_port=6000)
+    assert messages(ec2_checks.security_grp_sensitive_ports_validator, group(ingress)) == [
+        "This Security group group allows access from all addresses to ports 3306, 3389, 5432"]
+    assert messages(ec2_checks.security_grp_sensitive_ports_validator, group(ingress), ports=(5432, "5900-5910")) == [
+        "This Security group group allows access from all addresses to ports 5432, 5900-5910"]
+
+
+@pytest.mark.parametrize("args", [
+    group(rule(from_port=UNKNOWN_STRING, to_port=UNKNOWN_STRING)),
+    group(rule(protocol=UNKNOWN_STRING)),
+    group(rule(cidrs=(UNKNOWN_STRING,))),
+    group(UNKNOWN_STRING),
+    resource(SECURITY_GROUP, {"ingress": UNKNOWN_STRING}),
+    resource(SECURITY_GROUP_RULE, dict(rule(from_port=UNKNOWN_STRING), type="ingress")),
+    resource(SECURITY_GROUP_RULE, dict(rule(), type=UNKNOWN_STRING)),
+])
+def test_unknown_values_are_skipped(args):
+    # Unknown during a preview: neither a crash nor a violation
+    specs = [spec for spec in POLICY_SPECS if spec.resource_type in (SECURITY_GROUP, SECURITY_GROUP_RULE)]
+    assert list(evaluate([args], PolicyRegistry(specs, ()))) == []
@@ -0,0 +1,71 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the sharded evaluation (evaluate_shard, write_shard and merge_shards of
+# pyawsguard.evaluate).
+
+import io
+
+import pytest
+
+from pyawsguard.evaluate import evaluate_document, merge_shards, shard_of, write_shard
+
+
+def shard_files(tmp_path, path, count, cache_dir=None):
+    paths = []
+    for index in range(count):
+        out = io.StringIO()
+        write_shard(out, [evaluate_document(path, cache_dir, shard=(index, count), stream=True)], (index, count))
+        shard_path = tmp_path / ("shard-%d.jsonl" % index)
+        shard_path.write_text(out.getvalue())
+        paths.append(str(shard_path))
+    return paths
+
+
+def test_shard_of_is_stable_and_in_range():
+    urns = ["urn:pulumi:dev::app::aws:s3/bucket:Bucket::bucket-%d" % index for index in range(200)]
+    shards = [shard_of(urn, 4) for urn in urns]
+    assert set(shards) == {0, 1, 2, 3}
+    assert shards == [shard_of(urn, 4) for urn in urns]
+    assert shard_of(urns[0], 1) == 0
+
+
+@pytest.mark.parametrize("count", [1, 3])
+def test_merged_shards_match_an_unsharded_run(tmp_path, stack_export, count):
+    expected = evaluate_document(stack_export)
+    assert expected.violations
+    merged = list(merge_shards(shard_files(tmp_path, stack_export, count)))
+    assert len(merged) == 1
+    assert merged[0].path == stack_export
+    assert merged[0].resources == expected.resources
+    assert merged[0].violations == expected.violations
+
+
+def test_shards_share_the_result_cache(tmp_path, stack_export):
+    cache_dir = str(tmp_path / "cache")
+    shard_files(tmp_path, stack_export, 2, cache_dir)
+    merged = list(merge_shards(shard_files(tmp_path, stack_export, 2, cache_dir)))[0]
+    assert merged.cache_misses == 0 and merged.cache_hits > 0
+    assert merged.violations == evaluate_document(stack_export).violations
+
+
+def test_missing_or_repeated_shards_are_rejected(tmp_path, stack_export):
+    paths = shard_files(tmp_path, stack_export, 3)
+    with pytest.raises(ValueError, match="missing shards 2 of 3"):
+        list(merge_shards(paths[:2]))
+    with pytest.raises(ValueError, match="given twice"):
+        list(merge_shards(paths + paths[:1]))
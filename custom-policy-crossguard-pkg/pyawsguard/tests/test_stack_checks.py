@@ -0,0 +1,64 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the stack policies (pyawsguard.stack_checks) on linked resources.
+
+import json
+
+import pytest
+
+from synthetic_stack import generate_states
+
+from conftest import resource
+from pyawsguard.evaluate import evaluate, resource_from_state
+from pyawsguard.registry import STACK_POLICY_SPECS, PolicyRegistry
+
+BUCKET = "aws:s3/bucket:Bucket"
+BUCKET_POLICY = "aws:s3/bucketPolicy:BucketPolicy"
+BUCKET_PUBLIC_ACCESS_BLOCK = "aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock"
+
+
+def document(*statements):
+    return json.dumps({"Version": "2012-10-17", "Statement": list(statements)})
+
+
+def tls_statement(effect):
+    return {"Effect": effect, "Principal": "*", "Action": "s3:*", "Resource": "arn:aws:s3:::bucket/*",
+            "Condition": {"Bool": {"aws:SecureTransport": "false"}}}
+
+
+@pytest.mark.parametrize("effect, reported", [("Deny", []), ("Allow", ["No bucket policy requiring secure transport"])])
+def test_bucket_protection_requires_a_deny_statement(effect, reported):
+    resources = [
+        resource(BUCKET, {"bucket": "bucket"}, "bucket"),
+        resource(BUCKET_PUBLIC_ACCESS_BLOCK, {"bucket": "bucket", "blockPublicAcls": True}, "block"),
+        resource(BUCKET_POLICY, {"bucket": "bucket", "policy": document(tls_statement(effect))}, "policy"),
+    ]
+    resources[0].id = "bucket"
+    specs = [spec for spec in STACK_POLICY_SPECS if spec.name == "s3-bucket-protection"]
+    violations = list(evaluate(resources, PolicyRegistry((), specs)))
+    assert [violation.message.split(" is attached")[0] for violation in violations] == reported
+    assert all(violation.enforcement_level == "advisory" for violation in violations)
+
+
+def test_stack_policies_on_a_compliant_synthetic_stack():
+    # The generated resources reference each other, so a compliant stack passes
+    resources = [resource_from_state(state) for state in generate_states(10, violating=0)]
+    assert list(evaluate(resources, PolicyRegistry((), STACK_POLICY_SPECS))) == []
+    resources = [resource_from_state(state) for state in generate_states(10, violating=0.5)]
+    violations = list(evaluate(resources, PolicyRegistry((), STACK_POLICY_SPECS)))
+    assert 0 < len(violations) < 30
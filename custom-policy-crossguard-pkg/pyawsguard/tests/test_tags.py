@@ -0,0 +1,99 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the tag compliance policy (pyawsguard.tags).
+
+import json
+
+import pytest
+
+from conftest import UNKNOWN_STRING, messages, resource
+from pyawsguard.registry import check_policy_names
+from pyawsguard.tags import TAG_POLICY_ENV, TagPolicy, tag_policies_from_environment
+
+BUCKET = "aws:s3/bucket:Bucket"
+CLUSTER = "aws:eks/cluster:Cluster"
+
+POLICY = {
+    "types": [BUCKET],
+    "tags": [
+        {"key": "CostCenter", "required": True, "pattern": "^CC-[0-9]{4}$"},
+        {"key": "env", "values": ["dev", "test", "prod", "production"], "pattern": "[a-z]{3,4}"},
+        {"key": "Name", "required": True, "types": [CLUSTER]},
+    ],
+}
+
+
+def problems(tags, resource_type=BUCKET):
+    schema = next(schema for schema in TagPolicy(POLICY).schemas if schema.resource_type == resource_type)
+    return messages(schema.validate, resource(resource_type, {"tags": tags}))
+
+
+def test_compliant_tags():
+    assert problems({"CostCenter": "CC-1234", "env": "prod", "Owner": "team"}) == []
+
+
+def test_required_tags():
+    assert problems(None) == ["Tags do not comply with the tag policy: missing required tags CostCenter"]
+    # The rules without types apply to every type of the policy
+    assert problems({"Name": "cluster", "CostCenter": "CC-0001"}, CLUSTER) == []
+    assert problems({"env": "dev"}, CLUSTER) == [
+        "Tags do not comply with the tag policy: missing required tags CostCenter, Name"]
+
+
+def test_allowed_values_and_patterns_are_both_checked():
+    assert problems({"CostCenter": "CC-12", "env": "demo"}) == [
+        "Tags do not comply with the tag policy: tag CostCenter=CC-12 does not match the required format; "
+        "tag env=demo is not one of dev, prod, production, test"]
+    # An allowed value must still match the patterns
+    assert problems({"CostCenter": "CC-1234", "env": "production"}) == [
+        "Tags do not comply with the tag policy: tag env=production does not match the required format"]
+
+
+def test_values_that_are_not_strings():
+    assert problems({"CostCenter": "CC-1234", "env": ["prod"]}) == [
+        "Tags do not comply with the tag policy: tag env=['prod'] is not one of dev, prod, production, test; "
+        "tag env=['prod'] does not match the required format"]
+
+
+@pytest.mark.parametrize("tags", [
+    UNKNOWN_STRING,
+    {"CostCenter": UNKNOWN_STRING, "env": UNKNOWN_STRING},
+])
+def test_unknown_tags_are_not_reported(tags):
+    assert problems(tags) == []
+
+
+def test_tag_policy_files_are_named_after_the_file(tmp_path, monkeypatch):
+    paths = []
+    for name in ("cost", "owner"):
+        path = tmp_path / (name + ".json")
+        path.write_text(json.dumps({"tag_policy": {"tags": [{"key": name, "required": True}]}}))
+        paths.append(str(path))
+    monkeypatch.setenv(TAG_POLICY_ENV, paths[0])
+    assert [policy.name for policy in tag_policies_from_environment()] == ["tag-compliance"]
+    monkeypatch.setenv(TAG_POLICY_ENV, ":".join(paths))
+    policies = tag_policies_from_environment()
+    assert [policy.name for policy in policies] == ["tag-compliance-cost", "tag-compliance-owner"]
+    check_policy_names(policies)
+
+
+def test_invalid_tag_policies():
+    with pytest.raises(ValueError, match="a tag rule has no 'key'"):
+        TagPolicy({"tags": [{"required": True}]})
+    with pytest.raises(ValueError, match="key env"):
+        TagPolicy({"tags": [{"key": "env", "pattern": "("}]})
@@ -14,6 +14,4 @@
 #  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 #  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-import pulumi_aws
-import pulumi_policy
 from pyawsguard import __main__
\ No newline at end of file
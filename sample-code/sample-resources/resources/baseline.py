@@ -0,0 +1,237 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Baseline of accepted policy violations, so that only new violations fail the build.
+#
+# A violation is identified by the fingerprint of its pack and policy, its resource URN
+# (or type and name, in the CLI text output) and the hash of its message. The baseline
+# is the set of fingerprints of the last accepted run, one per line with the policy and
+# the resource for reference:
+#
+#   <fingerprint>\t<pack>/<policy>\t<resource>
+#
+# 'check' classifies the violations of a run against the baseline as new, unchanged or
+# fixed with one pass over each, using set lookups, and writes the classification to
+# 'policy-diff.json'. Its exit code is the exit code of the preview (--results) when its
+# failure is not fully explained by mandatory policy violations: the packs reported
+# none, the log lacks some of the ones they reported, or the engine reported another
+# error. Otherwise it is 1 when a new mandatory violation was found, 0 if not. 'update'
+# writes the violations of a run as the new baseline.
+#
+# Usage: python3 baseline.py check --baseline policy-baseline.tsv [--results policy-results.json] <log>
+#        python3 baseline.py update --baseline policy-baseline.tsv <log>
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import preview_parser
+
+# An error diagnostic in the CLI text output, e.g. "    error: Program failed with an
+# unhandled exception"
+TEXT_ERROR = re.compile(r"^\s*error: (?P<message>.*)$")
+
+# Messages of the error the engine adds when the run failed, whatever the cause
+FAILED_MESSAGES = frozenset(("preview failed", "update failed"))
+
+
+def fingerprint(violation):
+    """Fingerprint (hex) of a preview_parser.PolicyViolation."""
+    message_hash = hashlib.sha256((violation.message or "").encode("utf-8")).hexdigest()
+    key = "\0".join((_policy(violation), _resource(violation), message_hash))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def _policy(violation):
+    return "%s/%s" % (violation.pack or "", violation.policy or "")
+
+
+def _resource(violation):
+    if violation.urn:
+        return violation.urn
+    return "%s::%s" % (violation.resource_type or "", violation.resource_name or "")
+
+
+def load(path):
+    """{fingerprint: (policy, resource)} of the baseline at path, empty if there is none."""
+    baseline = {}
+    if not os.path.exists(path):
+        return baseline
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if fields[0]:
+                baseline[fields[0]] = tuple(fields[1:3])
+    return baseline
+
+
+def write(path, violations):
+    """Writes the violations as the baseline at path; returns the number of entries."""
+    entries = {}
+    for violation in violations:
+        entries[fingerprint(violation)] = (_policy(violation), _resource(violation))
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        for key in sorted(entries):
+            f.write("%s\t%s\t%s\n" % ((key,) + entries[key]))
+    os.replace(temporary, path)
+    return len(entries)
+
+
+class Diff:
+    """Classification of the violations of a run against a baseline."""
+
+    __slots__ = ("new", "unchanged", "fixed", "mandatory")
+
+    def __init__(self):
+        self.new = []
+        self.unchanged = 0
+        self.fixed = []
+        # Mandatory violations in the log, repeated ones included
+        self.mandatory = 0
+
+    @property
+    def failing(self):
+        return [violation for violation in self.new if violation.enforcement_level == "mandatory"]
+
+    def to_json(self):
+        return {
+            "new": [dict(violation._asdict(), fingerprint=fingerprint(violation)) for violation in self.new],
+            "unchanged": self.unchanged,
+            "fixed": [{"fingerprint": key, "policy": policy, "resource": resource}
+                      for key, (policy, resource) in self.fixed],
+        }
+
+
+def classify(violations, baseline):
+    """Diff of the violations (a stream) against the baseline {fingerprint: entry}."""
+    diff = Diff()
+    seen = set()
+    for violation in violations:
+        if violation.enforcement_level == "mandatory":
+            diff.mandatory += 1
+        key = fingerprint(violation)
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in baseline:
+            diff.unchanged += 1
+        else:
+            diff.new.append(violation)
+    diff.fixed = sorted((key, entry) for key, entry in baseline.items() if key not in seen)
+    return diff
+
+
+def engine_errors(path):
+    """Number of the errors the engine reported in the log at path besides the policy
+    violations and the generic "preview failed": error diagnostics of an event stream or
+    of a 'pulumi preview --json' document, "error:" lines of the text output."""
+    with open(path, "rb") as f:
+        head = f.read(4096).lstrip()
+    if head[:1] != b"{":
+        errors = 0
+        for line in preview_parser.iter_lines(path):
+            match = TEXT_ERROR.match(preview_parser.ANSI_ESCAPE.sub("", line))
+            if match is not None and match.group("message").strip() not in FAILED_MESSAGES:
+                errors += 1
+        return errors
+
+    first, newline, _ = head.partition(b"\n")
+    try:
+        json.loads(first)
+    except ValueError:
+        if newline:
+            # A document indented over many lines
+            with open(path, "rb") as f:
+                return _document_errors(json.load(f))
+    errors = 0
+    for line in preview_parser.iter_lines(path):
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        if "diagnostics" in event:
+            errors += _document_errors(event)
+        else:
+            errors += _is_error(event.get("diagnosticEvent"))
+    return errors
+
+
+def _document_errors(document):
+    return sum(_is_error(diagnostic) for diagnostic in document.get("diagnostics") or ())
+
+
+def _is_error(diagnostic):
+    if not diagnostic or diagnostic.get("severity") != "error":
+        return False
+    lines = [line for line in preview_parser.ANSI_ESCAPE.sub("", diagnostic.get("message") or "").splitlines()
+             if line.strip()]
+    if not lines or lines[0].strip() in FAILED_MESSAGES:
+        return False
+    # The violations a 'pulumi preview --json' document lists among its diagnostics
+    return not (preview_parser.VIOLATION_HEADER.match(lines[0]) or preview_parser.DIAGNOSTIC_VIOLATION.match(lines[0]))
+
+
+def preview_exit_code(results_path, diff, errors):
+    """Exit code of the preview when it failed and its failure is not fully explained by
+    the mandatory violations: the packs reported none, the log holds fewer than the
+    packs reported (diff.mandatory), or the engine reported other errors. 0 otherwise."""
+    if not results_path or not os.path.exists(results_path):
+        return 0
+    with open(results_path) as f:
+        results = json.load(f)
+    exit_code = results.get("exit_code", 0)
+    mandatory = sum(pack.get("mandatory", 0) for pack in results.get("packs", {}).values())
+    if not exit_code or (mandatory and diff.mandatory >= mandatory and not errors):
+        return 0
+    return exit_code
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="Compare the policy violations of a run with a baseline.")
+    arg_parser.add_argument("command", choices=("check", "update"))
+    arg_parser.add_argument("log", help="preview log or event log of the run")
+    arg_parser.add_argument("--baseline", default="policy-baseline.tsv", help="baseline file")
+    arg_parser.add_argument("--results", help="policy-results.json of policy_preview.py (check)")
+    arg_parser.add_argument("--output", default="policy-diff.json", help="classification of the run (check)")
+    options = arg_parser.parse_args(argv[1:])
+
+    violations = preview_parser.parse_file(options.log) if os.path.exists(options.log) else iter(())
+    if options.command == "update":
+        print("Baseline of %d violations written to %s" % (write(options.baseline, violations), options.baseline))
+        return 0
+
+    diff = classify(violations, load(options.baseline))
+    with open(options.output, "w") as f:
+        json.dump(diff.to_json(), f, indent=2, sort_keys=True)
+    print("Policy violations: %d new, %d unchanged, %d fixed since the baseline"
+          % (len(diff.new), diff.unchanged, len(diff.fixed)))
+    for violation in diff.new:
+        print("  new [%s] %s (%s)" % (violation.enforcement_level, _policy(violation), _resource(violation)))
+
+    errors = engine_errors(options.log) if os.path.exists(options.log) else 0
+    exit_code = preview_exit_code(options.results, diff, errors)
+    if exit_code:
+        print("The preview failed (exit code %d) for another reason than its mandatory policy violations "
+              "(%d other errors in the log)" % (exit_code, errors))
+        return exit_code
+    return 1 if diff.failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,253 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Local history of the policy violations of every run, in a SQLite file.
+#
+# Each run (a preview of one stack) is appended with its author, commit and timestamp,
+# and each of its violations with the run. Two tables are kept up to date as runs are
+# recorded, so that the trend queries read a few rows instead of a year of violations:
+#
+# - weekly_counts: violations per ISO week, stack, policy and author
+# - findings: one row per (stack, policy, URN) from the run it first failed in to the
+#   first later run of the stack without it (fixed_at), or still open
+#
+# Recording a run costs one pass over its violations and over the open findings of its
+# stack. Every query is answered from an index.
+#
+# preview_parser.py records the run it parses with --history; the queries are:
+#
+#   python3 history.py top --db history.sqlite [--weeks 4] [--stack S] [--limit 10]
+#   python3 history.py trend --db history.sqlite --policy P [--weeks 12]
+#   python3 history.py mttf --db history.sqlite [--days 365] [--by policy|stack|author]
+#   python3 history.py record --db history.sqlite --stack S policy-events-aws-python.json
+
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    stack TEXT NOT NULL,
+    author TEXT,
+    email TEXT,
+    revision TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_stack_ts ON runs (stack, ts);
+
+CREATE TABLE IF NOT EXISTS violations (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    policy TEXT NOT NULL,
+    pack TEXT,
+    enforcement_level TEXT,
+    urn TEXT,
+    resource_type TEXT,
+    resource_name TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS violations_run ON violations (run_id);
+CREATE INDEX IF NOT EXISTS violations_policy ON violations (policy, run_id);
+
+CREATE TABLE IF NOT EXISTS weekly_counts (
+    week TEXT NOT NULL,
+    stack TEXT NOT NULL,
+    policy TEXT NOT NULL,
+    author TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (week, policy, stack, author)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS weekly_counts_policy ON weekly_counts (policy, week, count);
+
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    stack TEXT NOT NULL,
+    policy TEXT NOT NULL,
+    urn TEXT NOT NULL,
+    author TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    fixed_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS findings_open ON findings (stack, policy, urn) WHERE fixed_at IS NULL;
+-- Covers the mean time to fix queries, which then never read the table
+CREATE INDEX IF NOT EXISTS findings_fixed ON findings (fixed_at, first_seen, policy, stack, author);
+"""
+
+
+def week_of(ts):
+    """ISO week of a Unix timestamp, e.g. '2024-W07'."""
+    year, week, _ = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isocalendar()
+    return "%04d-W%02d" % (year, week)
+
+
+class History:
+    """The history database at path, created on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_run_id = None
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def record(self, violations, stack, author=None, email=None, revision=None, ts=None):
+        """Appends a run of stack with its violations (preview_parser.PolicyViolation records),
+        updates the weekly counts and the findings, and returns the run id."""
+        recording = self.recording(violations, stack, author, email, revision, ts)
+        for _ in recording:
+            pass
+        return self.last_run_id
+
+    def recording(self, violations, stack, author=None, email=None, revision=None, ts=None):
+        """Yields the violations while they are recorded as a run of stack, for callers
+        that also consume them; the run is complete once the generator is exhausted."""
+        ts = time.time() if ts is None else ts
+        week = week_of(ts)
+        with self._db:
+            run_id = self._db.execute(
+                "INSERT INTO runs (ts, stack, author, email, revision) VALUES (?, ?, ?, ?, ?)",
+                (ts, stack, author, email, revision)).lastrowid
+            counts = {}
+            failing = set()
+            rows = []
+            for violation in violations:
+                yield violation
+                rows.append((run_id, violation.policy, violation.pack, violation.enforcement_level, violation.urn,
+                             violation.resource_type, violation.resource_name, violation.message))
+                counts[violation.policy] = counts.get(violation.policy, 0) + 1
+                failing.add((violation.policy, violation.urn or violation.resource_name or ""))
+                if len(rows) >= 1000:
+                    self._insert_violations(rows)
+                    rows = []
+            self._insert_violations(rows)
+
+            self._db.executemany(
+                "INSERT INTO weekly_counts (week, stack, policy, author, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (week, policy, stack, author) DO UPDATE SET count = count + excluded.count",
+                [(week, stack, policy, author or "", count) for policy, count in counts.items()])
+
+            open_findings = {
+                (policy, urn): finding_id for finding_id, policy, urn in self._db.execute(
+                    "SELECT id, policy, urn FROM findings WHERE stack = ? AND fixed_at IS NULL", (stack,))
+            }
+            self._db.executemany(
+                "UPDATE findings SET fixed_at = ? WHERE id = ?",
+                [(ts, finding_id) for key, finding_id in open_findings.items() if key not in failing])
+            self._db.executemany(
+                "UPDATE findings SET last_seen = ? WHERE id = ?",
+                [(ts, finding_id) for key, finding_id in open_findings.items() if key in failing])
+            self._db.executemany(
+                "INSERT INTO findings (stack, policy, urn, author, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?)",
+                [(stack, policy, urn, author, ts, ts) for policy, urn in failing if (policy, urn) not in open_findings])
+        self.last_run_id = run_id
+
+    def _insert_violations(self, rows):
+        self._db.executemany("INSERT INTO violations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def top_policies(self, weeks=4, stack=None, limit=10, now=None):
+        """[(week, policy, violations)]: the policies with the most violations in each of
+        the last weeks, most recent week first."""
+        since = week_of((time.time() if now is None else now) - (weeks - 1) * 7 * 86400)
+        query = "SELECT week, policy, SUM(count) AS total FROM weekly_counts WHERE week >= ?"
+        params = [since]
+        if stack is not None:
+            query += " AND stack = ?"
+            params.append(stack)
+        query += " GROUP BY week, policy ORDER BY week DESC, total DESC, policy"
+        result = []
+        per_week = {}
+        for week, policy, total in self._db.execute(query, params):
+            if per_week.get(week, 0) < limit:
+                per_week[week] = per_week.get(week, 0) + 1
+                result.append((week, policy, total))
+        return result
+
+    def trend(self, policy, weeks=12, now=None):
+        """[(week, violations)] of policy over the last weeks, oldest first."""
+        since = week_of((time.time() if now is None else now) - (weeks - 1) * 7 * 86400)
+        return self._db.execute(
+            "SELECT week, SUM(count) FROM weekly_counts WHERE policy = ? AND week >= ? GROUP BY week ORDER BY week",
+            (policy, since)).fetchall()
+
+    def mean_time_to_fix(self, days=365, by="policy", now=None):
+        """[(key, fixed findings, mean hours to fix, open findings)] for the findings fixed
+        in the last days, grouped by policy, stack or author."""
+        if by not in ("policy", "stack", "author"):
+            raise ValueError("cannot group by %r" % by)
+        since = (time.time() if now is None else now) - days * 86400
+        fixed = {
+            key: (count, mean_seconds / 3600.0) for key, count, mean_seconds in self._db.execute(
+                "SELECT %s, COUNT(*), AVG(fixed_at - first_seen) FROM findings WHERE fixed_at >= ? GROUP BY %s"
+                % (by, by), (since,))
+        }
+        still_open = dict(self._db.execute(
+            "SELECT %s, COUNT(*) FROM findings WHERE fixed_at IS NULL GROUP BY %s" % (by, by)))
+        keys = sorted(set(fixed) | set(still_open), key=lambda key: str(key))
+        return [(key, fixed.get(key, (0, None))[0], fixed.get(key, (0, None))[1], still_open.get(key, 0))
+                for key in keys]
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="Query the local history of policy violations.")
+    arg_parser.add_argument("command", choices=("record", "top", "trend", "mttf"))
+    arg_parser.add_argument("log", nargs="?", help="preview log to record (record)")
+    arg_parser.add_argument("--db", default=os.environ.get("POLICY_HISTORY_DB", "policy-history.sqlite"),
+                            help="history database (default: $POLICY_HISTORY_DB or policy-history.sqlite)")
+    arg_parser.add_argument("--stack", help="stack of the recorded run (record), or to filter on (top)")
+    arg_parser.add_argument("--policy", help="policy of the trend (trend)")
+    arg_parser.add_argument("--weeks", type=int, default=None, help="weeks covered (top: 4, trend: 12)")
+    arg_parser.add_argument("--days", type=int, default=365, help="days of fixes covered (mttf)")
+    arg_parser.add_argument("--by", choices=("policy", "stack", "author"), default="policy",
+                            help="grouping of the mean time to fix (mttf)")
+    arg_parser.add_argument("--limit", type=int, default=10, help="policies per week (top)")
+    options = arg_parser.parse_args(argv[1:])
+
+    history = History(options.db)
+    start = time.perf_counter()
+    try:
+        if options.command == "record":
+            if not options.log or not options.stack:
+                arg_parser.error("record needs a log and --stack")
+            import preview_parser
+
+            history.record(preview_parser.parse_file(options.log), options.stack, os.environ.get("AUTHOR"),
+                           os.environ.get("EMAIL"), os.environ.get("CODEBUILD_RESOLVED_SOURCE_VERSION"))
+        elif options.command == "top":
+            for week, policy, total in history.top_policies(options.weeks or 4, options.stack, options.limit):
+                print("%s  %6d  %s" % (week, total, policy))
+        elif options.command == "trend":
+            if not options.policy:
+                arg_parser.error("trend needs --policy")
+            for week, total in history.trend(options.policy, options.weeks or 12):
+                print("%s  %6d" % (week, total))
+        else:
+            print("%-40s %8s %14s %8s" % (options.by, "fixed", "mean hours", "open"))
+            for key, fixed, mean_hours, still_open in history.mean_time_to_fix(options.days, options.by):
+                print("%-40s %8d %14s %8d" % (
+                    key, fixed, "%.1f" % mean_hours if mean_hours is not None else "-", still_open))
+    finally:
+        history.close()
+    sys.stderr.write("%s in %.1f ms\n" % (options.command, (time.perf_counter() - start) * 1000))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
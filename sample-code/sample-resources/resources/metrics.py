@@ -0,0 +1,148 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# CloudWatch metrics for policy violations.
+#
+# Violations are aggregated per (policy, status, author, email) into one datum each,
+# carrying a statistic set (SampleCount/Sum/Minimum/Maximum) equivalent to publishing
+# one Value=1 point per violation. The data is then split into batches that fit in a
+# single 'put-metric-data' request. A publisher receives each batch: FilePublisher
+# writes the files passed to the AWS CLI, ClientPublisher calls put_metric_data on a
+# boto3 CloudWatch client or on any stub with the same method. emf_lines renders the
+# same counts as CloudWatch Embedded Metric Format log lines instead.
+
+import json
+import os
+import time
+from collections import Counter
+
+NAMESPACE = "Pulumi Policy Metrics"
+
+# put-metric-data accepts at most 1000 data per request
+MAX_DATA_PER_REQUEST = 1000
+
+# An EMF directive may declare at most 100 metrics
+MAX_EMF_METRICS = 100
+
+DIMENSION_NAMES = ("Status", "Author", "Email")
+
+
+def aggregate(violations, status_of, author=None, email=None):
+    """Counts of violations per (policy, status, author, email)."""
+    counts = Counter()
+    for violation in violations:
+        counts[(violation.policy, status_of(violation), author, email)] += 1
+    return counts
+
+
+def _dimensions(status, author, email):
+    # CloudWatch rejects empty dimension values, so unset ones are left out
+    return [
+        {"Name": name, "Value": value}
+        for name, value in zip(DIMENSION_NAMES, (status, author, email))
+        if value
+    ]
+
+
+def metric_data(counts, timestamp=None, statistic_sets=True):
+    """One CloudWatch datum per aggregated key, sorted for a stable output."""
+    timestamp = time.time() if timestamp is None else timestamp
+    data = []
+    for (policy, status, author, email), count in sorted(counts.items(), key=lambda item: tuple(map(str, item[0]))):
+        datum = {
+            "MetricName": policy,
+            "Unit": "Count",
+            "Timestamp": timestamp,
+            "Dimensions": _dimensions(status, author, email),
+        }
+        if statistic_sets:
+            datum["StatisticValues"] = {"SampleCount": count, "Sum": count, "Minimum": 1, "Maximum": 1}
+        else:
+            datum["Value"] = count
+        data.append(datum)
+    return data
+
+
+def batches(data, size=MAX_DATA_PER_REQUEST):
+    """Splits data into lists of at most size items."""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class FilePublisher:
+    """Writes each batch to <directory>/metrics-<n>.json for
+    'aws cloudwatch put-metric-data --metric-data file://...'."""
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.paths = []
+
+    def publish(self, namespace, batch):
+        path = os.path.join(self.directory, "metrics-%d.json" % len(self.paths))
+        with open(path, "w") as f:
+            json.dump(batch, f, ensure_ascii=False)
+        self.paths.append(path)
+
+
+class ClientPublisher:
+    """Sends each batch with client.put_metric_data, e.g. boto3.client("cloudwatch")."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def publish(self, namespace, batch):
+        self.client.put_metric_data(Namespace=namespace, MetricData=batch)
+
+
+def publish(counts, publisher, namespace=NAMESPACE, batch_size=MAX_DATA_PER_REQUEST, timestamp=None):
+    """Aggregated counts to publisher, in API sized batches. Returns the number of batches."""
+    sent = 0
+    for batch in batches(metric_data(counts, timestamp), batch_size):
+        publisher.publish(namespace, batch)
+        sent += 1
+    return sent
+
+
+def emf_lines(counts, namespace=NAMESPACE, timestamp=None):
+    """CloudWatch Embedded Metric Format lines for the aggregated counts.
+
+    Counts sharing the same dimension values are grouped into one line, with at most
+    MAX_EMF_METRICS metrics per line.
+    """
+    timestamp_ms = int((time.time() if timestamp is None else timestamp) * 1000)
+    groups = {}
+    for (policy, status, author, email), count in counts.items():
+        groups.setdefault((status, author, email), []).append((policy, count))
+
+    for (status, author, email), policies in sorted(groups.items(), key=lambda item: tuple(map(str, item[0]))):
+        dimensions = {name: value for name, value in zip(DIMENSION_NAMES, (status, author, email)) if value}
+        policies.sort()
+        for start in range(0, len(policies), MAX_EMF_METRICS):
+            chunk = policies[start:start + MAX_EMF_METRICS]
+            record = {
+                "_aws": {
+                    "Timestamp": timestamp_ms,
+                    "CloudWatchMetrics": [{
+                        "Namespace": namespace,
+                        "Dimensions": [sorted(dimensions)],
+                        "Metrics": [{"Name": policy, "Unit": "Count"} for policy, _ in chunk],
+                    }],
+                },
+            }
+            record.update(dimensions)
+            for policy, count in chunk:
+                record[policy] = count
+            yield json.dumps(record, ensure_ascii=False, sort_keys=True)
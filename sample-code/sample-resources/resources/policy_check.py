@@ -0,0 +1,232 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Local policy check of this Pulumi program, for use before committing.
+#
+# Runs __main__.py in this process under pulumi.runtime.set_mocks, as the program's unit
+# tests would and as 'pulumi preview' would but without the engine, a backend login or
+# AWS calls: every resource the program registers is recorded with its inputs by the
+# mocks, and outputs that are only known after a deployment are left unknown, as in a
+# preview. The recorded resources are then validated in-process by the pyawsguard
+# policies and the violations printed with the messages and the layout of the
+# pipeline. The exit code is 1 when a mandatory violation was found. The policies are
+# those the pack configuration of PYAWSGUARD_PACK_CONFIG leaves active for --stack, at
+# their configured levels, as in the pipeline.
+#
+# The mocks do not see the engine's property dependencies: references between the
+# resources are resolved by the policies from the ids the mocks assign.
+#
+# pyawsguard is imported from the environment, or else from the package in this
+# repository (custom-policy-crossguard-pkg/pyawsguard/src).
+#
+# With --watch, the process stays up and checks the program again whenever one of its
+# files changes; pulumi_aws and the policies are then only imported once.
+#
+# Usage: python3 policy_check.py [--stack dev] [--config key=value ...] [--format json] [--watch]
+
+import argparse
+import os
+import runpy
+import sys
+import time
+
+import pulumi
+import pulumi.runtime
+from pulumi.output import Unknown
+
+PROGRAM_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_SRC = os.path.join(PROGRAM_DIR, "..", "..", "..", "custom-policy-crossguard-pkg", "pyawsguard", "src")
+
+# Placeholders for the configuration the program requires; they do not affect the
+# policies. Values from Pulumi.<stack>.yaml and --config take precedence.
+DEFAULT_CONFIG = {
+    "deploy_account_id": "123456789012",
+    "deploy_role_name": "pulumi-deploy",
+}
+
+# Seconds between two looks at the program's files in --watch mode
+WATCH_INTERVAL = 0.5
+
+# What the engine sends the policies for a value that is only known after deployment
+UNKNOWN_STRING_VALUE = "04da6b54-80e4-46f7-96ec-b56ff0331ba9"
+
+
+class RecordingMocks(pulumi.runtime.Mocks):
+    """Mocks that keep every registered resource as a stack export resource state."""
+
+    def __init__(self, project, stack):
+        self.prefix = "urn:pulumi:%s::%s::" % (stack, project)
+        self.states = []
+
+    def new_resource(self, args):
+        # The inputs are the resource's state; outputs not among them stay unknown
+        resource_id = args.name + "_id"
+        self.states.append({
+            "urn": self.prefix + args.typ + "::" + args.name,
+            "type": args.typ,
+            "custom": args.custom,
+            "id": resource_id,
+            "provider": args.provider,
+            "inputs": _known(args.inputs),
+        })
+        return resource_id, args.inputs
+
+    def call(self, args):
+        return {}, None
+
+
+def _known(value):
+    if isinstance(value, Unknown):
+        return UNKNOWN_STRING_VALUE
+    if isinstance(value, dict):
+        return {key: _known(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_known(item) for item in value]
+    return value
+
+
+def project_name():
+    with open(os.path.join(PROGRAM_DIR, "Pulumi.yaml")) as f:
+        for line in f:
+            if line.startswith("name:"):
+                return line.split(":", 1)[1].strip()
+    raise SystemExit("no project name in Pulumi.yaml")
+
+
+def stack_config(project, stack, overrides):
+    """The program's configuration: the placeholders, the plain values of
+    Pulumi.<stack>.yaml and the --config overrides, keyed by "<project>:<key>"."""
+    config = {"%s:%s" % (project, key): value for key, value in DEFAULT_CONFIG.items()}
+    path = os.path.join(PROGRAM_DIR, "Pulumi.%s.yaml" % stack)
+    if os.path.exists(path):
+        import yaml
+
+        with open(path) as f:
+            document = yaml.safe_load(f) or {}
+        for key, value in (document.get("config") or {}).items():
+            if not isinstance(value, dict):
+                config[key if ":" in key else "%s:%s" % (project, key)] = str(value)
+    for override in overrides:
+        key, _, value = override.partition("=")
+        config[key if ":" in key else "%s:%s" % (project, key)] = value
+    return config
+
+
+# Names of the modules of the program the last run imported
+_program_modules = set()
+
+
+def run_program(project, stack, config):
+    """Runs __main__.py under mocks and returns the resource states it registered.
+
+    The modules the program imported on the previous run are imported afresh, so it
+    can be called again after the program changed.
+    """
+    for name in _program_modules:
+        sys.modules.pop(name, None)
+    _program_modules.clear()
+    loaded = set(sys.modules)
+
+    mocks = RecordingMocks(project, stack)
+    pulumi.runtime.set_all_config(config)
+    pulumi.runtime.set_mocks(mocks, project=project, stack=stack, preview=True)
+    if PROGRAM_DIR not in sys.path:
+        sys.path.insert(0, PROGRAM_DIR)
+
+    @pulumi.runtime.test
+    def program():
+        runpy.run_path(os.path.join(PROGRAM_DIR, "__main__.py"), run_name="__main__")
+
+    try:
+        program()
+    finally:
+        for name in set(sys.modules) - loaded:
+            if os.path.dirname(os.path.abspath(getattr(sys.modules[name], "__file__", None) or os.sep)) == PROGRAM_DIR:
+                _program_modules.add(name)
+    return mocks.states
+
+
+def check(project, options, out=sys.stdout):
+    """Runs the program and validates its resources; returns the number of mandatory
+    violations."""
+    from pyawsguard.evaluate import evaluate, format_violation, resource_from_state, violation_to_json
+    from pyawsguard.pack_config import PACK_CONFIG_ENV, active_registry
+
+    start = time.perf_counter()
+    states = run_program(project, options.stack, stack_config(project, options.stack, options.config))
+    resources = [resource for resource in map(resource_from_state, states) if resource is not None]
+    violations = list(evaluate(resources, active_registry(os.environ.get(PACK_CONFIG_ENV) or None, options.stack)))
+
+    for index, violation in enumerate(violations):
+        if options.format == "json":
+            out.write(violation_to_json(violation) + "\n")
+        else:
+            if index == 0:
+                out.write("Policy Violations:\n")
+            out.write(format_violation(violation) + "\n")
+    out.flush()
+    mandatory = sum(1 for violation in violations if violation.enforcement_level == "mandatory")
+    sys.stderr.write("Checked %d resources in %.1f ms: %d violations (%d mandatory)\n"
+                     % (len(resources), (time.perf_counter() - start) * 1000, len(violations), mandatory))
+    return mandatory
+
+
+def _sources():
+    return {name: os.stat(os.path.join(PROGRAM_DIR, name)).st_mtime
+            for name in os.listdir(PROGRAM_DIR) if name.endswith((".py", ".yaml"))}
+
+
+def watch(project, options):
+    """Checks the program again whenever one of its files changes, until interrupted.
+    Only the first run pays for importing pulumi_aws and the policies."""
+    sources = None
+    try:
+        while True:
+            current = _sources()
+            if current != sources:
+                sources = current
+                try:
+                    check(project, options)
+                except Exception as error:
+                    sys.stderr.write("The program failed: %s: %s\n" % (type(error).__name__, error))
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        return 0
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="Check the policies against this program without a preview.")
+    arg_parser.add_argument("--stack", default="local",
+                            help="stack name, selects Pulumi.<stack>.yaml and the sections of the pack configuration")
+    arg_parser.add_argument("--config", action="append", default=[], metavar="KEY=VALUE",
+                            help="configuration value, repeat for every key")
+    arg_parser.add_argument("--format", choices=("text", "json"), default="text")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="keep running and check again whenever a file of the program changes")
+    options = arg_parser.parse_args(argv[1:])
+
+    try:
+        import pyawsguard  # noqa: F401
+    except ImportError:
+        sys.path.insert(0, os.path.normpath(PACK_SRC))
+
+    project = project_name()
+    if options.watch:
+        return watch(project, options)
+    return 1 if check(project, options) else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
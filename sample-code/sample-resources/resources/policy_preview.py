@@ -0,0 +1,105 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# This script:
+# 1. runs a single 'pulumi preview' with every policy pack given (e.g. AWSGuard and the
+#    custom CrossGuard pack), so the program, the provider plugins and the state are only
+#    loaded once
+# 2. splits the engine event log back into one file per policy pack,
+#    'policy-events-<pack name>.json', which preview_parser.py reads to produce the metrics
+# 3. writes the number of violations and the exit code of each pack to
+#    'policy-results.json'
+#
+# The exit code is the one of 'pulumi preview': non-zero when any pack reported a
+# mandatory violation or the preview itself failed.
+#
+# Usage: python3 policy_preview.py --stack <stack> --policy-pack <dir> [--policy-pack <dir> ...]
+
+import argparse
+import json
+import os
+import subprocess  # nosec B404 - runs the pulumi CLI with a fixed argument list
+import sys
+
+
+def run_preview(stack, policy_packs, event_log, output_path):
+    """Runs 'pulumi preview' once with all policy packs, echoing and saving its output."""
+    command = ["pulumi", "preview", "--stack", stack, "--event-log", event_log]
+    for policy_pack in policy_packs:
+        command += ["--policy-pack", policy_pack]
+
+    process = subprocess.Popen(  # nosec B603
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    with open(output_path, "w") as output:
+        for line in process.stdout:
+            sys.stdout.write(line)
+            output.write(line)
+    return process.wait()
+
+
+def split_events(event_log, output_dir="."):
+    """Writes the policy events of each pack to its own event log file and returns
+    {pack name: {"violations": n, "mandatory": m}}."""
+    results = {}
+    files = {}
+    if not os.path.exists(event_log):
+        # The preview failed before the engine started
+        return results
+    try:
+        with open(event_log) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                policy_event = json.loads(line).get("policyEvent")
+                if policy_event is None:
+                    continue
+                pack = policy_event.get("policyPackName") or "unknown"
+                if pack not in files:
+                    files[pack] = open(os.path.join(output_dir, "policy-events-%s.json" % pack), "w")
+                    results[pack] = {"violations": 0, "mandatory": 0}
+                files[pack].write(line if line.endswith("\n") else line + "\n")
+                results[pack]["violations"] += 1
+                if policy_event.get("enforcementLevel") == "mandatory":
+                    results[pack]["mandatory"] += 1
+    finally:
+        for pack_file in files.values():
+            pack_file.close()
+    return results
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="Run one 'pulumi preview' with several policy packs.")
+    arg_parser.add_argument("--stack", required=True)
+    arg_parser.add_argument("--policy-pack", action="append", required=True, dest="policy_packs",
+                            help="policy pack directory, repeat for every pack")
+    arg_parser.add_argument("--event-log", default="policy-events.json")
+    arg_parser.add_argument("--output", default="preview_output.txt", help="file the preview output is saved to")
+    arg_parser.add_argument("--output-dir", default=".", help="directory of the per-pack results")
+    options = arg_parser.parse_args(argv[1:])
+
+    exit_code = run_preview(options.stack, options.policy_packs, options.event_log, options.output)
+    results = split_events(options.event_log, options.output_dir)
+    for pack, result in sorted(results.items()):
+        result["exit_code"] = 1 if result["mandatory"] else 0
+        print("%s: %d violations (%d mandatory)" % (pack, result["violations"], result["mandatory"]))
+
+    with open(os.path.join(options.output_dir, "policy-results.json"), "w") as f:
+        json.dump({"exit_code": exit_code, "packs": results}, f, indent=2, sort_keys=True)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,316 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# This script:
+# 1. reads the output of 'pulumi preview' from an input file: the CLI text output, the
+#    engine's JSON event stream ('--event-log'), or the JSON document of 'pulumi preview
+#    --json'
+# 2. Extracts the policy violations as typed records, counts them per policy, status and
+#    commit author, and writes the counts as CloudWatch metric data to 'metrics-<n>.json'
+#    files (one 'put-metric-data' request each), see metrics.py.
+# 3. With --history, also appends the violations to a local SQLite history of the runs,
+#    see history.py.
+#
+# Text logs and event streams are read line by line, so memory use does not grow with
+# the size of the log. Large files are memory-mapped and the text parser jumps straight
+# to the first 'Policy Violations:' section. A 'pulumi preview --json' document is a
+# single JSON value and is loaded whole.
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+from collections import namedtuple
+
+import metrics
+
+PolicyViolation = namedtuple("PolicyViolation", [
+    "policy",
+    "pack",
+    "pack_version",
+    "enforcement_level",
+    "urn",
+    "resource_type",
+    "resource_name",
+    "description",
+    "message",
+])
+
+# Files above this size are memory-mapped instead of read through the file buffer
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+SECTION_HEADER = "Policy Violations:"
+
+# e.g. "[mandatory]  aws-python v0.0.1  s3_encryption_policy (aws:s3/bucket:Bucket: my-bucket)"
+# The pack version and the resource are absent for some packs and for stack policies.
+VIOLATION_HEADER = re.compile(
+    r"^\s*\[(?P<level>[a-z]+)\]\s+(?P<pack>\S+)(?:\s+v(?P<version>\d\S*))?\s+(?P<policy>\S+)"
+    r"(?:\s+\((?P<type>[^:()\s]+:[^:()\s]*:[^:()\s]+): (?P<name>.*)\))?\s*$"
+)
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+# How the engine words a policy violation it turns into a diagnostic, e.g. in the
+# 'diagnostics' of a 'pulumi preview --json' document:
+# "mandatory: [s3_encryption_policy]  Validating default encryption ...\nDefault ..."
+DIAGNOSTIC_VIOLATION = re.compile(r"^\s*(?P<level>[a-z]+): \[(?P<policy>[^\]\s]+)\]\s*(?P<description>.*)$")
+
+
+def iter_lines(path):
+    """Lines of the file at path, decoded, without their line ending."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            for line in f:
+                yield line.decode("utf-8", "replace").rstrip("\r\n")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            if not _is_event_stream(mapped[:4096]):
+                # Nothing before the first section can be a violation
+                start = mapped.find(SECTION_HEADER.encode("ascii"))
+                if start < 0:
+                    return
+            mapped.seek(start)
+            for line in iter(mapped.readline, b""):
+                yield line.decode("utf-8", "replace").rstrip("\r\n")
+
+
+def _is_event_stream(head):
+    return head.lstrip()[:1] in (b"{", "{")
+
+
+def parse_text(lines):
+    """Violations from the CLI text output of 'pulumi preview'.
+
+    Each violation is a header line followed by the policy description and the message;
+    a message may wrap over several lines.
+    """
+    in_section = False
+    current = None
+    body = []
+    for line in lines:
+        line = ANSI_ESCAPE.sub("", line)
+        if SECTION_HEADER in line:
+            in_section = True
+            continue
+        if not in_section:
+            continue
+        match = VIOLATION_HEADER.match(line)
+        if match is not None:
+            if current is not None:
+                yield _text_violation(current, body)
+            current = match
+            body = []
+        elif line.strip() and line[:1].isspace():
+            if current is not None:
+                body.append(line.strip())
+        else:
+            # Violations are separated by blank lines, the section ends at the next
+            # unindented line
+            if current is not None:
+                yield _text_violation(current, body)
+            current = None
+            body = []
+            if line.strip():
+                in_section = False
+    if current is not None:
+        yield _text_violation(current, body)
+
+
+def _text_violation(match, body):
+    return PolicyViolation(
+        policy=match.group("policy"),
+        pack=match.group("pack"),
+        pack_version=match.group("version"),
+        enforcement_level=match.group("level"),
+        urn=None,
+        resource_type=match.group("type"),
+        resource_name=match.group("name"),
+        description=body[0] if body else "",
+        message=" ".join(body[1:]),
+    )
+
+
+def parse_events(lines):
+    """Violations from the engine's JSON event stream, one event per line.
+
+    Lines written by 'python -m pyawsguard.evaluate --format json' are accepted as well,
+    and so is a 'pulumi preview --json' document written on a single line.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        if "steps" in event or "diagnostics" in event:
+            yield from parse_document(event)
+            continue
+        policy_event = event.get("policyEvent")
+        if policy_event is not None:
+            urn = policy_event.get("resourceUrn") or None
+            resource_type, resource_name = _split_urn(urn)
+            yield PolicyViolation(
+                policy=policy_event.get("policyName"),
+                pack=policy_event.get("policyPackName"),
+                pack_version=policy_event.get("policyPackVersion"),
+                enforcement_level=policy_event.get("enforcementLevel"),
+                urn=urn,
+                resource_type=resource_type,
+                resource_name=resource_name,
+                description=policy_event.get("description", ""),
+                message=policy_event.get("message", "").strip(),
+            )
+        elif "policy_name" in event:
+            yield PolicyViolation(
+                policy=event["policy_name"],
+                pack=event.get("pack"),
+                pack_version=None,
+                enforcement_level=event.get("enforcement_level"),
+                urn=event.get("urn"),
+                resource_type=event.get("resource_type"),
+                resource_name=event.get("name"),
+                description=event.get("description", ""),
+                message=event.get("message", ""),
+            )
+
+
+def parse_document(document):
+    """Violations from the parsed JSON document of 'pulumi preview --json'.
+
+    The document lists the policy violations among its 'diagnostics', with the
+    violation formatted as in the text output or as "<level>: [<policy>] ..."; other
+    diagnostics are skipped.
+    """
+    packs = document.get("policyPacks") or {}
+    # The pack of a violation is only known from the document when a single pack ran
+    pack, version = next(iter(packs.items())) if len(packs) == 1 else (None, None)
+    for diagnostic in document.get("diagnostics") or ():
+        lines = [ANSI_ESCAPE.sub("", line) for line in (diagnostic.get("message") or "").splitlines()]
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            continue
+        urn = diagnostic.get("urn") or None
+        resource_type, resource_name = _split_urn(urn)
+        header = VIOLATION_HEADER.match(lines[0])
+        if header is not None:
+            violation = _text_violation(header, [line.strip() for line in lines[1:]])
+            yield violation._replace(urn=urn, resource_type=violation.resource_type or resource_type,
+                                     resource_name=violation.resource_name or resource_name)
+            continue
+        match = DIAGNOSTIC_VIOLATION.match(lines[0])
+        if match is None:
+            continue
+        yield PolicyViolation(
+            policy=match.group("policy"),
+            pack=pack,
+            pack_version=version,
+            enforcement_level=match.group("level"),
+            urn=urn,
+            resource_type=resource_type,
+            resource_name=resource_name,
+            description=match.group("description").strip(),
+            message=" ".join(line.strip() for line in lines[1:]),
+        )
+
+
+def _split_urn(urn):
+    # urn:pulumi:<stack>::<project>::<parent type$type>::<name>
+    if not urn:
+        return None, None
+    parts = urn.split("::")
+    if len(parts) < 4:
+        return None, None
+    return parts[2].rsplit("$", 1)[-1], "::".join(parts[3:])
+
+
+def parse_file(path):
+    """Violations found in a preview log: CLI text output, JSON event stream or
+    'pulumi preview --json' document."""
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if not _is_event_stream(head):
+        return parse_text(iter_lines(path))
+    if _is_document(head):
+        with open(path, "rb") as f:
+            return parse_document(json.load(f))
+    return parse_events(iter_lines(path))
+
+
+def _is_document(head):
+    # An event stream has a whole JSON value on its first line; 'pulumi preview --json'
+    # indents its document over many lines, so the first line is not valid JSON
+    first, newline, _ = head.lstrip().partition(b"\n")
+    if not newline:
+        # A line longer than the head: an event, or a document on a single line, which
+        # parse_events reads as well
+        return False
+    try:
+        json.loads(first.decode("utf-8", "replace"))
+    except ValueError:
+        return True
+    return False
+
+
+def metric_status(violation):
+    return "Advisory" if violation.enforcement_level == "advisory" else "Failed"
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(
+        description="Extract policy violations from a 'pulumi preview' log and write CloudWatch metrics.")
+    arg_parser.add_argument("log", help="log output file from the crossguard check run")
+    arg_parser.add_argument("--format", choices=("put-metric-data", "emf"), default="put-metric-data",
+                            help="metrics-<n>.json files for 'aws cloudwatch put-metric-data' (default), "
+                                 "or CloudWatch Embedded Metric Format lines in metrics.emf")
+    arg_parser.add_argument("--output-dir", default=".", help="directory the metrics files are written to")
+    arg_parser.add_argument("--batch-size", type=int, default=metrics.MAX_DATA_PER_REQUEST,
+                            help="maximum number of metric data per put-metric-data file")
+    arg_parser.add_argument("--namespace", default=metrics.NAMESPACE, help="namespace of the EMF metrics")
+    arg_parser.add_argument("--history", metavar="DB",
+                            help="also append the violations to this violation history database, see history.py")
+    arg_parser.add_argument("--stack", default=os.environ.get("STACK_NAME", "default"),
+                            help="stack of the run in the history (default: $STACK_NAME)")
+    options = arg_parser.parse_args(argv[1:])
+
+    violations = parse_file(options.log)
+    store = None
+    if options.history:
+        import history
+
+        store = history.History(options.history)
+        violations = store.recording(violations, options.stack, os.environ.get('AUTHOR'), os.environ.get('EMAIL'),
+                                     os.environ.get('CODEBUILD_RESOLVED_SOURCE_VERSION'))
+
+    # Count the policy violations per policy, status and commit author
+    try:
+        counts = metrics.aggregate(violations, metric_status, os.environ.get('AUTHOR'), os.environ.get('EMAIL'))
+    finally:
+        if store is not None:
+            store.close()
+
+    if options.format == "emf":
+        with open(os.path.join(options.output_dir, "metrics.emf"), "w") as f:
+            for line in metrics.emf_lines(counts, options.namespace):
+                f.write(line + "\n")
+        return
+
+    # Write the aggregated metric data in batches of at most one put-metric-data request each
+    metrics.publish(counts, metrics.FilePublisher(options.output_dir), batch_size=options.batch_size)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,82 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the classification of the violations of a preview against a baseline
+# (baseline.py).
+
+import json
+
+import pytest
+
+import baseline
+import preview_parser
+from test_preview_parser import POLICY_EVENT, PREVIEW_DOCUMENT, TEXT_OUTPUT, write
+
+PROGRAM_ERROR = {"sequence": 4, "timestamp": 1700000001, "diagnosticEvent": {
+    "urn": "urn:pulumi:dev::resources::pulumi:pulumi:Stack::resources-dev", "prefix": "error: ",
+    "message": "Program failed with an unhandled exception\n", "color": "never", "severity": "error"}}
+PREVIEW_FAILED = {"sequence": 5, "timestamp": 1700000002, "diagnosticEvent": {
+    "message": "preview failed\n", "color": "never", "severity": "error"}}
+
+
+def test_baseline_classifies_the_violations_of_a_log(tmp_path):
+    # baseline.py reads the logs through preview_parser, not the standard library parser
+    assert baseline.preview_parser is preview_parser
+    violations = list(preview_parser.parse_file(write(tmp_path, TEXT_OUTPUT)))
+    path = str(tmp_path / "baseline.tsv")
+    baseline.write(path, violations[1:])
+    diff = baseline.classify(iter(violations), baseline.load(path))
+    assert (len(diff.new), diff.unchanged, diff.fixed) == (1, 1, [])
+    assert [violation.policy for violation in diff.failing] == ["s3_encryption_policy"]
+
+
+def event_log(tmp_path, *events):
+    return write(tmp_path, "".join(json.dumps(event) + "\n" for event in events), "policy-events.json")
+
+
+def results(tmp_path, exit_code, mandatory):
+    return write(tmp_path, json.dumps({"exit_code": exit_code, "packs": {
+        "aws-python": {"violations": mandatory, "mandatory": mandatory, "exit_code": 1 if mandatory else 0}}}),
+        "policy-results.json")
+
+
+@pytest.mark.parametrize("events, mandatory, exit_code", [
+    # The failure is the baselined violation's: the baseline decides
+    ([POLICY_EVENT, PREVIEW_FAILED], 1, 0),
+    # The program failed as well
+    ([POLICY_EVENT, PROGRAM_ERROR, PREVIEW_FAILED], 1, 255),
+    # The packs reported a mandatory violation the log does not hold
+    ([POLICY_EVENT], 2, 255),
+    # No mandatory violation at all
+    ([PROGRAM_ERROR], 0, 255),
+])
+def test_failures_of_the_preview_not_explained_by_violations(tmp_path, events, mandatory, exit_code):
+    log = event_log(tmp_path, *events)
+    path = str(tmp_path / "baseline.tsv")
+    baseline.write(path, preview_parser.parse_file(log))
+    argv = ["baseline.py", "check", log, "--baseline", path, "--results", results(tmp_path, 255, mandatory),
+            "--output", str(tmp_path / "policy-diff.json")]
+    assert baseline.main(argv) == exit_code
+
+
+def test_engine_errors_of_each_log_format(tmp_path):
+    assert baseline.engine_errors(write(tmp_path, TEXT_OUTPUT)) == 0
+    assert baseline.engine_errors(write(tmp_path, TEXT_OUTPUT + "Diagnostics:\n  pulumi:pulumi:Stack (dev):\n"
+                                        "    error: Program failed with an unhandled exception\n")) == 1
+    # The mandatory violation is an error diagnostic of the document, not an engine error
+    assert baseline.engine_errors(write(tmp_path, json.dumps(PREVIEW_DOCUMENT, indent=2))) == 0
+    assert baseline.engine_errors(event_log(tmp_path, POLICY_EVENT, PROGRAM_ERROR, PREVIEW_FAILED)) == 1
@@ -0,0 +1,111 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the CloudWatch metrics of the violations (metrics.py), published to a stub
+# of the CloudWatch client that records the batches.
+
+import json
+from collections import namedtuple
+
+import pytest
+
+import metrics
+
+Violation = namedtuple("Violation", ["policy", "enforcement_level"])
+
+
+class RecordingClient:
+    """Stand-in for boto3.client("cloudwatch"): records every put_metric_data call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def put_metric_data(self, Namespace, MetricData):
+        if len(MetricData) > metrics.MAX_DATA_PER_REQUEST:
+            raise ValueError("too many metric data in one request")
+        self.calls.append((Namespace, MetricData))
+
+
+def status_of(violation):
+    return "Advisory" if violation.enforcement_level == "advisory" else "Failed"
+
+
+def counts_of(*violations):
+    return metrics.aggregate(violations, status_of, "jane", "")
+
+
+def test_violations_are_counted_per_policy_and_status():
+    counts = counts_of(Violation("s3", "mandatory"), Violation("s3", "mandatory"), Violation("s3", "advisory"),
+                       Violation("kms", "mandatory"))
+    assert counts == {("s3", "Failed", "jane", ""): 2, ("s3", "Advisory", "jane", ""): 1,
+                      ("kms", "Failed", "jane", ""): 1}
+
+
+def test_one_datum_per_count_with_a_statistic_set():
+    data = metrics.metric_data(counts_of(Violation("s3", "mandatory"), Violation("s3", "mandatory")), timestamp=10)
+    assert data == [{
+        "MetricName": "s3",
+        "Unit": "Count",
+        "Timestamp": 10,
+        # The empty email is left out, CloudWatch rejects empty dimension values
+        "Dimensions": [{"Name": "Status", "Value": "Failed"}, {"Name": "Author", "Value": "jane"}],
+        "StatisticValues": {"SampleCount": 2, "Sum": 2, "Minimum": 1, "Maximum": 1},
+    }]
+    assert metrics.metric_data(counts_of(Violation("s3", "mandatory")), 10, statistic_sets=False)[0]["Value"] == 1
+
+
+@pytest.mark.parametrize("policies, batch_size, sizes", [
+    (1, metrics.MAX_DATA_PER_REQUEST, [1]),
+    (2500, metrics.MAX_DATA_PER_REQUEST, [1000, 1000, 500]),
+    (10, 4, [4, 4, 2]),
+])
+def test_data_are_sent_in_request_sized_batches(policies, batch_size, sizes):
+    violations = [Violation("policy-%d" % (index % policies), "mandatory") for index in range(policies * 3)]
+    client = RecordingClient()
+    sent = metrics.publish(counts_of(*violations), metrics.ClientPublisher(client), batch_size=batch_size,
+                           timestamp=10)
+    assert sent == len(sizes)
+    assert [len(batch) for _, batch in client.calls] == sizes
+    assert {namespace for namespace, _ in client.calls} == {metrics.NAMESPACE}
+    data = [datum for _, batch in client.calls for datum in batch]
+    assert len({datum["MetricName"] for datum in data}) == policies
+    assert sum(datum["StatisticValues"]["SampleCount"] for datum in data) == len(violations)
+
+
+def test_file_publisher_writes_one_file_per_batch(tmp_path):
+    publisher = metrics.FilePublisher(str(tmp_path))
+    counts = counts_of(*[Violation("policy-%d" % index, "mandatory") for index in range(5)])
+    assert metrics.publish(counts, publisher, batch_size=2, timestamp=10) == 3
+    assert [path.rsplit("/", 1)[-1] for path in publisher.paths] == ["metrics-0.json", "metrics-1.json",
+                                                                     "metrics-2.json"]
+    with open(publisher.paths[2]) as f:
+        assert [datum["MetricName"] for datum in json.load(f)] == ["policy-4"]
+
+
+def test_embedded_metric_format_lines():
+    violations = [Violation("policy-%03d" % index, "mandatory") for index in range(150)]
+    violations.append(Violation("policy-000", "advisory"))
+    lines = [json.loads(line) for line in metrics.emf_lines(counts_of(*violations), timestamp=10)]
+    # One line per dimension values, at most MAX_EMF_METRICS metrics each
+    assert [(line["Status"], len(line["_aws"]["CloudWatchMetrics"][0]["Metrics"])) for line in lines] == [
+        ("Advisory", 1), ("Failed", 100), ("Failed", 50)]
+    for line in lines:
+        directive = line["_aws"]["CloudWatchMetrics"][0]
+        assert line["_aws"]["Timestamp"] == 10000
+        assert directive["Namespace"] == metrics.NAMESPACE
+        assert directive["Dimensions"] == [["Author", "Status"]]
+        assert all(line[metric["Name"]] == 1 for metric in directive["Metrics"])
@@ -0,0 +1,126 @@
+#  Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#  SPDX-License-Identifier: MIT-0
+
+#  Permission is hereby granted, free of charge, to any person obtaining a copy of this
+#  software and associated documentation files (the "Software"), to deal in the Software
+#  without restriction, including without limitation the rights to use, copy, modify,
+#  merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+#  permit persons to whom the Software is furnished to do so.
+
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+#  INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+#  PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+#  HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+#  OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+#  SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+# Tests of the extraction of the policy violations from a 'pulumi preview' log
+# (preview_parser.py), in each of the forms the pipeline produces.
+
+import json
+
+import pytest
+
+import preview_parser
+
+URN = "urn:pulumi:dev::resources::aws:s3/bucket:Bucket::my-bucket"
+
+TEXT_OUTPUT = """Previewing update (dev):
+     Type                 Name           Plan
+ +   pulumi:pulumi:Stack  resources-dev  create
+
+Policy Violations:
+    \x1b[31m[mandatory]  aws-python v0.0.1  s3_encryption_policy (aws:s3/bucket:Bucket: my-bucket)\x1b[0m
+    Validating default encryption configuration on AWS S3 buckets.
+    Default encryption is not enabled for the S3 bucket
+    my-bucket, which is wrapped over two lines
+
+    [advisory]  aws-python  vpc-flow-log-coverage
+    Validating that every VPC has a flow log capturing ALL traffic.
+    No flow log with trafficType ALL is created for the VPC main
+
+Resources:
+    + 1 to create
+"""
+
+POLICY_EVENT = {"sequence": 3, "timestamp": 1700000000, "policyEvent": {
+    "resourceUrn": URN, "message": "Default encryption is not enabled\n", "color": "never",
+    "policyName": "s3_encryption_policy", "policyPackName": "aws-python", "policyPackVersion": "0.0.1",
+    "policyPackVersionTag": "0.0.1", "enforcementLevel": "mandatory",
+    "description": "Validating default encryption configuration on AWS S3 buckets."}}
+
+# What 'pulumi preview --json' writes: one document, indented over many lines
+PREVIEW_DOCUMENT = {
+    "steps": [{"op": "create", "urn": URN}],
+    "diagnostics": [
+        {"urn": URN, "severity": "error",
+         "message": "mandatory: [s3_encryption_policy] Validating default encryption configuration on AWS S3 "
+                    "buckets.\nDefault encryption is not enabled\n"},
+        {"urn": URN, "severity": "info", "message": "a diagnostic that is not a violation\n"},
+        {"severity": "warning",
+         "message": "[advisory]  aws-python v0.0.1  vpc-flow-log-coverage\nValidating that every VPC has a flow "
+                    "log capturing ALL traffic.\nNo flow log with trafficType ALL is created for the VPC main\n"},
+    ],
+    "policyPacks": {"aws-python": "0.0.1"},
+    "changeSummary": {"create": 1},
+}
+
+
+def write(tmp_path, text, name="preview.log"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def summary(violations):
+    return [(violation.policy, violation.pack, violation.enforcement_level, violation.resource_type,
+             violation.resource_name, violation.message) for violation in violations]
+
+
+def test_text_output_with_wrapped_messages(tmp_path):
+    assert summary(preview_parser.parse_file(write(tmp_path, TEXT_OUTPUT))) == [
+        ("s3_encryption_policy", "aws-python", "mandatory", "aws:s3/bucket:Bucket", "my-bucket",
+         "Default encryption is not enabled for the S3 bucket my-bucket, which is wrapped over two lines"),
+        ("vpc-flow-log-coverage", "aws-python", "advisory", None, None,
+         "No flow log with trafficType ALL is created for the VPC main"),
+    ]
+
+
+def test_event_stream(tmp_path):
+    lines = [json.dumps({"sequence": 0, "preludeEvent": {}}), json.dumps(POLICY_EVENT)]
+    violations = list(preview_parser.parse_file(write(tmp_path, "\n".join(lines) + "\n", "events.jsonl")))
+    assert summary(violations) == [("s3_encryption_policy", "aws-python", "mandatory", "aws:s3/bucket:Bucket",
+                                     "my-bucket", "Default encryption is not enabled")]
+    assert violations[0].urn == URN and violations[0].pack_version == "0.0.1"
+
+
+@pytest.mark.parametrize("indent", [2, None])
+def test_preview_json_document(tmp_path, indent):
+    path = write(tmp_path, json.dumps(PREVIEW_DOCUMENT, indent=indent) + "\n", "preview.json")
+    assert summary(preview_parser.parse_file(path)) == [
+        ("s3_encryption_policy", "aws-python", "mandatory", "aws:s3/bucket:Bucket", "my-bucket",
+         "Default encryption is not enabled"),
+        ("vpc-flow-log-coverage", "aws-python", "advisory", None, None,
+         "No flow log with trafficType ALL is created for the VPC main"),
+    ]
+
+
+def test_offline_evaluator_output(tmp_path):
+    line = {"policy_name": "s3_encryption_policy", "pack": "aws-python", "enforcement_level": "mandatory",
+            "urn": URN, "resource_type": "aws:s3/bucket:Bucket", "name": "my-bucket", "description": "d",
+            "message": "Default encryption is not enabled"}
+    violations = list(preview_parser.parse_file(write(tmp_path, json.dumps(line) + "\n", "offline.jsonl")))
+    assert summary(violations) == [("s3_encryption_policy", "aws-python", "mandatory", "aws:s3/bucket:Bucket",
+                                    "my-bucket", "Default encryption is not enabled")]
+
+
+def test_main_writes_the_metrics_of_the_log(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTHOR", "jane")
+    monkeypatch.delenv("EMAIL", raising=False)
+    preview_parser.main(["preview_parser.py", write(tmp_path, TEXT_OUTPUT), "--output-dir", str(tmp_path)])
+    with open(str(tmp_path / "metrics-0.json")) as f:
+        data = json.load(f)
+    counts = sorted((datum["MetricName"], datum["Dimensions"][0]["Value"], datum["StatisticValues"]["SampleCount"])
+                    for datum in data)
+    assert counts == [("s3_encryption_policy", "Failed", 1), ("vpc-flow-log-coverage", "Advisory", 1)]